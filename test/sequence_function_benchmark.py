@@ -0,0 +1,114 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This script times Unicycler's hot sequence functions (reverse complement, complement, homopolymer
+detection and line wrapping) on random sequences of increasing length, along with a graph load. It
+also times simple per-base implementations of the same functions, so regressions in the real ones
+are easy to spot. It outputs a table of times.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.getcwd())
+import unicycler.assembly_graph
+import unicycler.misc
+import unicycler.log
+
+SEQ_LENGTHS = [100, 10000, 1000000]
+col_widths = [22, 10, 14, 14, 9]
+
+
+def main():
+    random.seed(0)
+    unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+
+    print()
+    header_row = ['Function', 'Length', 'Time (ms)', 'Per-base (ms)', 'Speed-up']
+    unicycler.misc.print_table([header_row], col_separation=3, header_format='underline', indent=0,
+                               alignments='LRRRR', fixed_col_widths=col_widths, verbosity=0)
+    for length in SEQ_LENGTHS:
+        seq = unicycler.misc.get_random_sequence(length)
+        homopolymer = 'A' * length
+        benchmark_row('reverse_complement', length,
+                      lambda: unicycler.misc.reverse_complement(seq),
+                      lambda: per_base_reverse_complement(seq))
+        benchmark_row('complement', length,
+                      lambda: unicycler.misc.complement(seq),
+                      lambda: per_base_complement(seq))
+        benchmark_row('is_homopolymer', length,
+                      lambda: unicycler.misc.is_homopolymer(homopolymer),
+                      lambda: per_base_is_homopolymer(homopolymer))
+        benchmark_row('add_line_breaks', length,
+                      lambda: unicycler.misc.add_line_breaks_to_sequence(seq, 70),
+                      lambda: per_line_add_line_breaks(seq, 70))
+
+    test_fastg = os.path.join(os.path.dirname(__file__), 'test_assembly_graph.fastg')
+    graph_load_time = time_function(lambda: unicycler.assembly_graph.AssemblyGraph(test_fastg, 25))
+    print_row(['graph load (fastg)', '', '%.3f' % graph_load_time, '', ''])
+    print()
+
+
+def benchmark_row(name, length, function, per_base_function):
+    function_time = time_function(function)
+    per_base_time = time_function(per_base_function)
+    speed_up = per_base_time / function_time if function_time > 0.0 else float('inf')
+    print_row([name, str(length), '%.3f' % function_time, '%.3f' % per_base_time,
+               '%.1f' % speed_up + 'x'])
+
+
+def time_function(function):
+    """
+    Returns the best time (in milliseconds) from a few repeats of the function.
+    """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat=3, number=number)) / number * 1000.0
+
+
+def print_row(table_row):
+    unicycler.misc.print_table([table_row], col_separation=3, header_format='normal', indent=0,
+                               alignments='LRRRR', fixed_col_widths=col_widths, verbosity=0,
+                               left_align_header=False, bottom_align_header=False)
+
+
+def per_base_reverse_complement(seq):
+    return ''.join([unicycler.misc.complement_base(x) for x in seq][::-1])
+
+
+def per_base_complement(seq):
+    return ''.join([unicycler.misc.complement_base(x) for x in seq])
+
+
+def per_base_is_homopolymer(seq):
+    if not seq:
+        return False
+    first_base = seq[0].lower()
+    for base in seq[1:]:
+        if base.lower() != first_base:
+            return False
+    return True
+
+
+def per_line_add_line_breaks(sequence, line_length):
+    seq_with_breaks = ''
+    pos = 0
+    while pos < len(sequence):
+        seq_with_breaks += sequence[pos:pos+line_length] + '\n'
+        pos += line_length
+    return seq_with_breaks
+
+
+if __name__ == '__main__':
+    main()
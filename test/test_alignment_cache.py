@@ -0,0 +1,127 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import unicycler.read_ref
+import unicycler.alignment
+import unicycler.alignment_cache
+import unicycler.unicycler_align
+import unicycler.log
+
+ALIGNMENT_ATTRIBUTES = ['rev_comp', 'cigar_parts', 'read_start_pos', 'read_end_pos',
+                        'read_end_gap', 'ref_start_pos', 'ref_end_pos', 'match_count',
+                        'mismatch_count', 'insertion_count', 'deletion_count', 'alignment_length',
+                        'edit_distance', 'percent_identity', 'raw_score', 'scaled_score']
+
+
+class TestAlignmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_filename = os.path.join(self.temp_dir, 'alignments.alncache')
+        self.ref_fasta = os.path.join(os.path.dirname(__file__), 'test_semi_global_alignment.fasta')
+        self.read_fastq = os.path.join(os.path.dirname(__file__),
+                                       'test_semi_global_alignment.fastq')
+        self.scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def align(self, sam_filename=None, cache_filename=None):
+        refs = unicycler.read_ref.load_references(self.ref_fasta, section_header=None,
+                                                  show_progress=False)
+        read_dict, read_names, _ = unicycler.read_ref.load_long_reads(self.read_fastq,
+                                                                      silent=True)
+        unicycler.unicycler_align.semi_global_align_long_reads(
+            refs, read_dict, read_names, self.read_fastq, 1, self.scoring_scheme,
+            [None], False, 10, sam_filename, None, 0, 0, None, 0,
+            alignment_cache_filename=cache_filename)
+        return refs, read_dict, read_names
+
+    def assert_same_alignments(self, read_dict_1, read_dict_2):
+        self.assertEqual(sorted(read_dict_1), sorted(read_dict_2))
+        for read_name in read_dict_1:
+            alignments_1 = read_dict_1[read_name].alignments
+            alignments_2 = read_dict_2[read_name].alignments
+            self.assertEqual(len(alignments_1), len(alignments_2))
+            for a_1, a_2 in zip(alignments_1, alignments_2):
+                for attribute in ALIGNMENT_ATTRIBUTES:
+                    self.assertEqual(getattr(a_1, attribute), getattr(a_2, attribute))
+                self.assertEqual(a_1.ref.name, a_2.ref.name)
+                self.assertEqual(a_1.get_sam_line(), a_2.get_sam_line())
+
+    def test_cache_round_trip(self):
+        refs, read_dict, read_names = self.align()
+        cache = unicycler.alignment_cache.AlignmentCache()
+        for read_name in read_names:
+            for alignment in read_dict[read_name].alignments:
+                cache.add_alignment(alignment)
+        self.assertTrue(len(cache) > 0)
+        cache.save(self.cache_filename, 'key')
+
+        self.assertIsNone(unicycler.alignment_cache.load_alignment_cache(self.cache_filename,
+                                                                         'other key'))
+        loaded_cache = unicycler.alignment_cache.load_alignment_cache(self.cache_filename, 'key')
+        self.assertEqual(len(loaded_cache), len(cache))
+        reference_dict = {x.name: x for x in refs}
+        loaded_dict = {name: unicycler.read_ref.Read(name, read_dict[name].sequence,
+                                                     read_dict[name].qualities)
+                       for name in read_names}
+        for alignment in loaded_cache.get_alignments(loaded_dict, reference_dict):
+            alignment.read.alignments.append(alignment)
+        self.assert_same_alignments(read_dict, loaded_dict)
+
+    def test_aligning_reuses_cache(self):
+        sam_1 = os.path.join(self.temp_dir, 'alignments_1.sam')
+        sam_2 = os.path.join(self.temp_dir, 'alignments_2.sam')
+        _, read_dict_1, _ = self.align(sam_1, self.cache_filename)
+        self.assertTrue(os.path.isfile(self.cache_filename))
+        _, read_dict_2, _ = self.align(sam_2, self.cache_filename)
+        self.assert_same_alignments(read_dict_1, read_dict_2)
+        with open(sam_1, 'rt') as f_1, open(sam_2, 'rt') as f_2:
+            self.assertEqual(sorted(f_1.readlines()), sorted(f_2.readlines()))
+
+    def test_load_sam_alignments_with_cache(self):
+        sam_filename = os.path.join(self.temp_dir, 'alignments.sam')
+        refs, read_dict, _ = self.align(sam_filename)
+        reference_dict = {x.name: x for x in refs}
+        for read in read_dict.values():
+            read.alignments = []
+        parsed = unicycler.unicycler_align.load_sam_alignments(
+            sam_filename, read_dict, reference_dict, self.scoring_scheme, self.cache_filename)
+        cached = unicycler.unicycler_align.load_sam_alignments(
+            sam_filename, read_dict, reference_dict, self.scoring_scheme, self.cache_filename)
+        self.assertEqual(len(parsed), len(cached))
+        for a_1, a_2 in zip(parsed, cached):
+            for attribute in ALIGNMENT_ATTRIBUTES:
+                self.assertEqual(getattr(a_1, attribute), getattr(a_2, attribute))
+
+    def test_cache_key(self):
+        refs = unicycler.read_ref.load_references(self.ref_fasta, section_header=None,
+                                                  show_progress=False)
+        key_1 = unicycler.alignment_cache.get_alignment_cache_key([self.read_fastq], refs,
+                                                                  ['a', 'b'], [1])
+        key_2 = unicycler.alignment_cache.get_alignment_cache_key([self.read_fastq], refs,
+                                                                  ['a', 'b'], [1])
+        self.assertEqual(key_1, key_2)
+        self.assertNotEqual(key_1, unicycler.alignment_cache.get_alignment_cache_key(
+            [self.read_fastq], refs, ['a'], [1]))
+        self.assertNotEqual(key_1, unicycler.alignment_cache.get_alignment_cache_key(
+            [self.read_fastq], refs, ['a', 'b'], [2]))
+        refs[0].sequence += 'A'
+        self.assertNotEqual(key_1, unicycler.alignment_cache.get_alignment_cache_key(
+            [self.read_fastq], refs, ['a', 'b'], [1]))
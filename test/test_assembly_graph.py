@@ -14,6 +14,9 @@ not, see <http://www.gnu.org/licenses/>.
 import unittest
 import os
 import unicycler.assembly_graph
+import unicycler.assembly_graph_worklist
+import unicycler.path_finding
+import unicycler.alignment
 import unicycler.misc
 import unicycler.log
 
@@ -451,6 +454,59 @@ class TestAssemblyGraphFunctionsGfa(unittest.TestCase):
         with self.assertRaises(unicycler.assembly_graph.BadOverlaps):
             self.graph.get_path_sequence([17, 15, 14, 13, 12, 6])
 
+    def test_all_paths(self):
+        paths = unicycler.path_finding.all_paths(self.graph, 17, 18, 50, 100)
+        self.assertEqual(paths, [[15, 14, 13, 12, 6, 11, 8, 15],
+                                 [15, 14, 13, 12, 6, 11, 7, 9, 10, 15],
+                                 [15, 14, 13, 12, 1, 2, 3, 4, 5, 11, 8, 15],
+                                 [15, 14, 13, 12, 6, 11, 8, 15, 14, 13, 12, 6, 11, 8, 15]])
+        self.assertEqual([self.graph.get_path_length(p) for p in paths], [52, 72, 92, 100])
+        self.assertEqual(unicycler.path_finding.all_paths(self.graph, 17, 18, 0, 300)[0], [15])
+        self.assertEqual(unicycler.path_finding.all_paths(self.graph, 18, 17, 0, 300), [])
+
+    def test_path_node_counts(self):
+        path_node = None
+        for seg_num in [15, 14, 13, 12, 6, 11, 8, 15, 14]:
+            count = 0 if path_node is None else path_node.get_count(seg_num)
+            path_node = unicycler.path_finding.PathNode(self.graph, seg_num, path_node, count + 1)
+        self.assertEqual(unicycler.path_finding.get_linked_path(path_node),
+                         [15, 14, 13, 12, 6, 11, 8, 15, 14])
+        self.assertEqual(path_node.get_count(14), 2)
+        self.assertEqual(path_node.get_count(-15), 2)
+        self.assertEqual(path_node.get_count(6), 1)
+        self.assertEqual(path_node.get_count(1), 0)
+        self.assertEqual(path_node.parent.get_count(14), 1)
+
+    def test_get_distances_to_segment(self):
+        distances = unicycler.path_finding.get_distances_to_segment(self.graph, 18, 40)
+        self.assertEqual(distances, {15: 0, 8: 4, 10: 4, 17: 4, 9: 14, 11: 14, 5: 20, 6: 20,
+                                     7: 24, 4: 30, 12: 30, 13: 36, 3: 40})
+        self.assertFalse(16 in distances)
+        self.assertFalse(18 in distances)
+
+    def test_progressive_path_find(self):
+        scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+        sequence = self.graph.get_path_sequence([15, 14, 13, 12, 6, 11, 7, 9, 10, 15])
+        paths = unicycler.path_finding.progressive_path_find(
+            self.graph, 17, 18, 50, 100, sequence, scoring_scheme, 90.0,
+            unicycler.path_finding.PathSequenceCache(self.graph))
+        self.assertEqual(sorted(paths), sorted(unicycler.path_finding.all_paths(self.graph, 17,
+                                                                                18, 50, 100)))
+
+    def test_path_sequence_cache(self):
+        cache = unicycler.path_finding.PathSequenceCache(self.graph)
+        paths = [[17, 15, 14, 13, 12, 6, 11, 7, 9, 10, 15, 14, 13, 12, 1, 2, 3, 4, 5, 11, 8, 15,
+                  18],
+                 [17, 15, 14, 13, 12, 6], [17, 15, 14, 13, 12, 6, 11, 7], [17, 15], [],
+                 [-6, -12, -13, -14, -15, -8, -11, -6, -12, -13, -14, -15, -10]]
+        for _ in range(2):
+            for p in paths:
+                self.assertEqual(cache.get_path_sequence(p), self.graph.get_path_sequence(p))
+        with self.assertRaises(unicycler.assembly_graph.BadPath):
+            cache.get_path_sequence([17, 15, 14, 12])
+        self.assertEqual(cache.get_path_sequence([17, 15, 14]),
+                         self.graph.get_path_sequence([17, 15, 14]))
+
     def test_merge_simple_path_1(self):
         self.graph.merge_simple_path([1, 2, 3, 4, 5])
         self.assertEqual(len(self.graph.segments), 15)
@@ -605,6 +661,58 @@ class TestAssemblyGraphFunctionsGfa(unittest.TestCase):
         self.assertEqual(len(components), 5)
         self.assertEqual(sorted([len(x) for x in components]), [1, 1, 1, 1, 15])
 
+    def test_components_after_changes(self):
+        components = self.graph.get_connected_components()
+        self.graph.add_link(1, 19)
+        self.assertEqual(len(self.graph.get_connected_components()), len(components) - 1)
+        self.graph.remove_segments([19])
+        self.assertEqual(sorted(len(x) for x in self.graph.get_connected_components()), [1, 17])
+
+        # Changing a returned component doesn't change the cached components.
+        self.graph.get_connected_components()[0].append(1000)
+        self.assertEqual(sorted(len(x) for x in self.graph.get_connected_components()), [1, 17])
+
+    def test_component_index(self):
+        self.graph.get_connected_components()
+        self.assertIsNotNone(self.graph.components)
+
+        # The component index is updated (not rebuilt) by edits and always agrees with a fresh
+        # search of the graph.
+        self.graph.remove_link(17, 15)
+        self.graph.remove_link(-18, -15)
+        self.assertEqual(self.graph.get_connected_components(),
+                         self.graph.find_connected_components())
+        self.graph.add_link(1, 19)
+        self.assertEqual(self.graph.get_connected_components(),
+                         self.graph.find_connected_components())
+        self.graph.remove_segments([2, 5])
+        self.assertEqual(self.graph.get_connected_components(),
+                         self.graph.find_connected_components())
+        self.graph.remove_small_components(2)
+        self.assertEqual(self.graph.get_connected_components(),
+                         self.graph.find_connected_components())
+        self.graph.merge_all_possible(None, 2)
+        self.assertEqual(self.graph.get_connected_components(),
+                         self.graph.find_connected_components())
+
+    def test_segment_work_list(self):
+        work_list = unicycler.assembly_graph_worklist.SegmentWorkList([5, 3, 5, 1])
+        self.assertEqual(len(work_list), 3)
+        self.assertEqual(work_list.pop(), 1)
+        work_list.add_nearby(self.graph, [1], 1)
+        self.assertEqual(sorted(work_list.queued),
+                         sorted(set([1, 3, 5] + self.graph.get_connected_segments(1))))
+        popped = []
+        while work_list:
+            popped.append(work_list.pop())
+        self.assertEqual(popped, sorted(popped))
+        self.assertIsNone(work_list.pop())
+
+        # With an order given, segments come out in that order (new segments go at the end).
+        work_list = unicycler.assembly_graph_worklist.SegmentWorkList([5, 3], {5: 0, 3: 1})
+        work_list.add(1)
+        self.assertEqual([work_list.pop(), work_list.pop(), work_list.pop()], [5, 3, 1])
+
     def test_seq_from_signed_seg_num(self):
         self.assertEqual(self.graph.seq_from_signed_seg_num(1), 'TTCTATTTTG')
         self.assertEqual(self.graph.seq_from_signed_seg_num(-1), 'CAAAATAGAA')
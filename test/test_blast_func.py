@@ -83,3 +83,51 @@ class TestBlastFunc(unittest.TestCase):
 
         self.assertEqual(len(seg.forward_sequence), length_before_rotate)
         self.assertTrue(seg.forward_sequence.startswith('ATGCAGGAACGCATTAAAGCGTGCTTTACCGAAAG'))
+
+    def test_multiple_replicons(self):
+        seqs = [x[1] for x in self.fasta]
+        hits = unicycler.blast_func.find_start_genes(seqs, self.start_genes, self.start_gene_id,
+                                                     self.start_gene_cov, self.blast_dir,
+                                                     'makeblastdb', 'tblastn', 2)
+        self.assertEqual(len(hits), 3)
+        self.assertIsNone(hits[0])
+        self.assertEqual((hits[1].qseqid, hits[1].start_pos, hits[1].flip),
+                         ('UniRef90_P66818', 36661, False))
+        self.assertEqual((hits[2].qseqid, hits[2].start_pos, hits[2].flip),
+                         ('UniRef90_P66818', 82415, True))
+
+    def test_tblastn_failure(self):
+        makeblastdb = self.make_script('makeblastdb', 'exit 0')
+        tblastn = self.make_script('tblastn', 'echo "BLAST Database error" >&2\nexit 2')
+        with self.assertRaises(unicycler.blast_func.CannotFindStart):
+            unicycler.blast_func.find_start_genes(['ACGTACGT'], self.start_genes,
+                                                  self.start_gene_id, self.start_gene_cov,
+                                                  self.blast_dir, makeblastdb, tblastn, 1)
+
+    def test_tblastn_warning(self):
+        # Text on stderr (e.g. a warning) is only logged if tblastn still succeeds.
+        makeblastdb = self.make_script('makeblastdb', 'exit 0')
+        hit_line = 'UniRef90_P66818\t3\t101\t100.0\t33\t' + 'M' * 33 + '\t1\t50.0\treplicon_0'
+        tblastn = self.make_script('tblastn', 'echo "Warning: something harmless" >&2\n'
+                                              'printf "' + hit_line + '\\n"\nexit 0')
+        hits = unicycler.blast_func.find_start_genes(['ACGT' * 50], self.start_genes,
+                                                     self.start_gene_id, self.start_gene_cov,
+                                                     self.blast_dir, makeblastdb, tblastn, 1)
+        self.assertEqual(len(hits), 1)
+        self.assertEqual(hits[0].qseqid, 'UniRef90_P66818')
+        self.assertEqual(hits[0].start_pos, 2)
+        self.assertFalse(hits[0].flip)
+
+    def make_script(self, name, body):
+        script = os.path.abspath(os.path.join(self.blast_dir, name))
+        with open(script, 'wt') as script_file:
+            script_file.write('#!/bin/sh\n' + body + '\n')
+        os.chmod(script, 0o755)
+        return script
+
+    def test_get_replicon_index(self):
+        line = 'UniRef90_P66818\t1\t100\t100.0\t33\tMQE\t1\t50.0\t'
+        self.assertEqual(unicycler.blast_func.get_replicon_index(line + 'replicon_12'), 12)
+        self.assertEqual(unicycler.blast_func.get_replicon_index(line + 'lcl|replicon_3'), 3)
+        self.assertEqual(unicycler.blast_func.get_replicon_index(line + 'gnl|BL_ORD_ID|2'), 2)
+        self.assertIsNone(unicycler.blast_func.get_replicon_index(line + 'something_else'))
@@ -0,0 +1,101 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import random
+import shutil
+import tempfile
+import unicycler.checkpoint
+import unicycler.assembly_graph
+import unicycler.log
+
+
+class TestStageManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_file = os.path.join(self.temp_dir, 'reads.fastq')
+        with open(self.input_file, 'wt') as f:
+            f.write('@a\nACGT\n+\nIIII\n')
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_keys(self, parameter=1):
+        manifest = unicycler.checkpoint.StageManifest(self.temp_dir)
+        key_1 = manifest.get_stage_key('stage_1', [self.input_file], {'a': parameter})
+        key_2 = manifest.get_stage_key('stage_2', [], {'b': 2})
+        return manifest, key_1, key_2
+
+    def test_keys_are_repeatable(self):
+        _, key_1a, key_2a = self.get_keys()
+        _, key_1b, key_2b = self.get_keys()
+        self.assertEqual(key_1a, key_1b)
+        self.assertEqual(key_2a, key_2b)
+        self.assertNotEqual(key_1a, key_2a)
+
+    def test_changed_parameter_changes_later_keys(self):
+        _, key_1a, key_2a = self.get_keys(parameter=1)
+        _, key_1b, key_2b = self.get_keys(parameter=2)
+        self.assertNotEqual(key_1a, key_1b)
+        self.assertNotEqual(key_2a, key_2b)
+
+    def test_changed_input_file_changes_key(self):
+        _, key_1a, _ = self.get_keys()
+        with open(self.input_file, 'at') as f:
+            f.write('@b\nACGT\n+\nIIII\n')
+        _, key_1b, _ = self.get_keys()
+        self.assertNotEqual(key_1a, key_1b)
+
+    def test_save_and_load(self):
+        manifest, key_1, key_2 = self.get_keys()
+        random.seed(123)
+        manifest.save_stage('stage_1', key_1, {'bridges': [1, 2, 3]})
+        expected_random = random.random()
+
+        random.seed(0)
+        manifest, key_1, key_2 = self.get_keys()
+        self.assertEqual(manifest.load_stage('stage_1', key_1), {'bridges': [1, 2, 3]})
+        self.assertEqual(random.random(), expected_random)
+        self.assertIsNone(manifest.load_stage('stage_2', key_2))
+
+    def test_load_with_wrong_key(self):
+        manifest, key_1, _ = self.get_keys(parameter=1)
+        manifest.save_stage('stage_1', key_1, 'state')
+        manifest, key_1, _ = self.get_keys(parameter=2)
+        self.assertIsNone(manifest.load_stage('stage_1', key_1))
+
+    def test_save_and_load_graph(self):
+        test_fastg = os.path.join(os.path.dirname(__file__), 'test_assembly_graph.fastg')
+        graph = unicycler.assembly_graph.AssemblyGraph(test_fastg, 25)
+        anchor_segments = [graph.segments[1], graph.segments[2]]
+        manifest, key_1, _ = self.get_keys()
+        manifest.save_stage('stage_1', key_1, (graph, anchor_segments))
+
+        manifest, key_1, _ = self.get_keys()
+        loaded_graph, loaded_anchors = manifest.load_stage('stage_1', key_1)
+        self.assertEqual(sorted(loaded_graph.segments), sorted(graph.segments))
+        self.assertEqual(loaded_graph.get_total_length(), graph.get_total_length())
+        self.assertEqual(loaded_graph.forward_links, graph.forward_links)
+        self.assertTrue(loaded_anchors[0] is loaded_graph.segments[1])
+
+    def test_delete(self):
+        manifest, key_1, _ = self.get_keys()
+        manifest.save_stage('stage_1', key_1, 'state')
+        self.assertTrue(os.path.isdir(os.path.join(self.temp_dir, 'checkpoints')))
+        manifest.delete()
+        self.assertFalse(os.path.isdir(os.path.join(self.temp_dir, 'checkpoints')))
+        manifest, key_1, _ = self.get_keys()
+        self.assertIsNone(manifest.load_stage('stage_1', key_1))
@@ -129,6 +129,60 @@ class TestPathAlignment(unittest.TestCase):
     pass
 
 
+class TestAlignmentResults(unittest.TestCase):
+    """
+    Tests that the struct versions of the C++ aligners give the same alignments as the string
+    versions.
+    """
+
+    def setUp(self):
+        test_fasta = os.path.join(os.path.dirname(__file__), 'test_cpp_wrappers.fasta')
+        fasta = unicycler.misc.load_fasta(test_fasta)
+        self.seqs = [x[1] for x in fasta]
+        self.scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+
+    def assert_same_alignment(self, result_str, result):
+        parts = result_str.split(',', 9)
+        self.assertEqual(result.rev_comp, parts[1] == '-')
+        self.assertEqual([result.read_start, result.read_end, result.ref_start, result.ref_end,
+                          result.raw_score], [int(x) for x in parts[2:7]])
+        self.assertAlmostEqual(result.scaled_score, float(parts[7]), places=5)
+        self.assertEqual(''.join(result.get_cigar_parts()), parts[9])
+
+    def test_fully_global_alignment(self):
+        for i in range(1, 8):
+            args = (self.seqs[0], self.seqs[i], self.scoring_scheme, True, 1000)
+            self.assert_same_alignment(
+                unicycler.cpp_wrappers.fully_global_alignment(*args),
+                unicycler.cpp_wrappers.fully_global_alignment_result(*args))
+
+    def test_path_alignment(self):
+        args = (self.seqs[8][:1000], self.seqs[10], self.scoring_scheme, True, 1000)
+        self.assert_same_alignment(unicycler.cpp_wrappers.path_alignment(*args),
+                                   unicycler.cpp_wrappers.path_alignment_result(*args))
+
+    def test_semi_global_alignment_exhaustive(self):
+        args = (self.seqs[0][10:], self.seqs[1], self.scoring_scheme)
+        result = unicycler.cpp_wrappers.semi_global_alignment_exhaustive_result(*args)
+        self.assert_same_alignment(
+            unicycler.cpp_wrappers.semi_global_alignment_exhaustive(*args), result)
+        self.assertEqual(result.get_cigar_parts(), ['10D', '10M'])
+
+    def test_cigar_runs(self):
+        result = unicycler.cpp_wrappers.fully_global_alignment_result(
+            self.seqs[0], self.seqs[3], self.scoring_scheme, True, 1000)
+        self.assertEqual(len(result.cigar_lengths), len(result.cigar_ops))
+        self.assertTrue('I' in result.cigar_ops or 'D' in result.cigar_ops)
+        self.assertTrue(all(x > 0 for x in result.cigar_lengths))
+
+    def test_overlap_alignment(self):
+        seq = self.seqs[8]
+        overlap_1, overlap_2 = unicycler.cpp_wrappers.overlap_alignment(
+            seq[:600], seq[400:], self.scoring_scheme, 200)
+        self.assertEqual(overlap_1, 200)
+        self.assertEqual(overlap_2, 200)
+
+
 class TestMultipleSequenceAlignment(unittest.TestCase):
 
     def setUp(self):
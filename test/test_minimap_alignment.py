@@ -0,0 +1,87 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import unicycler.cpp_wrappers
+import unicycler.minimap_alignment
+import unicycler.read_ref
+import unicycler.log
+import unicycler.settings
+
+
+class TestMinimapIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.ref_fasta = os.path.join(os.path.dirname(__file__), 'test_semi_global_alignment.fasta')
+        self.read_fastq = os.path.join(os.path.dirname(__file__),
+                                       'test_semi_global_alignment.fastq')
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+        refs = unicycler.read_ref.load_references(self.ref_fasta, section_header=None,
+                                                  show_progress=False)
+        self.references = [(x.name, x.sequence) for x in refs]
+        unicycler.minimap_alignment.clear_minimap_indices()
+
+    def tearDown(self):
+        unicycler.minimap_alignment.clear_minimap_indices()
+
+    def test_same_as_file_alignment(self):
+        for sensitivity_level in range(4):
+            from_file = unicycler.cpp_wrappers.minimap_align_reads(self.ref_fasta, self.read_fastq,
+                                                                   1, sensitivity_level)
+            from_index = unicycler.minimap_alignment.minimap_align_reads_to_references(
+                self.references, self.read_fastq, 1, sensitivity_level)
+            self.assertTrue(from_file)
+            self.assertEqual(sorted(from_file.splitlines()), sorted(from_index.splitlines()))
+
+    def test_index_reused(self):
+        indices = unicycler.minimap_alignment.MINIMAP_INDICES
+        first = unicycler.minimap_alignment.minimap_align_reads_to_references(
+            self.references, self.read_fastq, 1, 3)
+        self.assertEqual(len(indices), 1)
+        index_ptr = list(indices.values())[0]
+        second = unicycler.minimap_alignment.minimap_align_reads_to_references(
+            self.references, self.read_fastq, 1, 3)
+        self.assertEqual(first, second)
+        self.assertEqual(list(indices.values()), [index_ptr])
+
+    def test_least_recently_used_dropped(self):
+        indices = unicycler.minimap_alignment.MINIMAP_INDICES
+        cache_size = unicycler.settings.MINIMAP_INDEX_CACHE_SIZE
+        for sensitivity_level in range(cache_size + 1):
+            unicycler.minimap_alignment.minimap_align_reads_to_references(
+                self.references, self.read_fastq, 1, sensitivity_level)
+        self.assertEqual(len(indices), cache_size)
+        self.assertEqual([x[1] for x in indices.keys()], list(range(1, cache_size + 1)))
+
+    def test_clear_indices(self):
+        indices = unicycler.minimap_alignment.MINIMAP_INDICES
+        first = unicycler.minimap_alignment.minimap_align_reads_to_references(
+            self.references, self.read_fastq, 1, 3)
+        self.assertEqual(len(indices), 1)
+        unicycler.minimap_alignment.clear_minimap_indices()
+        self.assertEqual(len(indices), 0)
+        second = unicycler.minimap_alignment.minimap_align_reads_to_references(
+            self.references, self.read_fastq, 1, 3)
+        self.assertEqual(first, second)
+        self.assertEqual(len(indices), 1)
+
+    def test_different_references(self):
+        keys = set()
+        keys.add(unicycler.minimap_alignment.get_minimap_index_key(self.references, 0, 'default'))
+        keys.add(unicycler.minimap_alignment.get_minimap_index_key(self.references[1:], 0,
+                                                                   'default'))
+        keys.add(unicycler.minimap_alignment.get_minimap_index_key(self.references, 1, 'default'))
+        renamed = [('x' + name, seq) for name, seq in self.references]
+        keys.add(unicycler.minimap_alignment.get_minimap_index_key(renamed, 0, 'default'))
+        self.assertEqual(len(keys), 4)
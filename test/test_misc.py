@@ -64,6 +64,32 @@ class TestMiscFunctions(unittest.TestCase):
         self.assertEqual('tgACBWDARAYACHASKGVTMACnG',
                          unicycler.misc.reverse_complement('CnGTKABCMSTDGTRTYTHWVGTca'))
 
+    def test_reverse_complement_unknown_characters(self):
+        self.assertEqual('NNACGT', unicycler.misc.reverse_complement('ACGTXZ'))
+        self.assertEqual('N', unicycler.misc.reverse_complement('\t'))
+        self.assertEqual('NTNN', unicycler.misc.reverse_complement('\u03a9\u00e9A\U0001f600'))
+        self.assertEqual('NNTN', unicycler.misc.complement('\u03a9\u00e9A\U0001f600'))
+
+    def test_reverse_complement_matches_complement_base(self):
+        seq = ''.join(chr(i) for i in range(256))
+        expected = ''.join([unicycler.misc.complement_base(x) for x in seq][::-1])
+        self.assertEqual(expected, unicycler.misc.reverse_complement(seq))
+
+    def test_complement(self):
+        self.assertEqual('', unicycler.misc.complement(''))
+        self.assertEqual('TGCANn', unicycler.misc.complement('ACGTNn'))
+        self.assertEqual('tgcaYRN', unicycler.misc.complement('acgtRYX'))
+
+    def test_is_homopolymer(self):
+        self.assertFalse(unicycler.misc.is_homopolymer(''))
+        self.assertTrue(unicycler.misc.is_homopolymer('A'))
+        self.assertTrue(unicycler.misc.is_homopolymer('AAAAAA'))
+        self.assertTrue(unicycler.misc.is_homopolymer('aAaAAa'))
+        self.assertTrue(unicycler.misc.is_homopolymer('----'))
+        self.assertFalse(unicycler.misc.is_homopolymer('AAAAAC'))
+        self.assertFalse(unicycler.misc.is_homopolymer('CAAAAA'))
+        self.assertFalse(unicycler.misc.is_homopolymer('aaTaa'))
+
     def test_get_random_base(self):
         a_count, c_count, g_count, t_count, other_count = 0, 0, 0, 0, 0
         for i in range(10000):
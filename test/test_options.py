@@ -104,6 +104,7 @@ class TestUnicyclerOptions(unittest.TestCase):
         bowtie2_path_default = get_default_from_help('--bowtie2_path', help_text)
         bowtie2_build_path_default = get_default_from_help('--bowtie2_build_path', help_text)
         samtools_path_default = get_default_from_help('--samtools_path', help_text)
+        samtools_sort_mem_default = get_default_from_help('--samtools_sort_mem', help_text)
         pilon_path_default = get_default_from_help('--pilon_path', help_text)
         java_path_default = get_default_from_help('--java_path', help_text)
         min_polish_size_default = int(get_default_from_help('--min_polish_size', help_text))
@@ -131,6 +132,7 @@ class TestUnicyclerOptions(unittest.TestCase):
         self.assertEqual(args.bowtie2_path, bowtie2_path_default)
         self.assertEqual(args.bowtie2_build_path, bowtie2_build_path_default)
         self.assertEqual(args.samtools_path, samtools_path_default)
+        self.assertEqual(args.samtools_sort_mem, samtools_sort_mem_default)
         self.assertEqual(args.pilon_path, pilon_path_default)
         self.assertEqual(args.java_path, java_path_default)
         self.assertEqual(args.min_polish_size, min_polish_size_default)
@@ -0,0 +1,107 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import pickle
+import random
+import unicycler.packed_sequence
+import unicycler.assembly_graph_segment
+import unicycler.read_ref
+import unicycler.misc
+
+
+class TestPackedSequence(unittest.TestCase):
+
+    def test_round_trip(self):
+        for seq in ['', 'A', 'C', 'G', 'T', 'ACGT', 'TTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTTT',
+                    'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAA']:
+            packed = unicycler.packed_sequence.PackedSequence(seq)
+            self.assertEqual(packed.get_sequence(), seq)
+            self.assertEqual(len(packed), len(seq))
+
+    def test_round_trip_random(self):
+        random.seed(0)
+        for length in [1, 7, 8, 9, 100, 1000, 12345]:
+            seq = unicycler.misc.get_random_sequence(length)
+            packed = unicycler.packed_sequence.PackedSequence(seq)
+            self.assertEqual(packed.get_sequence(), seq)
+
+    def test_ambiguous_bases(self):
+        for seq in ['N', 'NNNN', 'ACGTNNNNACGT', 'NACGTN', 'ACRYKMACGTnnacgt', 'A-C.G?T']:
+            packed = unicycler.packed_sequence.PackedSequence(seq)
+            self.assertEqual(packed.get_sequence(), seq)
+        packed = unicycler.packed_sequence.PackedSequence('ACGTNNNNACGTRA')
+        self.assertEqual(packed.ambiguous_runs, [(4, 'NNNN'), (12, 'R')])
+
+    def test_pickle(self):
+        packed = unicycler.packed_sequence.PackedSequence('ACGTTGCANNAC')
+        unpickled = pickle.loads(pickle.dumps(packed))
+        self.assertEqual(packed, unpickled)
+        self.assertEqual(unpickled.get_sequence(), 'ACGTTGCANNAC')
+
+
+class TestPackedSegmentsAndReads(unittest.TestCase):
+
+    def setUp(self):
+        unicycler.assembly_graph_segment.Segment.pack_sequences = True
+        unicycler.read_ref.Read.pack_sequences = True
+
+    def tearDown(self):
+        unicycler.assembly_graph_segment.Segment.pack_sequences = False
+        unicycler.read_ref.Read.pack_sequences = False
+
+    def test_segment_sequences(self):
+        seg = unicycler.assembly_graph_segment.Segment(1, 1.0, 'AACGTTTG', True)
+        self.assertTrue(seg.packed_sequence is not None)
+        self.assertEqual(seg.forward_sequence, 'AACGTTTG')
+        self.assertEqual(seg.reverse_sequence, 'CAAACGTT')
+        self.assertEqual(seg.get_length(), 8)
+
+    def test_segment_from_reverse_sequence(self):
+        seg = unicycler.assembly_graph_segment.Segment(1, 1.0, 'CAAACGTT', False)
+        self.assertEqual(seg.forward_sequence, 'AACGTTTG')
+        self.assertEqual(seg.reverse_sequence, 'CAAACGTT')
+
+    def test_segment_edits(self):
+        seg = unicycler.assembly_graph_segment.Segment(1, 1.0, 'AACGTTTG', True)
+        seg.append_to_forward_sequence('CC')
+        self.assertEqual(seg.forward_sequence, 'AACGTTTGCC')
+        seg.prepend_to_reverse_sequence('AA')
+        self.assertEqual(seg.forward_sequence, 'AACGTTTGCCTT')
+        self.assertEqual(seg.reverse_sequence, 'AAGGCAAACGTT')
+        seg.trim_from_end(2)
+        seg.trim_from_start(1)
+        self.assertEqual(seg.forward_sequence, 'ACGTTTGCC')
+        self.assertEqual(seg.reverse_sequence, 'GGCAAACGT')
+        seg.rotate_sequence(3, True)
+        self.assertEqual(seg.forward_sequence, 'CGTGGCAAA')
+        seg.remove_sequence()
+        self.assertEqual(seg.forward_sequence, '')
+        self.assertEqual(seg.reverse_sequence, '')
+
+    def test_segment_matches_unpacked(self):
+        seg = unicycler.assembly_graph_segment.Segment(1, 1.0, 'ACGTNACGGT', True)
+        unicycler.assembly_graph_segment.Segment.pack_sequences = False
+        unpacked_seg = unicycler.assembly_graph_segment.Segment(1, 1.0, 'ACGTNACGGT', True)
+        unpacked_seg.build_other_sequence_if_necessary()
+        self.assertTrue(unpacked_seg.packed_sequence is None)
+        self.assertEqual(seg.forward_sequence, unpacked_seg.forward_sequence)
+        self.assertEqual(seg.reverse_sequence, unpacked_seg.reverse_sequence)
+        self.assertEqual(seg.gfa_segment_line(), unpacked_seg.gfa_segment_line())
+
+    def test_read(self):
+        read = unicycler.read_ref.Read('read', 'acgtn', None)
+        self.assertTrue(read.packed_sequence is not None)
+        self.assertEqual(read.sequence, 'ACGTN')
+        self.assertEqual(read.qualities, '+++++')
+        self.assertEqual(read.get_length(), 5)
@@ -0,0 +1,194 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import random
+import shutil
+import tempfile
+import unicycler.assembly_graph
+import unicycler.misc
+import unicycler.pilon_func
+
+
+class TestPilonWindows(unittest.TestCase):
+    """
+    Tests the window logic used by incremental Pilon polishing. Segment 1 is a circular 20 kb
+    sequence and segment 2 is a linear 30 kb sequence.
+    """
+
+    def setUp(self):
+        random.seed(0)
+        self.temp_dir = tempfile.mkdtemp()
+        self.seq_1 = unicycler.misc.get_random_sequence(20000)
+        self.seq_2 = unicycler.misc.get_random_sequence(30000)
+        gfa_filename = os.path.join(self.temp_dir, 'graph.gfa')
+        with open(gfa_filename, 'wt') as gfa:
+            gfa.write('S\t1\t' + self.seq_1 + '\tDP:f:1.0\n')
+            gfa.write('S\t2\t' + self.seq_2 + '\tDP:f:1.0\n')
+            gfa.write('L\t1\t+\t1\t+\t0M\n')
+        self.graph = unicycler.assembly_graph.AssemblyGraph(gfa_filename, 0)
+        self.seg_1 = self.graph.segments[1]
+        self.seg_2 = self.graph.segments[2]
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def get_full_round(self, changes):
+        pilon_round = unicycler.pilon_func.PilonRound()
+        pilon_round.references = {'1': (self.seg_1, 0, 20000, True),
+                                  '2': (self.seg_2, 0, 30000, False)}
+        pilon_round.changes = changes
+        pilon_round.change_count = len(changes)
+        return pilon_round
+
+    def test_parse_pilon_change_position(self):
+        self.assertEqual(unicycler.pilon_func.parse_pilon_change_position('12:345'),
+                         ('12', 344, 345))
+        self.assertEqual(unicycler.pilon_func.parse_pilon_change_position('12_pilon:345-350'),
+                         ('12_pilon', 344, 350))
+
+    def test_merge_windows_linear(self):
+        merged = unicycler.pilon_func.merge_windows([(-100, 200), (150, 400), (900, 1100)],
+                                                    1000, False)
+        self.assertEqual(merged, [(0, 400), (900, 1000)])
+
+    def test_merge_windows_circular(self):
+        merged = unicycler.pilon_func.merge_windows([(-100, 200), (500, 600), (950, 1050)],
+                                                    1000, True)
+        self.assertEqual(merged, [(500, 600), (900, 1200)])
+        self.assertIsNone(unicycler.pilon_func.merge_windows([(0, 600), (500, 1100)], 1000, True))
+
+    def test_rotation_out_of_windows(self):
+        windows = [(200, 300), (500, 600), (900, 1100)]
+        shift = unicycler.pilon_func.get_rotation_out_of_windows(windows, 1000)
+        self.assertEqual(shift, 750)
+
+    def test_windows_after_full_round(self):
+        # One change in the middle of the linear segment (a 2 bp insertion) and one near the end
+        # of the circular segment.
+        changes = [('2', 15000, 15000, 15000, 15002), ('1', 19900, 19901, 19900, 19901)]
+        pilon_round = self.get_full_round(changes)
+        windows = unicycler.pilon_func.get_polish_windows(self.graph, pilon_round, 1000, 10000)
+
+        # The circular segment's change window overlaps with the window over its ends, so it
+        # was rotated to put them in one window.
+        self.assertEqual(len(windows), 2)
+        self.assertEqual(windows[1], (self.seg_2, 14000, 16002))
+        segment, start, end = windows[0]
+        self.assertIs(segment, self.seg_1)
+        self.assertEqual(end - start, 2100)
+        rotated_seq = self.seg_1.forward_sequence
+        self.assertNotEqual(rotated_seq, self.seq_1)
+        self.assertEqual(rotated_seq[start:end], (self.seq_1 * 2)[18900:21000])
+
+    def test_read_regions(self):
+        changes = [('2', 15000, 15000, 15000, 15002), ('1', 5000, 5001, 5000, 5001)]
+        regions = unicycler.pilon_func.get_read_regions(self.get_full_round(changes), 1000)
+        self.assertEqual(regions, ['1:4001-6001', '1:19001-20000', '1:1-1000', '2:14001-16000'])
+
+    def test_too_many_windows(self):
+        changes = [('2', x, x + 1, x, x + 1) for x in range(0, 30000, 1500)]
+        pilon_round = self.get_full_round(changes)
+        self.assertIsNone(unicycler.pilon_func.get_polish_windows(self.graph, pilon_round, 1000,
+                                                                  10000))
+
+    def test_apply_polished_sequences(self):
+        pilon_round = unicycler.pilon_func.PilonRound()
+        pilon_round.references = {'window_1': (self.seg_2, 1000, 100, False),
+                                  'window_2': (self.seg_2, 5000, 100, False)}
+        polished_sequences = {'window_1': 'A' * 50, 'window_2': 'C' * 200}
+        unicycler.pilon_func.apply_polished_sequences(pilon_round, polished_sequences)
+        self.assertEqual(self.seg_2.forward_sequence,
+                         self.seq_2[:1000] + 'A' * 50 + self.seq_2[1100:5000] + 'C' * 200 +
+                         self.seq_2[5100:])
+        self.assertEqual(self.seg_2.reverse_sequence,
+                         unicycler.misc.reverse_complement(self.seg_2.forward_sequence))
+
+        # The second window moved because the first got shorter.
+        self.assertEqual(pilon_round.references['window_1'][1], 1000)
+        self.assertEqual(pilon_round.references['window_2'][1], 4950)
+
+    def test_no_reads_near_changes(self):
+        class Args(object):
+            pass
+        args = Args()
+        args.keep, args.pilon_incremental, args.samtools_path = 0, True, 'samtools'
+        previous_round = self.get_full_round([('2', 15000, 15000, 15000, 15002)])
+        windows = [(self.seg_2, 14000, 16002)]
+        starting_dir = os.getcwd()
+        os.chdir(self.temp_dir)
+        try:
+            this_round = unicycler.pilon_func.polish_with_pilon(
+                self.graph, args, self.temp_dir, 0, 1000, 2, 'bases', windows, previous_round,
+                1000)
+        finally:
+            os.chdir(starting_dir)
+        self.assertEqual(this_round.change_count, 0)
+        self.assertEqual(sorted(os.listdir(self.temp_dir)), ['graph.gfa'])
+
+
+class TestBowtieSamtoolsPipe(unittest.TestCase):
+    """
+    Tests the error reporting of the Bowtie2 | samtools sort pipe, using shell scripts in place of
+    the real tools.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.bam = os.path.join(self.temp_dir, 'alignments.bam')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def make_script(self, name, body):
+        script = os.path.join(self.temp_dir, name)
+        with open(script, 'wt') as script_file:
+            script_file.write('#!/bin/sh\n' + body + '\n')
+        os.chmod(script, 0o755)
+        return script
+
+    def get_args(self, samtools_body):
+        class Args(object):
+            pass
+        args = Args()
+        args.samtools_path = self.make_script('samtools', samtools_body)
+        args.threads = 1
+        args.samtools_sort_mem = '768M'
+        return args
+
+    def run_pipe(self, bowtie2_body, samtools_body):
+        args = self.get_args(samtools_body)
+        bowtie2 = self.make_script('bowtie2', bowtie2_body)
+        unicycler.pilon_func.run_bowtie_samtools_commands(args, [bowtie2], self.bam)
+
+    def test_bowtie2_error(self):
+        samtools = 'if [ "$1" = sort ]; then cat > /dev/null; ' \
+                   'echo "[E::sam_parse] failed to read header" >&2; exit 1; fi'
+        with self.assertRaises(unicycler.pilon_func.CannotPolish) as context:
+            self.run_pipe('echo "Could not locate a Bowtie index" >&2\nexit 1', samtools)
+        self.assertIn('Bowtie2', context.exception.message)
+        self.assertIn('Could not locate a Bowtie index', context.exception.message)
+
+    def test_samtools_error(self):
+        samtools = 'if [ "$1" = sort ]; then echo "sort: bad memory value" >&2; exit 1; fi'
+        with self.assertRaises(unicycler.pilon_func.CannotPolish) as context:
+            self.run_pipe('yes "@SQ\tSN:1\tLN:100"', samtools)
+        self.assertIn('Samtools', context.exception.message)
+        self.assertIn('bad memory value', context.exception.message)
+
+    def test_success(self):
+        samtools = 'if [ "$1" = sort ]; then cat > "$7"; fi'
+        self.run_pipe('echo "@SQ\tSN:1\tLN:100"', samtools)
+        with open(self.bam, 'rt') as bam:
+            self.assertEqual(bam.read(), '@SQ\tSN:1\tLN:100\n')
@@ -0,0 +1,104 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import unicycler.alignment
+import unicycler.random_alignment_cache
+
+
+class TestRandomAlignmentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_cache_dir = os.environ.get('UNICYCLER_CACHE_DIR')
+        os.environ['UNICYCLER_CACHE_DIR'] = self.temp_dir
+        unicycler.random_alignment_cache.MEMO.clear()
+        self.scoring_scheme = unicycler.alignment.AlignmentScoringScheme('2,-7,-4,-3')
+        self.calculations = []
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        if self.old_cache_dir is None:
+            del os.environ['UNICYCLER_CACHE_DIR']
+        else:
+            os.environ['UNICYCLER_CACHE_DIR'] = self.old_cache_dir
+        unicycler.random_alignment_cache.MEMO.clear()
+
+    def calculate(self, seq_length, count, scoring_scheme):
+        self.calculations.append((seq_length, count, str(scoring_scheme)))
+        return [float(seq_length), float(count)]
+
+    def get_result(self, seq_length=100, count=10):
+        return unicycler.random_alignment_cache.get_cached_result('test', seq_length, count,
+                                                                  self.scoring_scheme,
+                                                                  self.calculate)
+
+    def test_memo(self):
+        self.assertEqual(self.get_result(), [100.0, 10.0])
+        self.assertEqual(self.get_result(), [100.0, 10.0])
+        self.assertEqual(len(self.calculations), 1)
+        self.assertEqual(self.get_result(200), [200.0, 10.0])
+        self.assertEqual(len(self.calculations), 2)
+
+    def test_file_cache(self):
+        self.get_result()
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'random_alignments.json')))
+
+        # A new process (simulated by clearing the memo) uses the file instead of recalculating.
+        unicycler.random_alignment_cache.MEMO.clear()
+        self.assertEqual(self.get_result(), [100.0, 10.0])
+        self.assertEqual(len(self.calculations), 1)
+
+    def test_different_build(self):
+        self.get_result()
+        cache_filename = unicycler.random_alignment_cache.get_cache_filename()
+        with open(cache_filename, 'rt') as cache_file:
+            contents = cache_file.read()
+        with open(cache_filename, 'wt') as cache_file:
+            cache_file.write(contents.replace(unicycler.random_alignment_cache.__version__,
+                                              'old version'))
+        unicycler.random_alignment_cache.MEMO.clear()
+        self.get_result()
+        self.assertEqual(len(self.calculations), 2)
+
+    def test_no_file_cache(self):
+        os.environ['UNICYCLER_CACHE_DIR'] = ''
+        self.assertIsNone(unicycler.random_alignment_cache.get_cache_filename())
+        self.get_result()
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+    def test_real_calibration(self):
+        mean, std_dev = unicycler.random_alignment_cache.\
+            cached_random_sequence_alignment_mean_and_std_dev(100, 100, self.scoring_scheme)
+        unicycler.random_alignment_cache.MEMO.clear()
+        self.assertEqual(unicycler.random_alignment_cache.
+                         cached_random_sequence_alignment_mean_and_std_dev(100, 100,
+                                                                           self.scoring_scheme),
+                         (mean, std_dev))
+
+    def test_depth_distributions(self):
+        read_lengths = [1000, 2000, 1500, 1000, 3000] * 20
+        min_dist, max_dist = unicycler.random_alignment_cache.\
+            cached_depth_distributions(read_lengths, 10000, 100, 1)
+        self.assertAlmostEqual(sum(min_dist), 1.0)
+        self.assertAlmostEqual(sum(max_dist), 1.0)
+
+        # The read order isn't part of the key, so shuffled reads use the cached result.
+        unicycler.random_alignment_cache.MEMO.clear()
+        cached_min_dist, cached_max_dist = unicycler.random_alignment_cache.\
+            cached_depth_distributions(sorted(read_lengths), 10000, 100, 1)
+        self.assertEqual(cached_min_dist, min_dist)
+        self.assertEqual(cached_max_dist, max_dist)
@@ -0,0 +1,104 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import gzip
+import shutil
+import tempfile
+import unicycler.read_ref
+
+
+class TestLoadLongReads(unittest.TestCase):
+
+    def setUp(self):
+        self.test_fastq = os.path.join(os.path.dirname(__file__), 'test_misc.fastq')
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_load_fastq(self):
+        read_dict, read_names, filename = \
+            unicycler.read_ref.load_long_reads(self.test_fastq, silent=True)
+        self.assertEqual(read_names, ['read_1', 'read_2', 'read_3'])
+        self.assertEqual(filename, self.test_fastq)
+        self.assertTrue(read_dict['read_1'].sequence.startswith('GTTACTTCGATATCCGCCATGTG'))
+        self.assertTrue(read_dict['read_3'].qualities.startswith('BABCBGGGGGGG'))
+
+    def test_load_gzipped_fasta(self):
+        gzipped_fasta = os.path.join(self.temp_dir, 'reads.fasta.gz')
+        with gzip.open(gzipped_fasta, 'wt') as f:
+            f.write('>a description\nACGT\nacgt\n>b\nGGGG\n')
+        read_dict, read_names, _ = unicycler.read_ref.load_long_reads(gzipped_fasta, silent=True)
+        self.assertEqual(read_names, ['a', 'b'])
+        self.assertEqual(read_dict['a'].sequence, 'ACGTACGT')
+        self.assertEqual(read_dict['b'].qualities, '++++')
+
+    def test_indexed_reads_match_in_memory_reads(self):
+        read_dict, read_names, _ = \
+            unicycler.read_ref.load_long_reads(self.test_fastq, silent=True)
+        indexed_dict, indexed_names, _ = \
+            unicycler.read_ref.load_long_reads(self.test_fastq, silent=True,
+                                               index_dir=self.temp_dir)
+        self.assertEqual(read_names, indexed_names)
+        for name in read_names:
+            self.assertTrue(isinstance(indexed_dict[name], unicycler.read_ref.IndexedRead))
+            self.assertEqual(read_dict[name].sequence, indexed_dict[name].sequence)
+            self.assertEqual(read_dict[name].qualities, indexed_dict[name].qualities)
+            self.assertEqual(read_dict[name].get_length(), indexed_dict[name].get_length())
+            self.assertEqual(read_dict[name].get_fastq(), indexed_dict[name].get_fastq())
+        self.assertTrue(os.path.isfile(os.path.join(self.temp_dir, 'long_reads.index')))
+
+    def test_indexed_reads_quality_length_mismatch(self):
+        bad_fastq = os.path.join(self.temp_dir, 'reads.fastq')
+        with open(bad_fastq, 'wt') as f:
+            f.write('@a\nACGTACGT\n+\nBBBB\n@b\nGGGG\n+\nBBBB\n')
+        with self.assertRaises(SystemExit):
+            unicycler.read_ref.load_long_reads(bad_fastq, silent=True, index_dir=self.temp_dir)
+        self.assertFalse(os.path.isfile(os.path.join(self.temp_dir, 'long_reads.index')))
+
+    def test_index_reused(self):
+        _, read_names, _ = unicycler.read_ref.load_long_reads(self.test_fastq, silent=True,
+                                                              index_dir=self.temp_dir)
+        store = unicycler.read_ref.ReadStore(self.temp_dir)
+        entries = store.load_index(self.test_fastq)
+        self.assertEqual([x[0] for x in entries], read_names)
+        self.assertTrue(store.reused)
+
+        reused_dict, reused_names, _ = \
+            unicycler.read_ref.load_long_reads(self.test_fastq, silent=True,
+                                               index_dir=self.temp_dir)
+        self.assertEqual(read_names, reused_names)
+        self.assertTrue(reused_dict['read_2'].read_store.reused)
+        self.assertTrue(reused_dict['read_2'].sequence.startswith('CACATACAGGCAGAGTGG'))
+
+    def test_index_not_reused_for_other_file(self):
+        unicycler.read_ref.load_long_reads(self.test_fastq, silent=True, index_dir=self.temp_dir)
+        other_fastq = os.path.join(self.temp_dir, 'other.fastq')
+        with open(other_fastq, 'wt') as f:
+            f.write('@x\nACGT\n+\nIIII\n')
+        store = unicycler.read_ref.ReadStore(self.temp_dir)
+        self.assertIsNone(store.load_index(other_fastq))
+
+    def test_duplicate_read_names(self):
+        dup_fastq = os.path.join(self.temp_dir, 'dup.fastq')
+        with open(dup_fastq, 'wt') as f:
+            f.write('@x\nACGT\n+\nIIII\n@x\nTTTT\n+\nIIII\n')
+        read_dict, read_names, filename = \
+            unicycler.read_ref.load_long_reads(dup_fastq, silent=True, output_dir=self.temp_dir,
+                                               index_dir=self.temp_dir)
+        self.assertEqual(read_names, ['x', 'x_2'])
+        self.assertEqual(read_dict['x_2'].sequence, 'TTTT')
+        self.assertTrue(filename.endswith('dup_no_duplicates.fastq.gz'))
+        self.assertTrue(os.path.isfile(filename))
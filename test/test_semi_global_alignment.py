@@ -13,10 +13,13 @@ not, see <http://www.gnu.org/licenses/>.
 
 import unittest
 import os
+import shutil
+import tempfile
 import unicycler.read_ref
 import unicycler.alignment
 import unicycler.unicycler_align
 import unicycler.log
+import unicycler.settings
 
 
 class TestPerfectMatchAlignments(unittest.TestCase):
@@ -34,7 +37,7 @@ class TestPerfectMatchAlignments(unittest.TestCase):
         allowed_overlap = 0
         verbosity = 0
         self.aligned_reads = unicycler.unicycler_align.\
-                semi_global_align_long_reads(refs, ref_fasta, read_dict, read_names, read_fastq,
+                semi_global_align_long_reads(refs, read_dict, read_names, read_fastq,
                                              threads, scoring_scheme, [None], False,
                                              min_align_length, None, None, allowed_overlap,
                                              sensitivity_level, contamination_fasta, verbosity)
@@ -271,7 +274,7 @@ class TestContainedReadAlignments(unittest.TestCase):
         allowed_overlap = 0
         verbosity = 0
         self.aligned_reads = unicycler.unicycler_align.\
-                semi_global_align_long_reads(refs, self.temp_fasta, read_dict, read_names,
+                semi_global_align_long_reads(refs, read_dict, read_names,
                                              self.temp_fastq, threads, scoring_scheme, [None],
                                              False, min_align_length, None, None, allowed_overlap,
                                              sensitivity_level, contamination_fasta, verbosity)
@@ -368,7 +371,7 @@ class TestToughAlignments(unittest.TestCase):
         allowed_overlap = 0
         verbosity = 0
         self.aligned_reads = unicycler.unicycler_align.\
-                semi_global_align_long_reads(refs, self.temp_fasta, read_dict, read_names,
+                semi_global_align_long_reads(refs, read_dict, read_names,
                                              self.temp_fastq, threads, scoring_scheme, [None],
                                              False, min_align_length, None, None, allowed_overlap,
                                              sensitivity_level, contamination_fasta, verbosity)
@@ -662,3 +665,63 @@ class TestToughAlignments(unittest.TestCase):
         _, read_end = alignment_2.read_start_end_positive_strand()
         self.assertEqual(read_start, 0)    # start of read
         self.assertEqual(read_end, 4144)  # end of read
+
+
+class TestMultiThreadedAlignments(unittest.TestCase):
+    """
+    Multi-threaded alignment (with either the C++ batch aligner or a process pool) should give the
+    same results as single-threaded alignment.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def align(self, threads, use_processes, sam_name, sensitivity_level=0):
+        ref_fasta = os.path.join(os.path.dirname(__file__), 'test_semi_global_alignment.fasta')
+        read_fastq = os.path.join(os.path.dirname(__file__), 'test_semi_global_alignment.fastq')
+        refs = unicycler.read_ref.load_references(ref_fasta)
+        read_dict, read_names, _ = unicycler.read_ref.load_long_reads(read_fastq)
+        scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+        sam_filename = os.path.join(self.temp_dir, sam_name)
+        unicycler.unicycler_align.\
+            semi_global_align_long_reads(refs, read_dict, read_names, read_fastq,
+                                         threads, scoring_scheme, [None], False, 10, sam_filename,
+                                         None, 0, sensitivity_level, None, 0,
+                                         use_processes=use_processes)
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+        with open(sam_filename, 'rt') as sam_file:
+            sam_lines = sorted(sam_file.readlines())
+        return read_dict, sam_lines
+
+    def assert_same_results(self, results_1, results_2):
+        read_dict_1, sam_lines_1 = results_1
+        read_dict_2, sam_lines_2 = results_2
+        self.assertEqual(sorted(read_dict_1), sorted(read_dict_2))
+        for read_name, read in read_dict_1.items():
+            self.assertEqual([str(x) for x in read.alignments],
+                             [str(x) for x in read_dict_2[read_name].alignments])
+        self.assertEqual(sam_lines_1, sam_lines_2)
+
+    def test_batches_match_single_thread(self):
+        self.assert_same_results(self.align(1, False, 'single_thread.sam'),
+                                 self.align(4, False, 'batches.sam'))
+
+    def test_batches_match_single_thread_high_sensitivity(self):
+        self.assert_same_results(self.align(1, False, 'single_thread.sam', 2),
+                                 self.align(4, False, 'batches.sam', 2))
+
+    def test_multiple_batches_match_single_thread(self):
+        batch_reads_per_thread = unicycler.settings.ALIGNMENT_BATCH_READS_PER_THREAD
+        unicycler.settings.ALIGNMENT_BATCH_READS_PER_THREAD = 1
+        try:
+            self.assert_same_results(self.align(1, False, 'single_thread.sam'),
+                                     self.align(2, False, 'batches.sam'))
+        finally:
+            unicycler.settings.ALIGNMENT_BATCH_READS_PER_THREAD = batch_reads_per_thread
+
+    def test_processes_match_single_thread(self):
+        self.assert_same_results(self.align(1, False, 'single_thread.sam'),
+                                 self.align(4, True, 'processes.sam'))
@@ -13,7 +13,11 @@ not, see <http://www.gnu.org/licenses/>.
 
 import unittest
 import os
+import multiprocessing
+import shutil
+import tempfile
 import unicycler.spades_func
+import unicycler.log
 
 
 class TestSPAdesFunc(unittest.TestCase):
@@ -45,3 +49,40 @@ class TestSPAdesFunc(unittest.TestCase):
         test_fastq = os.path.join(os.path.dirname(__file__), 'test_bad_reads_2.fastq')
         with self.assertRaises(unicycler.spades_func.BadFastq):
             unicycler.spades_func.get_read_count(test_fastq)
+
+    def test_score_spades_graphs_parallel_matches_serial(self):
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+        test_fastg = os.path.join(os.path.dirname(__file__), 'test_assembly_graph.fastg')
+        graph_files = [test_fastg, None, test_fastg]
+        kmer_range = [21, 25, 25]
+        temp_dir = tempfile.mkdtemp()
+        try:
+            serial_results = \
+                unicycler.spades_func.score_spades_graphs(graph_files, kmer_range, None, None,
+                                                          0.25, False, 0, temp_dir, 2, 1)
+            parallel_results = \
+                unicycler.spades_func.score_spades_graphs(graph_files, kmer_range, None, None,
+                                                          0.25, False, 0, temp_dir, 2, 3)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(serial_results, parallel_results)
+        self.assertEqual(len(serial_results), 3)
+        self.assertEqual(serial_results[1], (['25', '', '', '', '', '', '', '', 'failed'], 0.0))
+        self.assertTrue(serial_results[0][1] > 0.0)
+
+    def test_score_spades_graphs_parallel_error(self):
+        # A graph which fails to load raises its error and the worker processes are stopped.
+        unicycler.log.logger = unicycler.log.Log(log_filename=None, stdout_verbosity_level=0)
+        test_fastg = os.path.join(os.path.dirname(__file__), 'test_assembly_graph.fastg')
+        temp_dir = tempfile.mkdtemp()
+        try:
+            bad_fastg = os.path.join(temp_dir, 'bad.fastg')
+            with open(bad_fastg, 'wt') as bad_file:
+                bad_file.write('>EDGE_1_length_5_cov_abc;\nACGTA\n')
+            with self.assertRaises(ValueError):
+                unicycler.spades_func.score_spades_graphs([test_fastg, bad_fastg], [21, 25],
+                                                          None, None, 0.25, False, 0, temp_dir,
+                                                          2, 2)
+        finally:
+            shutil.rmtree(temp_dir)
+        self.assertEqual(multiprocessing.active_children(), [])
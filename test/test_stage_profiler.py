@@ -0,0 +1,64 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import json
+import os
+import shutil
+import tempfile
+import unicycler.stage_profiler
+
+
+class TestStageProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.profile_filename = unicycler.stage_profiler.get_profile_filename(self.temp_dir)
+        self.profiler = unicycler.stage_profiler.StageProfiler(self.profile_filename, 'test')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def load_profile(self):
+        with open(self.profile_filename, 'rt') as profile_file:
+            return json.load(profile_file)
+
+    def test_stages(self):
+        with self.profiler.stage('first') as counts:
+            counts['items'] = sum(range(100000))
+        with self.profiler.stage('second'):
+            pass
+        profile = self.load_profile()
+        self.assertEqual(profile['command'], 'test')
+        self.assertEqual([x['name'] for x in profile['stages']], ['first', 'second'])
+        self.assertEqual(profile['stages'][0]['counts'], {'items': 4999950000})
+        self.assertEqual(profile['stages'][1]['counts'], {})
+        for record in profile['stages'] + [profile['total']]:
+            self.assertGreaterEqual(record['wall_seconds'], 0.0)
+            self.assertGreaterEqual(record['cpu_seconds'], 0.0)
+            self.assertGreater(record['peak_rss_mb'], 0.0)
+        self.assertGreaterEqual(profile['total']['wall_seconds'],
+                                profile['stages'][0]['wall_seconds'])
+
+    def test_stage_with_exception(self):
+        with self.assertRaises(ValueError):
+            with self.profiler.stage('failed'):
+                raise ValueError
+        self.assertEqual([x['name'] for x in self.load_profile()['stages']], ['failed'])
+
+    def test_no_filename(self):
+        profiler = unicycler.stage_profiler.StageProfiler()
+        with profiler.stage('unsaved'):
+            pass
+        self.assertEqual(len(profiler.stages), 1)
+        self.assertEqual(os.listdir(self.temp_dir), [])
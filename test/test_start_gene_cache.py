@@ -0,0 +1,110 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import unicycler.blast_func
+import unicycler.start_gene_cache
+
+
+class TestStartGeneCache(unittest.TestCase):
+    """
+    Tests the start gene search cache, using a stand-in for the BLAST search which finds a 'gene'
+    at the first 'ATG' in each sequence.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.old_cache_dir = os.environ.get('UNICYCLER_CACHE_DIR')
+        os.environ['UNICYCLER_CACHE_DIR'] = self.temp_dir
+        self.start_genes = os.path.join(os.path.dirname(__file__),
+                                        'test_blast_func_start_genes.fasta')
+        self.searched = []
+        self.real_find_start_genes = unicycler.start_gene_cache.find_start_genes
+        unicycler.start_gene_cache.find_start_genes = self.find_start_genes
+
+    def tearDown(self):
+        unicycler.start_gene_cache.find_start_genes = self.real_find_start_genes
+        shutil.rmtree(self.temp_dir)
+        if self.old_cache_dir is None:
+            del os.environ['UNICYCLER_CACHE_DIR']
+        else:
+            os.environ['UNICYCLER_CACHE_DIR'] = self.old_cache_dir
+
+    def failed_find_start_genes(self, sequences, *args):
+        self.searched += sequences
+        raise unicycler.blast_func.CannotFindStart
+
+    def find_start_genes(self, sequences, start_genes_fasta, identity_threshold,
+                         coverage_threshold, blast_dir, makeblastdb_path, tblastn_path, threads):
+        self.searched += sequences
+        hits = []
+        for sequence in sequences:
+            if 'ATG' not in sequence:
+                hits.append(None)
+                continue
+            hit = unicycler.blast_func.BlastHit('', len(sequence))
+            hit.qseqid, hit.start_pos, hit.pident, hit.query_cov, hit.bitscore = \
+                'gene', sequence.index('ATG'), 100.0, 100.0, 50.0
+            hits.append(hit)
+        return hits
+
+    def search(self, sequences, identity_threshold=90.0):
+        return unicycler.start_gene_cache.cached_find_start_genes(
+            sequences, self.start_genes, identity_threshold, 95.0, self.temp_dir, 'makeblastdb',
+            'tblastn', 1)
+
+    def test_cache(self):
+        hits = self.search(['CCATGCC', 'CCCCCCC'])
+        self.assertEqual(self.searched, ['CCATGCC', 'CCCCCCC'])
+        self.assertEqual(hits[0].start_pos, 2)
+        self.assertIsNone(hits[1])
+
+        # Only the new sequence is searched, and the cached hit comes back the same.
+        hits = self.search(['GGGGATG', 'CCATGCC', 'CCCCCCC'])
+        self.assertEqual(self.searched, ['CCATGCC', 'CCCCCCC', 'GGGGATG'])
+        self.assertEqual([x.start_pos if x else None for x in hits], [4, 2, None])
+        self.assertEqual((hits[1].qseqid, hits[1].flip, hits[1].pident, hits[1].query_cov),
+                         ('gene', False, 100.0, 100.0))
+
+    def test_different_thresholds(self):
+        self.search(['CCATGCC'])
+        self.search(['CCATGCC'], identity_threshold=80.0)
+        self.assertEqual(self.searched, ['CCATGCC', 'CCATGCC'])
+
+    def test_no_file_cache(self):
+        os.environ['UNICYCLER_CACHE_DIR'] = ''
+        self.search(['CCATGCC'])
+        self.search(['CCATGCC'])
+        self.assertEqual(self.searched, ['CCATGCC', 'CCATGCC'])
+
+    def test_failed_search_not_cached(self):
+        unicycler.start_gene_cache.find_start_genes = self.failed_find_start_genes
+        with self.assertRaises(unicycler.blast_func.CannotFindStart):
+            self.search(['CCATGCC'])
+        unicycler.start_gene_cache.find_start_genes = self.find_start_genes
+        hits = self.search(['CCATGCC'])
+        self.assertEqual(self.searched, ['CCATGCC', 'CCATGCC'])
+        self.assertEqual(hits[0].start_pos, 2)
+
+    def test_failed_search_uses_cached_results(self):
+        self.search(['CCATGCC'])
+        unicycler.start_gene_cache.find_start_genes = self.failed_find_start_genes
+        hits = self.search(['CCATGCC', 'GGGGATG'])
+        self.assertEqual([x.start_pos if x else None for x in hits], [2, None])
+        unicycler.start_gene_cache.find_start_genes = self.find_start_genes
+        hits = self.search(['CCATGCC', 'GGGGATG'])
+        self.assertEqual(self.searched, ['CCATGCC', 'GGGGATG', 'GGGGATG'])
+        self.assertEqual([x.start_pos for x in hits], [2, 4])
@@ -0,0 +1,230 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import unittest
+import os
+import shutil
+import tempfile
+import random
+import unicycler.misc
+import unicycler.read_ref
+import unicycler.alignment
+import unicycler.unicycler_align
+import unicycler.unicycler_check
+import unicycler.log
+
+
+class TestCounting(unittest.TestCase):
+    """
+    Tests the per-base and per-window depth and error counts against a few hand-built alignments.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        ref_seq = 'ACGTTGCAACGTTGCAACGT'
+        ref_fasta = os.path.join(self.temp_dir, 'ref.fasta')
+        with open(ref_fasta, 'wt') as fasta:
+            fasta.write('>ref\n' + ref_seq + '\n')
+
+        # Read b has a 2 bp deletion at ref positions 6-7, read c has a 1 bp insertion before ref
+        # position 7 and a mismatch at ref position 9, and read d has a soft clip and a mismatch
+        # at ref position 15.
+        reads = [('a', 1, '10M', ref_seq[0:10]),
+                 ('b', 3, '4M2D4M', ref_seq[2:6] + ref_seq[8:12]),
+                 ('c', 5, '3M1I5M', ref_seq[4:7] + 'T' + ref_seq[7:9] + 'G' + ref_seq[10:12]),
+                 ('d', 11, '2S8M', 'GG' + ref_seq[10:15] + 'T' + ref_seq[16:18])]
+        read_fastq = os.path.join(self.temp_dir, 'reads.fastq')
+        sam_filename = os.path.join(self.temp_dir, 'alignments.sam')
+        with open(read_fastq, 'wt') as fastq, open(sam_filename, 'wt') as sam_file:
+            for name, pos, cigar, seq in reads:
+                fastq.write('@' + name + '\n' + seq + '\n+\n' + 'I' * len(seq) + '\n')
+                sam_file.write('\t'.join([name, '0', 'ref', str(pos), '60', cigar, '*', '0', '0',
+                                          seq, 'I' * len(seq)]) + '\n')
+
+        self.references = unicycler.read_ref.load_references(ref_fasta, show_progress=False)
+        self.reference_dict = {x.name: x for x in self.references}
+        read_dict, _, _ = unicycler.read_ref.load_long_reads(read_fastq)
+        scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+        self.alignments = unicycler.unicycler_align.load_sam_alignments(sam_filename, read_dict,
+                                                                        self.reference_dict,
+                                                                        scoring_scheme)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_per_base_counts(self):
+        unicycler.unicycler_check.count_depth_and_errors_per_base(self.references,
+                                                                  self.reference_dict,
+                                                                  self.alignments)
+        ref = self.references[0]
+        self.assertEqual(ref.alignment_count, 4)
+        self.assertEqual(ref.depths, [1, 1, 2, 2, 3, 3, 3, 3, 3, 3,
+                                      3, 3, 1, 1, 1, 1, 1, 1, 0, 0])
+        self.assertEqual(ref.mismatch_counts, [0, 0, 0, 0, 0, 0, 0, 0, 0, 1,
+                                               0, 0, 0, 0, 0, 1, 0, 0, 0, 0])
+        self.assertEqual(ref.insertion_counts, [0, 0, 0, 0, 0, 0, 0, 1, 0, 0,
+                                                0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(ref.deletion_counts, [0, 0, 0, 0, 0, 0, 1, 1, 0, 0,
+                                               0, 0, 0, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(ref.error_rates[:6], [0.0] * 6)
+        self.assertAlmostEqual(ref.error_rates[6], 1 / 3)
+        self.assertAlmostEqual(ref.error_rates[7], 2 / 3)
+        self.assertAlmostEqual(ref.error_rates[9], 1 / 3)
+        self.assertAlmostEqual(ref.error_rates[15], 1.0)
+        self.assertEqual(ref.error_rates[18:], [None, None])
+
+    def test_per_window_counts(self):
+        unicycler.unicycler_check.count_depth_and_errors_per_base(self.references,
+                                                                  self.reference_dict,
+                                                                  self.alignments)
+        ref = self.references[0]
+        ref.low_depth_cutoff, ref.very_low_depth_cutoff = 0.0, 0.0
+        ref.high_depth_cutoff, ref.very_high_depth_cutoff = 100.0, 100.0
+        unicycler.unicycler_check.count_depth_and_errors_per_window(self.references, 5, 5,
+                                                                    0.2, 0.3)
+        self.assertEqual(ref.er_window_starts, [0, 5, 10, 15])
+        self.assertEqual(ref.depth_window_starts, [0, 5, 10, 15])
+        self.assertEqual(ref.window_depths, [1.8, 3.0, 1.8, 0.6])
+        self.assertEqual(len(ref.window_error_rates), 4)
+        self.assertAlmostEqual(ref.window_error_rates[0], 0.0)
+        self.assertAlmostEqual(ref.window_error_rates[1], 4 / 15)
+        self.assertAlmostEqual(ref.window_error_rates[2], 0.0)
+        self.assertAlmostEqual(ref.window_error_rates[3], 1 / 3)
+        self.assertEqual(ref.high_error_regions, [(15, 20)])
+
+
+class TestStreaming(unittest.TestCase):
+    """
+    Streaming mode should give the same window and base tables as loading all of the alignments,
+    and it should refuse a SAM file which isn't coordinate-sorted.
+    """
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.scoring_scheme = unicycler.alignment.AlignmentScoringScheme('3,-6,-5,-2')
+        self.window_size = 100
+
+        random.seed(0)
+        refs = [''.join(random.choice('ACGT') for _ in range(600)) for _ in range(2)]
+        self.ref_fasta = os.path.join(self.temp_dir, 'ref.fasta')
+        with open(self.ref_fasta, 'wt') as fasta:
+            for i, ref_seq in enumerate(refs):
+                fasta.write('>' + str(i) + '\n' + ref_seq + '\n')
+
+        # Each read is (name, flag, ref, 1-based pos, CIGAR, read sequence) and together they
+        # have a mismatch, a deletion, an insertion, a soft clip and a reverse strand alignment.
+        r0, r1 = refs
+        mismatch = r0[50:150] + ('A' if r0[150] != 'A' else 'C') + r0[151:350]
+        reads = [('a', 0, '0', 11, '300M', r0[10:310]),
+                 ('b', 0, '0', 51, '300M', mismatch),
+                 ('c', 0, '0', 201, '150M5D145M', r0[200:350] + r0[355:500]),
+                 ('d', 0, '0', 301, '100M3I200M', r0[300:400] + 'ACG' + r0[400:600]),
+                 ('e', 0, '1', 1, '5S300M', 'TTTTT' + r1[0:300]),
+                 ('f', 0, '1', 101, '300M', r1[100:400]),
+                 ('g', 16, '1', 251, '300M', r1[250:550])]
+        self.read_fastq = os.path.join(self.temp_dir, 'reads.fastq')
+        with open(self.read_fastq, 'wt') as fastq:
+            for name, flag, _, _, _, seq in reads:
+                read_seq = unicycler.misc.reverse_complement(seq) if flag & 16 else seq
+                fastq.write('@' + name + '\n' + read_seq + '\n+\n' + 'I' * len(seq) + '\n')
+        self.sam_lines = ['\t'.join([name, str(flag), ref, str(pos), '60', cigar, '*', '0', '0',
+                                     seq, 'I' * len(seq)]) + '\n'
+                          for name, flag, ref, pos, cigar, seq in reads]
+        self.sorted_sam = os.path.join(self.temp_dir, 'sorted.sam')
+        with open(self.sorted_sam, 'wt') as sam_file:
+            sam_file.write(''.join(self.sam_lines))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load_refs_and_reads(self):
+        references = unicycler.read_ref.load_references(self.ref_fasta, show_progress=False)
+        read_dict, read_names, _ = unicycler.read_ref.load_long_reads(self.read_fastq)
+        return references, read_dict, read_names
+
+    def load_tables(self, tables_dir):
+        tables = {}
+        for filename in sorted(os.listdir(tables_dir)):
+            with open(os.path.join(tables_dir, filename), 'rt') as table:
+                tables[filename] = table.read()
+        return tables
+
+    def non_streaming_tables(self):
+        references, read_dict, _ = self.load_refs_and_reads()
+        reference_dict = {x.name: x for x in references}
+        window_tables_prefix = os.path.join(self.temp_dir, 'non_streaming_windows', '')
+        base_tables_prefix = os.path.join(self.temp_dir, 'non_streaming_bases', '')
+        os.makedirs(window_tables_prefix)
+        os.makedirs(base_tables_prefix)
+        alignments = unicycler.unicycler_align.load_sam_alignments(self.sorted_sam, read_dict,
+                                                                   reference_dict,
+                                                                   self.scoring_scheme)
+        unicycler.unicycler_check.count_depth_and_errors_per_base(references, reference_dict,
+                                                                  alignments)
+        high_error_rate, very_high_error_rate, _, mean_error_rate = \
+            unicycler.unicycler_check.determine_thresholds(self.scoring_scheme, references,
+                                                           alignments, 1, 0.001, 0.3)
+        unicycler.unicycler_check.count_depth_and_errors_per_window(references, self.window_size,
+                                                                    self.window_size,
+                                                                    high_error_rate,
+                                                                    very_high_error_rate)
+        unicycler.unicycler_check.produce_window_tables(references, window_tables_prefix)
+        unicycler.unicycler_check.produce_base_tables(references, base_tables_prefix)
+        return (len(alignments), mean_error_rate, self.load_tables(window_tables_prefix),
+                self.load_tables(base_tables_prefix))
+
+    def streaming_tables(self, sam_filename):
+        references, read_dict, _ = self.load_refs_and_reads()
+        reference_dict = {x.name: x for x in references}
+        window_tables_prefix = os.path.join(self.temp_dir, 'streaming_windows', '')
+        base_tables_prefix = os.path.join(self.temp_dir, 'streaming_bases', '')
+        os.makedirs(window_tables_prefix, exist_ok=True)
+        os.makedirs(base_tables_prefix, exist_ok=True)
+        alignment_count, mean_error_rate = \
+            unicycler.unicycler_check.stream_depth_and_errors(sam_filename, references,
+                                                              reference_dict, read_dict,
+                                                              self.scoring_scheme,
+                                                              self.window_size, self.window_size,
+                                                              1, 0.001, window_tables_prefix,
+                                                              base_tables_prefix)
+        return (alignment_count, mean_error_rate, self.load_tables(window_tables_prefix),
+                self.load_tables(base_tables_prefix))
+
+    def test_streaming_matches_non_streaming(self):
+        non_streaming = self.non_streaming_tables()
+        streaming = self.streaming_tables(self.sorted_sam)
+        self.assertEqual(non_streaming[0], 7)
+        self.assertEqual(streaming[0], 7)
+        self.assertTrue(non_streaming[1] > 0.0)
+        self.assertAlmostEqual(non_streaming[1], streaming[1])
+        self.assertEqual(sorted(non_streaming[2]), ['0.txt', '1.txt'])
+        self.assertEqual(non_streaming[2], streaming[2])
+        self.assertEqual(sorted(non_streaming[3]), ['0.txt', '1.txt'])
+        self.assertEqual(non_streaming[3], streaming[3])
+
+    def test_unsorted_positions(self):
+        # Swap the first two alignments, which are to the same reference.
+        unsorted_lines = self.sam_lines[1:2] + self.sam_lines[:1] + self.sam_lines[2:]
+        unsorted_sam = os.path.join(self.temp_dir, 'unsorted.sam')
+        with open(unsorted_sam, 'wt') as sam_file:
+            sam_file.write(''.join(unsorted_lines))
+        with self.assertRaises(SystemExit):
+            self.streaming_tables(unsorted_sam)
+
+    def test_ungrouped_references(self):
+        # Move the first alignment to the end, after the alignments to other references.
+        ungrouped_sam = os.path.join(self.temp_dir, 'ungrouped.sam')
+        with open(ungrouped_sam, 'wt') as sam_file:
+            sam_file.write(''.join(self.sam_lines[1:] + self.sam_lines[:1]))
+        with self.assertRaises(SystemExit):
+            self.streaming_tables(ungrouped_sam)
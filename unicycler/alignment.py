@@ -52,20 +52,23 @@ class AlignmentScoringScheme(object):
 class Alignment(object):
     """
     This class describes an alignment between a long read and a contig.
-    It can be constructed either from a SAM line or from the C++ Seqan output.
+    It can be constructed from a SAM line, from the C++ Seqan output or from an AlignmentCache.
     """
 
     def __init__(self,
                  sam_line=None, read_dict=None,
                  seqan_output=None, read=None,
-                 reference_dict=None, scoring_scheme=None):
+                 reference_dict=None, scoring_scheme=None,
+                 alignment_cache=None, cache_index=None):
 
-        # Make sure we have the appropriate inputs for one of the two ways to construct an
+        # Make sure we have the appropriate inputs for one of the three ways to construct an
         # alignment.
-        assert (sam_line and read_dict) or (seqan_output and read)
+        assert (sam_line and read_dict) or (seqan_output and read) or \
+            (alignment_cache is not None and cache_index is not None and read_dict)
 
-        # Some inputs are required for both types of construction.
-        assert scoring_scheme and reference_dict
+        # Some inputs are required for all types of construction. Cached alignments already have
+        # their scores, so they don't need a scoring scheme.
+        assert reference_dict and (scoring_scheme or alignment_cache is not None)
 
         # Read details
         self.read = None
@@ -94,6 +97,9 @@ class Alignment(object):
 
         # How some of the values are gotten depends on whether this alignment came from SAM
         # or a Seqan alignment.
+        if alignment_cache is not None:
+            self.setup_using_cache(alignment_cache, cache_index, read_dict, reference_dict)
+            return
         if seqan_output:
             self.setup_using_seqan_output(seqan_output, read, reference_dict)
         elif sam_line:
@@ -104,23 +110,28 @@ class Alignment(object):
     def setup_using_seqan_output(self, seqan_output, read, reference_dict):
         """
         This function sets up the Alignment using the Seqan results. This kind of alignment has
-        complete details about the alignment.
-        """
-        seqan_parts = seqan_output.split(',', 9)
-        assert len(seqan_parts) >= 10
-
-        self.rev_comp = (seqan_parts[1] == '-')
-        self.cigar_parts = re.findall(r'\d+\w', seqan_parts[9])
-        self.milliseconds = int(seqan_parts[8])
+        complete details about the alignment. The results can either be a comma-delimited string
+        or a tuple of the same values already converted (from the batch aligner).
+        """
+        if isinstance(seqan_output, str):
+            seqan_parts = seqan_output.split(',', 9)
+            assert len(seqan_parts) >= 10
+            ref_name = seqan_parts[0]
+            self.rev_comp = (seqan_parts[1] == '-')
+            self.cigar_parts = re.findall(r'\d+\w', seqan_parts[9])
+            self.milliseconds = int(seqan_parts[8])
+            self.read_start_pos = int(seqan_parts[2])
+            self.read_end_pos = int(seqan_parts[3])
+            self.ref_start_pos = int(seqan_parts[4])
+            self.ref_end_pos = int(seqan_parts[5])
+        else:
+            ref_name, self.rev_comp, self.read_start_pos, self.read_end_pos, \
+                self.ref_start_pos, self.ref_end_pos, _, _, self.milliseconds, \
+                self.cigar_parts = seqan_output
 
         self.read = read
-        self.read_start_pos = int(seqan_parts[2])
-        self.read_end_pos = int(seqan_parts[3])
         self.read_end_gap = self.read.get_length() - self.read_end_pos
-
-        self.ref = reference_dict[get_nice_header(seqan_parts[0])]
-        self.ref_start_pos = int(seqan_parts[4])
-        self.ref_end_pos = int(seqan_parts[5])
+        self.ref = reference_dict[get_nice_header(ref_name)]
 
     def setup_using_sam(self, sam_line, read_dict, reference_dict):
         """
@@ -146,6 +157,43 @@ class Alignment(object):
         if self.ref_end_pos > len(self.ref.sequence):
             self.ref_end_pos = len(self.ref.sequence)
 
+    def setup_using_cache(self, alignment_cache, i, read_dict, reference_dict):
+        """
+        This function sets up the Alignment using one entry of an AlignmentCache. The cache holds
+        the tallied scores and errors, so the CIGAR doesn't need to be stepped through again.
+        """
+        c = alignment_cache.columns
+        self.rev_comp = bool(c['rev_comp'][i])
+        self.cigar_parts = alignment_cache.get_cigar_parts(i)
+        milliseconds = c['milliseconds'][i]
+        self.milliseconds = milliseconds if milliseconds >= 0 else None
+
+        self.read = read_dict[alignment_cache.read_names[c['read_index'][i]]]
+        self.read_start_pos = c['read_start_pos'][i]
+        self.read_end_pos = c['read_end_pos'][i]
+        self.read_end_gap = self.read.get_length() - self.read_end_pos
+
+        self.ref = reference_dict[get_nice_header(alignment_cache.ref_names[c['ref_index'][i]])]
+        self.ref_start_pos = c['ref_start_pos'][i]
+        self.ref_end_pos = c['ref_end_pos'][i]
+
+        self.match_count = c['match_count'][i]
+        self.mismatch_count = c['mismatch_count'][i]
+        self.insertion_count = c['insertion_count'][i]
+        self.deletion_count = c['deletion_count'][i]
+        self.percent_identity = c['percent_identity'][i]
+        self.raw_score = c['raw_score'][i]
+
+        # A NaN scaled score means the alignment had nothing to tally (see
+        # tally_up_score_and_errors), so the derived values stay as None.
+        scaled_score = c['scaled_score'][i]
+        if scaled_score == scaled_score:
+            self.scaled_score = scaled_score
+            self.edit_distance = self.mismatch_count + self.insertion_count + \
+                self.deletion_count
+            self.alignment_length = sum(int(x[:-1]) for x in self.cigar_parts
+                                        if x[-1] != 'S')
+
     def tally_up_score_and_errors(self, scoring_scheme):
         """
         This function steps through the CIGAR string for the alignment to get the score, identity
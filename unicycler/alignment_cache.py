@@ -0,0 +1,181 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module contains a class for saving long read alignments to a compact binary file, so they can
+be reused instead of being redone or reparsed from a SAM file.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import array
+import hashlib
+import json
+import os
+import struct
+import sys
+from .alignment import Alignment
+from .checkpoint import get_file_fingerprint
+from .version import __version__
+
+CACHE_MAGIC = b'UNIALNC1'
+
+# Each column of the cache is an array with the given type code. There is one value per alignment
+# in all of these columns except for the last two, which hold the run-length encoded CIGARs of all
+# alignments end to end (cigar_start says where each alignment's CIGAR begins).
+COLUMNS = [('read_index', 'L'), ('ref_index', 'L'), ('rev_comp', 'B'),
+           ('read_start_pos', 'q'), ('read_end_pos', 'q'),
+           ('ref_start_pos', 'q'), ('ref_end_pos', 'q'),
+           ('match_count', 'q'), ('mismatch_count', 'q'),
+           ('insertion_count', 'q'), ('deletion_count', 'q'),
+           ('raw_score', 'q'), ('scaled_score', 'd'), ('percent_identity', 'd'),
+           ('milliseconds', 'q'), ('cigar_start', 'Q'),
+           ('cigar_lengths', 'L'), ('cigar_ops', 'B')]
+
+
+class AlignmentCache(object):
+    """
+    This class holds alignments in columns (one array per alignment attribute) which can be
+    written to and read from a file with very little parsing. Read and reference names are stored
+    once each and alignments refer to them by index.
+
+    The cache is saved with a key describing what produced the alignments (see
+    get_alignment_cache_key), and a cache file is only loaded if its key matches.
+    """
+
+    def __init__(self):
+        self.read_names = []
+        self.ref_names = []
+        self.columns = {name: array.array(type_code) for name, type_code in COLUMNS}
+        self.read_indices = {}
+        self.ref_indices = {}
+
+    def __len__(self):
+        return len(self.columns['read_index'])
+
+    def add_alignment(self, alignment):
+        """
+        Appends an Alignment object to the cache's columns.
+        """
+        read_name, ref_name = alignment.read.name, alignment.ref.name
+        if read_name not in self.read_indices:
+            self.read_indices[read_name] = len(self.read_names)
+            self.read_names.append(read_name)
+        if ref_name not in self.ref_indices:
+            self.ref_indices[ref_name] = len(self.ref_names)
+            self.ref_names.append(ref_name)
+
+        c = self.columns
+        c['read_index'].append(self.read_indices[read_name])
+        c['ref_index'].append(self.ref_indices[ref_name])
+        c['rev_comp'].append(1 if alignment.rev_comp else 0)
+        for name in ['read_start_pos', 'read_end_pos', 'ref_start_pos', 'ref_end_pos',
+                     'match_count', 'mismatch_count', 'insertion_count', 'deletion_count',
+                     'raw_score']:
+            c[name].append(getattr(alignment, name))
+        c['scaled_score'].append(alignment.scaled_score if alignment.scaled_score is not None
+                                 else float('nan'))
+        c['percent_identity'].append(alignment.percent_identity)
+        c['milliseconds'].append(alignment.milliseconds if alignment.milliseconds is not None
+                                 else -1)
+        c['cigar_start'].append(len(c['cigar_ops']))
+        for cigar_part in alignment.cigar_parts:
+            c['cigar_lengths'].append(int(cigar_part[:-1]))
+            c['cigar_ops'].append(ord(cigar_part[-1]))
+
+    def get_cigar_parts(self, i):
+        """
+        Rebuilds the CIGAR parts (e.g. ['5S', '100M', '2I']) for one alignment.
+        """
+        c = self.columns
+        start = c['cigar_start'][i]
+        end = c['cigar_start'][i + 1] if i + 1 < len(self) else len(c['cigar_ops'])
+        return [str(length) + chr(op)
+                for length, op in zip(c['cigar_lengths'][start:end], c['cigar_ops'][start:end])]
+
+    def get_alignment(self, i, read_dict, reference_dict):
+        """
+        Builds an Alignment object for one alignment in the cache.
+        """
+        return Alignment(alignment_cache=self, cache_index=i, read_dict=read_dict,
+                         reference_dict=reference_dict)
+
+    def get_alignments(self, read_dict, reference_dict):
+        """
+        Yields Alignment objects for each alignment in the cache. They are built as they are
+        requested, so the whole cache doesn't need to exist as objects at once.
+        """
+        for i in range(len(self)):
+            yield self.get_alignment(i, read_dict, reference_dict)
+
+    def save(self, filename, key):
+        """
+        Writes the cache to file: a magic string, the length of a JSON header (names, key, column
+        sizes) and then the raw bytes of each column. It is written to a temporary name and then
+        moved into place so an interrupted write doesn't leave a truncated cache.
+        """
+        header = {'version': __version__, 'key': key, 'byteorder': sys.byteorder,
+                  'read_names': self.read_names, 'ref_names': self.ref_names,
+                  'columns': [[name, type_code, len(self.columns[name])]
+                              for name, type_code in COLUMNS]}
+        header_bytes = json.dumps(header).encode()
+        with open(filename + '.incomplete', 'wb') as cache_file:
+            cache_file.write(CACHE_MAGIC)
+            cache_file.write(struct.pack('<Q', len(header_bytes)))
+            cache_file.write(header_bytes)
+            for name, _ in COLUMNS:
+                self.columns[name].tofile(cache_file)
+        os.replace(filename + '.incomplete', filename)
+
+
+def load_alignment_cache(filename, key):
+    """
+    Returns the AlignmentCache saved in the given file, or None if there isn't one or it was made
+    with a different key.
+    """
+    try:
+        with open(filename, 'rb') as cache_file:
+            if cache_file.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                return None
+            header_length = struct.unpack('<Q', cache_file.read(8))[0]
+            header = json.loads(cache_file.read(header_length).decode())
+            if header['key'] != key:
+                return None
+            if [x[:2] for x in header['columns']] != [list(x) for x in COLUMNS]:
+                return None
+            cache = AlignmentCache()
+            for name, type_code, count in header['columns']:
+                column = cache.columns[name]
+                column.fromfile(cache_file, count)
+                if header['byteorder'] != sys.byteorder:
+                    column.byteswap()
+    except (OSError, EOFError, ValueError, KeyError, TypeError, struct.error):
+        return None
+    cache.read_names = header['read_names']
+    cache.ref_names = header['ref_names']
+    cache.read_indices = {name: i for i, name in enumerate(cache.read_names)}
+    cache.ref_indices = {name: i for i, name in enumerate(cache.ref_names)}
+    return cache
+
+
+def get_alignment_cache_key(input_files, references, read_names, parameters):
+    """
+    Returns a key which identifies a set of alignments: the files they came from, the reference
+    sequences, the reads and any alignment settings. References are hashed by their sequence (not
+    a file), as the reference is often an assembly graph which is remade between runs.
+    """
+    ref_hash = hashlib.sha256()
+    for ref in references:
+        ref_hash.update(ref.name.encode() + b'\n' + ref.sequence.encode() + b'\n')
+    read_names_hash = hashlib.sha256('\n'.join(read_names).encode())
+    key_parts = {'inputs': [get_file_fingerprint(x) for x in input_files],
+                 'references': ref_hash.hexdigest(), 'reads': read_names_hash.hexdigest(),
+                 'parameters': parameters}
+    key_json = json.dumps(key_parts, sort_keys=True, default=str)
+    return hashlib.sha256(key_json.encode()).hexdigest()
@@ -17,8 +17,10 @@ import math
 import copy
 import os
 import itertools
-from collections import deque, defaultdict
+from collections import defaultdict, deque
 from .assembly_graph_segment import Segment
+from .assembly_graph_adjacency import ComponentIndex
+from .assembly_graph_worklist import SegmentWorkList
 from .misc import int_to_str, float_to_str, weighted_average_list, score_function, \
     add_line_breaks_to_sequence, print_table, get_dim_timestamp, get_right_arrow, \
     remove_dupes_preserve_order
@@ -56,6 +58,7 @@ class AssemblyGraph(object):
         self.overlap = overlap
         self.insert_size_mean = insert_size_mean
         self.insert_size_deviation = insert_size_deviation
+        self.components = None  # ComponentIndex kept up to date with edits, made when needed
 
         if filename.endswith('.fastg'):
             self.load_from_fastg(filename)
@@ -501,6 +504,8 @@ class AssemblyGraph(object):
                                 self.copy_depths[num].append(copy_depth)
                 # Now actually delete the segment.
                 del self.segments[num_to_remove]
+                if self.components is not None:
+                    self.components.remove_segment(num_to_remove)
 
         # Delete the copy depths for deleted segments.
         for num in nums_to_remove:
@@ -569,16 +574,21 @@ class AssemblyGraph(object):
         before the final merge.
         """
         removed_segments = []
-        while True:
-            for seg_num, segment in self.segments.items():
-                if segment.get_length() >= min_dead_end_size:
-                    continue
-                if self.dead_end_change_if_deleted(seg_num) < 0:
-                    self.remove_segments([seg_num])
-                    removed_segments.append(seg_num)
-                    break
-            else:
-                break
+
+        # Deleting a segment changes the links of its neighbours, which can change whether their
+        # neighbours are deletable, so segments within two links of a deletion are checked again.
+        order = {seg_num: i for i, seg_num in enumerate(self.segments)}
+        work_list = SegmentWorkList(self.segments, order)
+        while work_list:
+            seg_num = work_list.pop()
+            if seg_num not in self.segments:
+                continue
+            if self.segments[seg_num].get_length() >= min_dead_end_size:
+                continue
+            if self.dead_end_change_if_deleted(seg_num) < 0:
+                work_list.add_nearby(self, [seg_num], 2)
+                self.remove_segments([seg_num])
+                removed_segments.append(seg_num)
         if removed_segments:
             log.log('\nRemoved small dead ends:', 2)
             log.log_number_list(removed_segments, 2)
@@ -591,17 +601,20 @@ class AssemblyGraph(object):
             anchor_seg_nums = set(x.number for x in anchor_segments)
         else:
             anchor_seg_nums = None
-        while True:
-            # Sort the segment numbers first so we apply the merging in a consistent order.
-            seg_nums = sorted(list(self.segments.keys()))
-            for num in seg_nums:
-                path = self.get_simple_path(num, anchor_seg_nums, bridging_mode)
-                assert len(path) > 0
-                if len(path) > 1:
-                    self.merge_simple_path(path)
-                    break
-            else:
-                break
+
+        # Segments are checked in order of number so we apply the merging in a consistent order.
+        # A merge only changes which simple paths its neighbours are in, so only they (and the new
+        # segment) are checked again.
+        work_list = SegmentWorkList(self.segments)
+        while work_list:
+            num = work_list.pop()
+            if num not in self.segments:
+                continue
+            path = self.get_simple_path(num, anchor_seg_nums, bridging_mode)
+            assert len(path) > 0
+            if len(path) > 1:
+                new_seg_num = self.merge_simple_path(path)
+                work_list.add_nearby(self, [new_seg_num], 1)
         self.renumber_segments()
 
     def merge_simple_path(self, merge_path):
@@ -642,6 +655,8 @@ class AssemblyGraph(object):
 
         # Add the new segment to the graph and give it the links from its source segments.
         self.segments[new_seg_num] = new_seg
+        if self.components is not None:
+            self.components.add_segment(new_seg_num)
         for link in outgoing_links:
             self.add_link(new_seg_num, link)
         for link in incoming_links:
@@ -702,6 +717,8 @@ class AssemblyGraph(object):
         Adds a link to the graph in all necessary ways: forward and reverse, and for reverse
         complements too.
         """
+        if self.components is not None:
+            self.components.add_link(start, end)
         if start not in self.forward_links:
             self.forward_links[start] = []
         if end not in self.forward_links[start]:
@@ -727,6 +744,8 @@ class AssemblyGraph(object):
         Removes a link from the graph in all necessary ways: forward and reverse, and for reverse
         complements too.
         """
+        if self.components is not None:
+            self.components.remove_link(start, end)
         if start in self.forward_links:
             try:
                 self.forward_links[start].remove(end)
@@ -772,6 +791,16 @@ class AssemblyGraph(object):
         component of the graph.
         E.g. [[1, 2], [3, 4, 5]] would mean that segments 1 and 2 are in a connected component
         and segments 3, 4 and 5 are in another connected component.
+        The components are found once and then kept up to date as the graph is edited.
+        """
+        if self.components is None:
+            self.components = ComponentIndex(self.find_connected_components())
+        return self.components.get_connected_components(self)
+
+    def find_connected_components(self):
+        """
+        Finds the graph's connected components with a search of the whole graph. This is used to
+        start off the component index, which is then kept up to date as the graph is edited.
         """
         visited = set()
         components = []
@@ -1080,6 +1109,8 @@ class AssemblyGraph(object):
                 bridge_seg = Segment(bridge_num, bridge_depth, bridge_seq, True)
                 bridge_seg.build_other_sequence_if_necessary()
                 self.segments[bridge_num] = bridge_seg
+                if self.components is not None:
+                    self.components.add_segment(bridge_num)
                 log.log('   new seg:   ' + str(bridge_num), 3)
 
                 # Now rebuild the links around the junction.
@@ -1193,26 +1224,35 @@ class AssemblyGraph(object):
         """
         path_sequence = ''
         prev_segment_number = None
-        for i, seg_num in enumerate(path_segments):
-            segment = self.segments[abs(seg_num)]
-            if seg_num > 0:
-                seg_sequence = segment.forward_sequence
-            else:
-                seg_sequence = segment.reverse_sequence
-            if i == 0:
-                path_sequence = seg_sequence
-            else:
-                if seg_num not in self.forward_links[prev_segment_number]:
-                    raise BadPath(str(path_segments) + ' is not a valid path')
-                if self.overlap > 0 and \
-                        path_sequence[-self.overlap:] != seg_sequence[:self.overlap]:
-                    raise BadOverlaps('overlaps do not match when merging ' +
-                                      str(prev_segment_number) + ' and ' + str(seg_num) +
-                                      ' in path ' + str(path_segments))
-                path_sequence += seg_sequence[self.overlap:]
+        for seg_num in path_segments:
+            path_sequence += self.get_path_sequence_addition(path_sequence, prev_segment_number,
+                                                             seg_num, path_segments)
             prev_segment_number = seg_num
         return path_sequence
 
+    def get_path_sequence_addition(self, path_sequence, prev_segment_number, seg_num,
+                                   path_segments):
+        """
+        Returns the sequence which a segment adds to the end of a path sequence, checking that it
+        follows on from the previous segment (None if this is the path's first segment). The whole
+        path is only needed for error messages.
+        """
+        segment = self.segments[abs(seg_num)]
+        if seg_num > 0:
+            seg_sequence = segment.forward_sequence
+        else:
+            seg_sequence = segment.reverse_sequence
+        if prev_segment_number is None:
+            return seg_sequence
+        if seg_num not in self.forward_links[prev_segment_number]:
+            raise BadPath(str(path_segments) + ' is not a valid path')
+        if self.overlap > 0 and \
+                path_sequence[-self.overlap:] != seg_sequence[:self.overlap]:
+            raise BadOverlaps('overlaps do not match when merging ' +
+                              str(prev_segment_number) + ' and ' + str(seg_num) +
+                              ' in path ' + str(path_segments))
+        return seg_sequence[self.overlap:]
+
     def apply_bridges(self, bridges, verbosity, min_bridge_qual):
         """
         Uses the supplied bridges to simplify the graph.
@@ -1344,6 +1384,8 @@ class AssemblyGraph(object):
                           bridge.graph_path)
         new_seg.build_other_sequence_if_necessary()
         self.segments[new_seg_num] = new_seg
+        if self.components is not None:
+            self.components.add_segment(new_seg_num)
 
         # Link the bridge segment in to the start/end segments.
         self.add_link(start, new_seg_num)
@@ -1780,6 +1822,7 @@ class AssemblyGraph(object):
         for name, path_nums in self.paths.items():
             new_paths[name] = [changes[x] for x in path_nums]
         self.paths = new_paths
+        self.components = None
 
     def print_component_table(self):
         component_table = [['Component', 'Segments', 'Links', 'Length', 'N50',
@@ -2236,14 +2279,18 @@ class AssemblyGraph(object):
         else:
             return self.reverse_links[seg_num]
 
-    def remove_zero_length_segs(self, suppress_log=False):
+    def remove_zero_length_segs(self, suppress_log=False, seg_nums=None):
         """
         This function removes zero-length segments from the graph (segments with a length equal
         to the graph overlap), but only if they they aren't serving a purpose (such as in a
-        multi-way junction).
+        multi-way junction). If seg_nums is given, only those segments are considered.
         """
+        if seg_nums is None:
+            seg_nums = self.segments
         segs_to_remove = []
-        for seg_num in sorted(self.segments):  # sort for consistency between runs
+        for seg_num in sorted(seg_nums):  # sort for consistency between runs
+            if seg_num not in self.segments:
+                continue
             seg = self.segments[seg_num]
             if seg.get_length() != self.overlap:
                 continue
@@ -2294,44 +2341,53 @@ class AssemblyGraph(object):
         """
         assert self.overlap == 0
         merged_seg_nums = []
-        while True:
-            for seg_num in sorted(self.segments):  # sort for consistency between runs
-                segment = self.segments[seg_num]
-                if segment.get_length() > max_merge_size or segment.get_length() == 0:
-                    continue
-                downstream_segs = self.get_downstream_seg_nums(seg_num)
-                upstream_segs = self.get_upstream_seg_nums(seg_num)
-
-                # If the segment has one downstream segment and multiple upstream segments,
-                # then we can merge it into the upstream segments.
-                if len(downstream_segs) == 1 and len(upstream_segs) > 1 and \
-                        all(self.lead_exclusively_to(x, seg_num) for x in upstream_segs):
-                    for upstream_seg_num in upstream_segs:
-                        upstream_seg = self.segments[abs(upstream_seg_num)]
-                        if upstream_seg_num > 0:
-                            upstream_seg.append_to_forward_sequence(segment.forward_sequence)
-                        else:
-                            upstream_seg.append_to_reverse_sequence(segment.forward_sequence)
-                    segment.remove_sequence()
-                    merged_seg_nums.append(seg_num)
-                    break
 
-                # If the segment has one upstream segment and multiple downstream segments,
-                # then we can merge it into the downstream segments.
-                if len(upstream_segs) == 1 and len(downstream_segs) > 1 and \
-                        all(self.lead_exclusively_from(x, seg_num) for x in downstream_segs):
-                    for downstream_seg_num in downstream_segs:
-                        downstream_seg = self.segments[abs(downstream_seg_num)]
-                        if downstream_seg_num > 0:
-                            downstream_seg.prepend_to_forward_sequence(segment.forward_sequence)
-                        else:
-                            downstream_seg.prepend_to_reverse_sequence(segment.forward_sequence)
-                    segment.remove_sequence()
-                    merged_seg_nums.append(seg_num)
-                    break
+        # A merge changes the sequences and links of the merged segment's neighbours, which can
+        # change whether their neighbours can be merged, so segments within two links of a merge
+        # are checked again. Segments are checked in order of number for consistency between runs.
+        work_list = SegmentWorkList(self.segments)
+        while work_list:
+            seg_num = work_list.pop()
+            if seg_num not in self.segments:
+                continue
+            segment = self.segments[seg_num]
+            if segment.get_length() > max_merge_size or segment.get_length() == 0:
+                continue
+            downstream_segs = self.get_downstream_seg_nums(seg_num)
+            upstream_segs = self.get_upstream_seg_nums(seg_num)
+
+            # If the segment has one downstream segment and multiple upstream segments,
+            # then we can merge it into the upstream segments.
+            if len(downstream_segs) == 1 and len(upstream_segs) > 1 and \
+                    all(self.lead_exclusively_to(x, seg_num) for x in upstream_segs):
+                for upstream_seg_num in upstream_segs:
+                    upstream_seg = self.segments[abs(upstream_seg_num)]
+                    if upstream_seg_num > 0:
+                        upstream_seg.append_to_forward_sequence(segment.forward_sequence)
+                    else:
+                        upstream_seg.append_to_reverse_sequence(segment.forward_sequence)
+
+            # If the segment has one upstream segment and multiple downstream segments,
+            # then we can merge it into the downstream segments.
+            elif len(upstream_segs) == 1 and len(downstream_segs) > 1 and \
+                    all(self.lead_exclusively_from(x, seg_num) for x in downstream_segs):
+                for downstream_seg_num in downstream_segs:
+                    downstream_seg = self.segments[abs(downstream_seg_num)]
+                    if downstream_seg_num > 0:
+                        downstream_seg.prepend_to_forward_sequence(segment.forward_sequence)
+                    else:
+                        downstream_seg.prepend_to_reverse_sequence(segment.forward_sequence)
             else:
-                break
-            self.remove_zero_length_segs(suppress_log=True)
+                continue
+
+            segment.remove_sequence()
+            merged_seg_nums.append(seg_num)
+            work_list.add_nearby(self, [seg_num], 2)
+
+            # The merged segment is now zero-length, and only it and its neighbours can have
+            # become removable.
+            self.remove_zero_length_segs(suppress_log=True,
+                                         seg_nums=[seg_num] + self.get_connected_segments(seg_num))
 
         if merged_seg_nums:
             log.log('\nMerged small segments:')
@@ -0,0 +1,137 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module describes an index of an assembly graph's connected components, which is kept up to
+date as the graph is edited so the components don't need to be found from scratch each time.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+
+class ComponentIndex(object):
+    """
+    This class keeps track of a graph's connected components as the graph is edited, so they don't
+    need to be found from scratch after every change. Each segment number maps to a component ID,
+    and each component ID maps to the set of its segment numbers.
+
+    Adding a link can only join components, so that is done immediately. Removing a link or a
+    segment can split a component, so the component is just marked as dirty and it is searched
+    again (only that component, not the whole graph) the next time the components are needed.
+    """
+
+    def __init__(self, components):
+        self.component_ids = {}
+        self.members = {}
+        self.dirty = set()
+        self.next_id = 0
+        self.sorted_components = None
+        for component in components:
+            self.new_component(component)
+
+    def new_component(self, seg_nums):
+        component_id = self.next_id
+        self.next_id += 1
+        self.members[component_id] = set(seg_nums)
+        for seg_num in seg_nums:
+            self.component_ids[seg_num] = component_id
+        return component_id
+
+    def add_segment(self, seg_num):
+        """
+        Adds a new (as yet unconnected) segment in its own component.
+        """
+        if seg_num not in self.component_ids:
+            self.new_component([seg_num])
+            self.sorted_components = None
+
+    def remove_segment(self, seg_num):
+        """
+        Removes a segment. Its component may now be split, so it is marked as dirty.
+        """
+        component_id = self.component_ids.pop(seg_num, None)
+        if component_id is None:
+            return
+        members = self.members[component_id]
+        members.discard(seg_num)
+        if members:
+            self.dirty.add(component_id)
+        else:
+            del self.members[component_id]
+            self.dirty.discard(component_id)
+        self.sorted_components = None
+
+    def add_link(self, start, end):
+        """
+        Joins the components of the two segments (signed or unsigned) in a new link.
+        """
+        seg_num_1, seg_num_2 = abs(start), abs(end)
+        self.add_segment(seg_num_1)
+        self.add_segment(seg_num_2)
+        id_1, id_2 = self.component_ids[seg_num_1], self.component_ids[seg_num_2]
+        if id_1 == id_2:
+            return
+
+        # The smaller component is moved into the larger one.
+        if len(self.members[id_1]) < len(self.members[id_2]):
+            id_1, id_2 = id_2, id_1
+        moved = self.members.pop(id_2)
+        for seg_num in moved:
+            self.component_ids[seg_num] = id_1
+        self.members[id_1].update(moved)
+        if id_2 in self.dirty:
+            self.dirty.discard(id_2)
+            self.dirty.add(id_1)
+        self.sorted_components = None
+
+    def remove_link(self, start, end):
+        """
+        Marks the component of a removed link as dirty, as it may now be split.
+        """
+        component_id = self.component_ids.get(abs(start))
+        if component_id is not None:
+            self.dirty.add(component_id)
+            self.sorted_components = None
+
+    def get_connected_components(self, graph):
+        """
+        Returns the graph's connected components, in the same form as
+        AssemblyGraph.get_connected_components. Any dirty components are searched again first.
+        """
+        for component_id in self.dirty:
+            self.split_component(component_id, graph)
+        self.dirty = set()
+        if self.sorted_components is None:
+            self.sorted_components = sorted(sorted(x) for x in self.members.values())
+        return [list(x) for x in self.sorted_components]
+
+    def split_component(self, component_id, graph):
+        """
+        Replaces a component with the components found by searching its segments. Since
+        components can only be split by removals, the search never leaves the old component.
+        """
+        unvisited = self.members.pop(component_id)
+        while unvisited:
+            start = unvisited.pop()
+            component = [start]
+            stack = [start]
+            while stack:
+                for seg_num in graph.get_connected_segments(stack.pop()):
+                    if seg_num in unvisited:
+                        unvisited.remove(seg_num)
+                        component.append(seg_num)
+                        stack.append(seg_num)
+
+            # Segment numbers which are only in links (not real segments) are only kept if they
+            # are connected to a real segment.
+            if any(x in graph.segments for x in component):
+                self.new_component(component)
+            else:
+                for seg_num in component:
+                    del self.component_ids[seg_num]
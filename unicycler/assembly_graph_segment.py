@@ -15,7 +15,8 @@ not, see <http://www.gnu.org/licenses/>.
 """
 
 import textwrap
-from .misc import reverse_complement, add_line_breaks_to_sequence
+from .misc import reverse_complement, add_line_breaks_to_sequence, is_homopolymer
+from .packed_sequence import PackedSequence
 from .bridge_long_read import LongReadBridge
 from .bridge_spades_contig import SpadesContigBridge
 from .bridge_loop_unroll import LoopUnrollingBridge
@@ -27,14 +28,22 @@ from .bridge_miniasm import MiniasmBridge
 class Segment(object):
     """
     This hold a graph segment with a number, depth, direction and sequence.
+
+    If pack_sequences is set, segments made from then on hold their sequence as a PackedSequence
+    instead of as forward and reverse strings. The forward_sequence and reverse_sequence
+    attributes still work the same, but the reverse sequence is built when it's accessed. This
+    takes much less memory, at the cost of slower sequence access.
     """
+    pack_sequences = False
+
     def __init__(self, number, depth, sequence, positive, bridge=None, graph_path=None,
                  original_depth=True):
         self.number = number
         self.depth = depth
         self.original_depth = original_depth
-        self.forward_sequence = ''
-        self.reverse_sequence = ''
+        self.packed_sequence = PackedSequence('') if self.pack_sequences else None
+        self._forward_sequence = ''
+        self._reverse_sequence = ''
         self.bridge = bridge
         self.graph_path = graph_path
         if positive:
@@ -43,8 +52,54 @@ class Segment(object):
             self.reverse_sequence = sequence
         self.used_in_bridges = []
 
+    @property
+    def forward_sequence(self):
+        if self.packed_sequence is not None:
+            return self.packed_sequence.get_sequence()
+        return self._forward_sequence
+
+    @forward_sequence.setter
+    def forward_sequence(self, sequence):
+        if self.packed_sequence is not None:
+            self.packed_sequence = PackedSequence(sequence)
+        else:
+            self._forward_sequence = sequence
+
+    @property
+    def reverse_sequence(self):
+        if self.packed_sequence is not None:
+            return reverse_complement(self.packed_sequence.get_sequence())
+        return self._reverse_sequence
+
+    @reverse_sequence.setter
+    def reverse_sequence(self, sequence):
+        if self.packed_sequence is not None:
+            self.packed_sequence = PackedSequence(reverse_complement(sequence))
+        else:
+            self._reverse_sequence = sequence
+
+    def set_forward_sequence(self, sequence):
+        """
+        Replaces the segment's sequence (given on the forward strand).
+        """
+        if self.packed_sequence is not None:
+            self.packed_sequence = PackedSequence(sequence)
+        else:
+            self._forward_sequence = sequence
+            self._reverse_sequence = reverse_complement(sequence)
+
+    def set_reverse_sequence(self, sequence):
+        """
+        Replaces the segment's sequence (given on the reverse strand).
+        """
+        if self.packed_sequence is not None:
+            self.packed_sequence = PackedSequence(reverse_complement(sequence))
+        else:
+            self._forward_sequence = reverse_complement(sequence)
+            self._reverse_sequence = sequence
+
     def __repr__(self):
-        if len(self.forward_sequence) > 6:
+        if self.get_length() > 6:
             seq_string = self.forward_sequence[:3] + '...' + self.forward_sequence[-3:]
         else:
             seq_string = self.forward_sequence
@@ -57,28 +112,26 @@ class Segment(object):
             self.reverse_sequence = sequence
 
     def build_other_sequence_if_necessary(self):
+        if self.packed_sequence is not None:  # packed sequences have both strands already
+            return
         if not self.forward_sequence:
             self.forward_sequence = reverse_complement(self.reverse_sequence)
         if not self.reverse_sequence:
             self.reverse_sequence = reverse_complement(self.forward_sequence)
 
     def get_length(self):
-        return len(self.forward_sequence)
+        if self.packed_sequence is not None:
+            return self.packed_sequence.length
+        return len(self._forward_sequence)
 
     def get_length_no_overlap(self, overlap):
-        return len(self.forward_sequence) - overlap
+        return self.get_length() - overlap
 
     def is_homopolymer(self):
         """
         Returns True if the segment's sequence is made up of only one base.
         """
-        if len(self.forward_sequence) == 0:
-            return False
-        first_base = self.forward_sequence[0].lower()
-        for base in self.forward_sequence[1:]:
-            if base.lower() != first_base:
-                return False
-        return True
+        return is_homopolymer(self.forward_sequence)
 
     def gfa_segment_line(self):
         """
@@ -141,8 +194,11 @@ class Segment(object):
         assert self.get_length() >= amount
         if amount == 0:
             return
-        self.forward_sequence = self.forward_sequence[:-amount]
-        self.reverse_sequence = self.reverse_sequence[amount:]
+        if self.packed_sequence is not None:
+            self.forward_sequence = self.forward_sequence[:-amount]
+        else:
+            self._forward_sequence = self._forward_sequence[:-amount]
+            self._reverse_sequence = self._reverse_sequence[amount:]
 
     def trim_from_start(self, amount):
         """
@@ -151,47 +207,45 @@ class Segment(object):
         assert self.get_length() >= amount
         if amount == 0:
             return
-        self.forward_sequence = self.forward_sequence[amount:]
-        self.reverse_sequence = self.reverse_sequence[:-amount]
+        if self.packed_sequence is not None:
+            self.forward_sequence = self.forward_sequence[amount:]
+        else:
+            self._forward_sequence = self._forward_sequence[amount:]
+            self._reverse_sequence = self._reverse_sequence[:-amount]
 
     def append_to_forward_sequence(self, additional_seq):
         """
         Adds the given sequence to the end of the forward sequence (and updates the reverse
         sequence accordingly).
         """
-        self.forward_sequence = self.forward_sequence + additional_seq
-        self.reverse_sequence = reverse_complement(self.forward_sequence)
+        self.set_forward_sequence(self.forward_sequence + additional_seq)
 
     def append_to_reverse_sequence(self, additional_seq):
         """
         Adds the given sequence to the end of the reverse sequence (and updates the forward
         sequence accordingly).
         """
-        self.reverse_sequence = self.reverse_sequence + additional_seq
-        self.forward_sequence = reverse_complement(self.reverse_sequence)
+        self.set_reverse_sequence(self.reverse_sequence + additional_seq)
 
     def prepend_to_forward_sequence(self, additional_seq):
         """
         Adds the given sequence to the end of the forward sequence (and updates the reverse
         sequence accordingly).
         """
-        self.forward_sequence = additional_seq + self.forward_sequence
-        self.reverse_sequence = reverse_complement(self.forward_sequence)
+        self.set_forward_sequence(additional_seq + self.forward_sequence)
 
     def prepend_to_reverse_sequence(self, additional_seq):
         """
         Adds the given sequence to the end of the reverse sequence (and updates the forward
         sequence accordingly).
         """
-        self.reverse_sequence = additional_seq + self.reverse_sequence
-        self.forward_sequence = reverse_complement(self.reverse_sequence)
+        self.set_reverse_sequence(additional_seq + self.reverse_sequence)
 
     def remove_sequence(self):
         """
         Gets rid of the segment sequence entirely, turning it into a zero-length segment.
         """
-        self.forward_sequence = ''
-        self.reverse_sequence = ''
+        self.set_forward_sequence('')
 
     def rotate_sequence(self, start_pos, flip):
         """
@@ -201,11 +255,7 @@ class Segment(object):
         """
         unrotated_seq = self.forward_sequence
         rotated_seq = unrotated_seq[start_pos:] + unrotated_seq[:start_pos]
-        rev_comp_rotated_seq = reverse_complement(rotated_seq)
-
         if flip:
-            self.forward_sequence = rev_comp_rotated_seq
-            self.reverse_sequence = rotated_seq
+            self.set_reverse_sequence(rotated_seq)
         else:
-            self.forward_sequence = rotated_seq
-            self.reverse_sequence = rev_comp_rotated_seq
+            self.set_forward_sequence(rotated_seq)
@@ -0,0 +1,75 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module describes a work list of assembly graph segments, used by the graph simplification
+functions so that a change to the graph only leads to the nearby segments being checked again.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import heapq
+
+
+class SegmentWorkList(object):
+    """
+    This class holds the (unsigned) numbers of segments which need to be checked by a
+    simplification function. Segments come out lowest priority first, where the priority is the
+    segment number unless an order is given, and a segment is only in the list once at a time.
+
+    The simplification functions used to scan the whole graph again after every change. Since each
+    change can only affect segments near to it, they now start with every segment in the list and
+    then add back just the segments near each change. As long as a segment is taken out of the list
+    only when it can't be simplified, the results are the same as a full scan would give.
+    """
+
+    def __init__(self, seg_nums, order=None):
+        self.order = order
+        self.heap = []
+        self.queued = set()
+        for seg_num in seg_nums:
+            self.add(seg_num)
+
+    def __len__(self):
+        return len(self.queued)
+
+    def add(self, seg_num):
+        if seg_num in self.queued:
+            return
+        if self.order is not None:
+            if seg_num not in self.order:
+                self.order[seg_num] = len(self.order)
+            priority = self.order[seg_num]
+        else:
+            priority = seg_num
+        heapq.heappush(self.heap, (priority, seg_num))
+        self.queued.add(seg_num)
+
+    def add_nearby(self, graph, seg_nums, distance):
+        """
+        Adds the given segments and all segments within the given number of links of them.
+        """
+        nearby = set(abs(x) for x in seg_nums)
+        edge = set(nearby)
+        for _ in range(distance):
+            edge = set(x for seg_num in edge for x in graph.get_connected_segments(seg_num))
+            edge -= nearby
+            nearby |= edge
+        for seg_num in sorted(nearby):
+            self.add(seg_num)
+
+    def pop(self):
+        """
+        Returns the next segment number to check, or None if the list is empty.
+        """
+        if not self.heap:
+            return None
+        _, seg_num = heapq.heappop(self.heap)
+        self.queued.discard(seg_num)
+        return seg_num
@@ -15,6 +15,7 @@ not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import re
 import subprocess
 from .misc import load_fasta
 from . import log
@@ -32,18 +33,34 @@ def find_start_gene(sequence, start_genes_fasta, identity_threshold, coverage_th
     the position of that gene (including which strand it is on).
     This function assumes that the sequence is circular with no overlap.
     """
-    # Prepare the replicon sequence. In order to get a solid, single BLAST hit in cases where the
-    # gene overlaps from the end to the start, we have to duplicate some of the replicon sequence
-    # for the BLAST database.
-    seq_len = len(sequence)
+    best_hits = find_start_genes([sequence], start_genes_fasta, identity_threshold,
+                                 coverage_threshold, blast_dir, makeblastdb_path, tblastn_path, 1)
+    if best_hits[0] is None:
+        raise CannotFindStart
+    return best_hits[0]
+
+
+def find_start_genes(sequences, start_genes_fasta, identity_threshold, coverage_threshold,
+                     blast_dir, makeblastdb_path, tblastn_path, threads):
+    """
+    This function does the same as find_start_gene, but for a list of sequences at once: they all
+    go in one BLAST database which is searched with one multi-threaded tblastn. It returns a list
+    with the best hit for each sequence (None for sequences without a hit). If BLAST fails, it
+    raises CannotFindStart instead, so a failed search isn't mistaken for one without hits.
+    """
     start_genes_fasta = os.path.abspath(start_genes_fasta)
     queries = load_fasta(start_genes_fasta)
     if not queries:
         raise CannotFindStart
+    if not sequences:
+        return []
+
+    # Prepare the replicon sequences. In order to get a solid, single BLAST hit in cases where the
+    # gene overlaps from the end to the start, we have to duplicate some of each replicon sequence
+    # for the BLAST database.
     longest_query = max(len(x[1]) for x in queries)
     longest_query *= 3  # amino acids to nucleotides
-    dup_length = min(seq_len, longest_query)
-    sequence = sequence + sequence[:dup_length]
+    seq_lens = [len(x) for x in sequences]
 
     # BLAST has serious issues with paths that contain spaces. This page explains some of it:
     #   https://www.ncbi.nlm.nih.gov/books/NBK279669/
@@ -53,13 +70,14 @@ def find_start_gene(sequence, start_genes_fasta, identity_threshold, coverage_th
     starting_dir = os.getcwd()
     os.chdir(blast_dir)
 
-    # Create a FASTA file of the replicon sequence.
-    replicon_fasta_filename = 'replicon.fasta'
-    replicon_fasta = open(replicon_fasta_filename, 'w')
-    replicon_fasta.write('>replicon\n')
-    replicon_fasta.write(sequence)
-    replicon_fasta.write('\n')
-    replicon_fasta.close()
+    # Create a FASTA file of the replicon sequences.
+    replicon_fasta_filename = 'replicons.fasta'
+    with open(replicon_fasta_filename, 'w') as replicon_fasta:
+        for i, sequence in enumerate(sequences):
+            dup_length = min(len(sequence), longest_query)
+            replicon_fasta.write('>replicon_' + str(i) + '\n')
+            replicon_fasta.write(sequence + sequence[:dup_length])
+            replicon_fasta.write('\n')
 
     # Build the BLAST database.
     command = [makeblastdb_path, '-dbtype', 'nucl', '-in', replicon_fasta_filename]
@@ -73,29 +91,43 @@ def find_start_gene(sequence, start_genes_fasta, identity_threshold, coverage_th
 
     # Run the tblastn search.
     command = [tblastn_path, '-db', replicon_fasta_filename, '-query', start_genes_fasta, '-outfmt',
-               '6 qseqid sstart send pident qlen qseq qstart bitscore', '-num_threads', '1']
+               '6 qseqid sstart send pident qlen qseq qstart bitscore sseqid',
+               '-num_threads', str(threads)]
     log.log('  ' + ' '.join(command), 2)
     process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     blast_out, blast_err = process.communicate()
-    process.wait()
     if blast_err:
         log.log('\nBLAST encountered an error:\n' + blast_err.decode())
+    if process.returncode != 0:
+        os.chdir(starting_dir)
+        raise CannotFindStart
 
-    # Find the best hit in the results.
-    best_hit, best_bitscore = None, 0
+    # Find the best hit for each replicon in the results.
+    best_hits, best_bitscores = [None] * len(sequences), [0] * len(sequences)
     for line in blast_out.decode().splitlines():
-        hit = BlastHit(line, seq_len)
+        i = get_replicon_index(line)
+        if i is None or i >= len(sequences):
+            continue
+        hit = BlastHit(line, seq_lens[i])
         if hit.pident >= identity_threshold and hit.query_cov >= coverage_threshold and \
-                hit.qstart == 0 and hit.bitscore > best_bitscore:
-            best_hit = hit
-            best_bitscore = hit.bitscore
+                hit.qstart == 0 and hit.bitscore > best_bitscores[i]:
+            best_hits[i] = hit
+            best_bitscores[i] = hit.bitscore
 
     os.chdir(starting_dir)
+    return best_hits
 
-    if best_bitscore:
-        return best_hit
-    else:
-        raise CannotFindStart
+
+def get_replicon_index(blast_line):
+    """
+    Returns which replicon a tblastn result line is for. Depending on the BLAST version, the
+    subject ID is either our name for the replicon or its ordinal number in the database.
+    """
+    sseqid = blast_line.rstrip('\n').split('\t')[-1]
+    match = re.search(r'replicon_(\d+)', sseqid) or re.search(r'BL_ORD_ID\|(\d+)', sseqid)
+    if match is None:
+        return None
+    return int(match.group(1))
 
 
 class BlastHit(object):
@@ -19,8 +19,6 @@ details. You should have received a copy of the GNU General Public License along
 not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
-import shutil
 import sys
 import math
 from collections import defaultdict
@@ -33,7 +31,7 @@ from . import log
 from . import settings
 
 try:
-    from .cpp_wrappers import fully_global_alignment
+    from .cpp_wrappers import fully_global_alignment_result
 except AttributeError as att_err:
     sys.exit('Error when importing C++ library: ' + str(att_err) + '\n'
              'Have you successfully built the library file using make?')
@@ -110,8 +108,8 @@ class SimpleLongReadBridge(object):
         return 'simple long read'
 
 
-def create_simple_long_read_bridges(graph, out_dir, keep, threads, read_dict, long_read_filename,
-                                    scoring_scheme, anchor_segments):
+def create_simple_long_read_bridges(graph, threads, read_dict, long_read_filename, scoring_scheme,
+                                    anchor_segments):
     """
     Create and return simple long read bridges.
     """
@@ -120,19 +118,13 @@ def create_simple_long_read_bridges(graph, out_dir, keep, threads, read_dict, lo
                         'repeat structures in the graph. This takes care of some "low-hanging '
                         'fruit" of the graph simplification.')
 
-    bridging_dir = os.path.join(out_dir, 'simple_bridging')
-    if not os.path.exists(bridging_dir):
-        os.makedirs(bridging_dir)
-    minimap_alignments = align_long_reads_to_assembly_graph(graph, long_read_filename,
-                                                            bridging_dir, threads)
+    minimap_alignments = align_long_reads_to_assembly_graph(graph, long_read_filename, threads)
     start_overlap_reads, end_overlap_reads = build_start_end_overlap_sets(minimap_alignments)
     bridges = simple_bridge_two_way_junctions(graph, start_overlap_reads, end_overlap_reads,
                                               minimap_alignments, anchor_segments)
     bridges += simple_bridge_loops(graph, start_overlap_reads, end_overlap_reads,
                                    minimap_alignments, read_dict, scoring_scheme, threads,
                                    anchor_segments)
-    if keep < 3:
-        shutil.rmtree(bridging_dir, ignore_errors=True)
     return bridges
 
 
@@ -481,11 +473,10 @@ def get_read_loop_vote(start, end, middle, repeat, strand, minimap_alignments, r
         for _ in range(loop_count):
             test_seq += middle_seq + repeat_seq
         test_seq += end_seg_seq
-        alignment_result = fully_global_alignment(read_seq, test_seq, scoring_scheme, True,
-                                                  settings.SIMPLE_REPEAT_BRIDGING_BAND_SIZE)
-        if alignment_result:
-            seqan_parts = alignment_result.split(',', 9)
-            test_seq_score = int(seqan_parts[6])
+        alignment_result = fully_global_alignment_result(read_seq, test_seq, scoring_scheme, True,
+                                                         settings.SIMPLE_REPEAT_BRIDGING_BAND_SIZE)
+        if alignment_result is not None:
+            test_seq_score = alignment_result.raw_score
             if best_score is None or test_seq_score > best_score:
                 best_score = test_seq_score
                 best_count = loop_count
@@ -0,0 +1,126 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module contains a class for checkpointing the stages of the Unicycler pipeline, so a rerun
+in the same output directory can skip any stage which was already completed with the same inputs.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import pickle
+import random
+import shutil
+from . import log
+from .version import __version__
+
+
+class StageManifest(object):
+    """
+    This class keeps a manifest of completed pipeline stages in the output directory. Each stage
+    is recorded with a key (a hash of its input files, its parameters and the key of the stage
+    before it) and a pickle of the stage's resulting state (graphs, bridges, etc.). The random
+    number generator's state is saved too, so a resumed run produces the same results as an
+    uninterrupted one.
+
+    Since each key includes the previous stage's key, changing the inputs to one stage means that
+    it and all later stages will be redone. Input files are identified by their path, size and
+    modification time rather than by hashing their contents, as read files can be very large.
+    """
+
+    def __init__(self, out_dir):
+        self.checkpoint_dir = os.path.join(out_dir, 'checkpoints')
+        self.manifest_filename = os.path.join(self.checkpoint_dir, 'manifest.json')
+        self.previous_key = ''
+        self.stages = {}
+        try:
+            with open(self.manifest_filename, 'rt') as manifest_file:
+                self.stages = json.load(manifest_file)['stages']
+        except (OSError, ValueError, KeyError, TypeError):
+            pass
+
+    def get_stage_key(self, stage_name, input_files, parameters):
+        """
+        Returns the key for a stage, given its input files and a dictionary of its parameters.
+        Stages must be keyed in pipeline order, as each key builds on the one before.
+        """
+        key_parts = {'version': __version__, 'stage': stage_name, 'previous': self.previous_key,
+                     'inputs': [get_file_fingerprint(x) for x in input_files],
+                     'parameters': parameters}
+        key_json = json.dumps(key_parts, sort_keys=True, default=str)
+        stage_key = hashlib.sha256(key_json.encode()).hexdigest()
+        self.previous_key = stage_key
+        return stage_key
+
+    def load_stage(self, stage_name, stage_key):
+        """
+        Returns the saved state for a stage, if it was completed with the same key. Returns None
+        if the stage needs to be run.
+        """
+        stage = self.stages.get(stage_name)
+        if stage is None or stage.get('key') != stage_key:
+            return None
+        state_filename = os.path.join(self.checkpoint_dir, stage['state_file'])
+        try:
+            with open(state_filename, 'rb') as state_file:
+                state, random_state = pickle.load(state_file)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError, AttributeError,
+                ImportError):
+            return None
+        log.log('\nResuming from checkpoint: ' + stage_name + ' stage already complete (' +
+                stage['completed'] + ')')
+        random.setstate(random_state)
+        return state
+
+    def save_stage(self, stage_name, stage_key, state):
+        """
+        Saves a completed stage's state and records it in the manifest. Both files are written to
+        temporary names and then moved into place, so a crash mid-write can't leave behind a
+        checkpoint that looks complete.
+        """
+        if not os.path.exists(self.checkpoint_dir):
+            os.makedirs(self.checkpoint_dir)
+        state_file = stage_name + '.pickle'
+        state_filename = os.path.join(self.checkpoint_dir, state_file)
+        with open(state_filename + '.incomplete', 'wb') as f:
+            pickle.dump((state, random.getstate()), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(state_filename + '.incomplete', state_filename)
+
+        self.stages[stage_name] = {'key': stage_key, 'state_file': state_file,
+                                   'completed': log.get_timestamp()}
+        with open(self.manifest_filename + '.incomplete', 'wt') as manifest_file:
+            json.dump({'unicycler_version': __version__,
+                       'updated': datetime.datetime.now().isoformat(),
+                       'stages': self.stages}, manifest_file, indent=2, sort_keys=True)
+        os.replace(self.manifest_filename + '.incomplete', self.manifest_filename)
+
+    def delete(self):
+        """
+        Removes all checkpoints.
+        """
+        self.stages = {}
+        if os.path.isdir(self.checkpoint_dir):
+            shutil.rmtree(self.checkpoint_dir, ignore_errors=True)
+
+
+def get_file_fingerprint(filename):
+    """
+    Returns a description of an input file which will change if the file does.
+    """
+    if not filename:
+        return None
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return [os.path.abspath(filename), None, None]
+    return [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
@@ -14,9 +14,10 @@ details. You should have received a copy of the GNU General Public License along
 not, see <http://www.gnu.org/licenses/>.
 """
 
+import array
 import os
 from ctypes import CDLL, cast, c_char_p, c_int, c_uint, c_ulong, c_double, c_void_p, c_bool, \
-    c_float, POINTER
+    c_float, c_longlong, POINTER, Structure, string_at, byref
 from .misc import quit_with_error
 
 
@@ -55,6 +56,164 @@ def semi_global_alignment(read_name, read_sequence, verbosity, minimap_alignment
     return c_string_to_python_string(ptr)
 
 
+# This is a batch version of the semi-global alignment function. The C++ side aligns the reads
+# with its own threads and returns the results in flat arrays (see semi_global_align.h).
+class SemiGlobalBatchResults(Structure):
+    _fields_ = [('alignmentCount', c_int),
+                ('readIndices', POINTER(c_int)),
+                ('revComps', POINTER(c_int)),
+                ('readStarts', POINTER(c_int)),
+                ('readEnds', POINTER(c_int)),
+                ('refStarts', POINTER(c_int)),
+                ('refEnds', POINTER(c_int)),
+                ('rawScores', POINTER(c_int)),
+                ('scaledScores', POINTER(c_double)),
+                ('milliseconds', POINTER(c_int)),
+                ('refNameOffsets', POINTER(c_longlong)),
+                ('refNames', c_void_p),
+                ('cigarOffsets', POINTER(c_longlong)),
+                ('cigarLengths', POINTER(c_int)),
+                ('cigarOps', c_void_p),
+                ('outputOffsets', POINTER(c_longlong)),
+                ('outputs', c_void_p)]
+
+C_LIB.semiGlobalAlignmentBatch.argtypes = [c_int,                # Read count
+                                           c_char_p,             # Read names
+                                           POINTER(c_longlong),  # Read name offsets
+                                           c_char_p,             # Read sequences
+                                           POINTER(c_longlong),  # Read sequence offsets
+                                           c_char_p,             # Minimap alignment info
+                                           POINTER(c_longlong),  # Minimap alignment offsets
+                                           c_int,                # Verbosity
+                                           c_void_p,             # KmerPositions pointer
+                                           c_int,                # Match score
+                                           c_int,                # Mismatch score
+                                           c_int,                # Gap open score
+                                           c_int,                # Gap extension score
+                                           c_int,                # Sensitivity level
+                                           c_int]                # Threads
+C_LIB.semiGlobalAlignmentBatch.restype = POINTER(SemiGlobalBatchResults)
+
+C_LIB.freeSemiGlobalBatchResults.argtypes = [POINTER(SemiGlobalBatchResults)]
+C_LIB.freeSemiGlobalBatchResults.restype = None
+
+def semi_global_alignment_batch(read_names, read_sequences, verbosity, minimap_alignments_strs,
+                                kmer_positions_ptr, match_score, mismatch_score, gap_open_score,
+                                gap_extend_score, sensitivity_level, threads):
+    """
+    Aligns many reads with one call to the C++ code. Returns a list (one per read) of alignment
+    result tuples: (ref name, rev comp, read start, read end, ref start, ref end, raw score,
+    scaled score, milliseconds, CIGAR parts). Also returns a list of each read's console output.
+    """
+    read_count = len(read_names)
+    names_buffer, name_offsets = concatenate_strings(read_names)
+    seqs_buffer, seq_offsets = concatenate_strings(read_sequences)
+    minimap_buffer, minimap_offsets = concatenate_strings(minimap_alignments_strs)
+    results_ptr = C_LIB.semiGlobalAlignmentBatch(read_count, names_buffer, name_offsets,
+                                                 seqs_buffer, seq_offsets, minimap_buffer,
+                                                 minimap_offsets, verbosity, kmer_positions_ptr,
+                                                 match_score, mismatch_score, gap_open_score,
+                                                 gap_extend_score, sensitivity_level, threads)
+    r = results_ptr.contents
+    n = r.alignmentCount
+
+    # Slicing the ctypes pointers copies each array into a list in one go.
+    read_indices, rev_comps = r.readIndices[:n], r.revComps[:n]
+    read_starts, read_ends = r.readStarts[:n], r.readEnds[:n]
+    ref_starts, ref_ends = r.refStarts[:n], r.refEnds[:n]
+    raw_scores, scaled_scores, milliseconds = r.rawScores[:n], r.scaledScores[:n], \
+        r.milliseconds[:n]
+    ref_name_offsets, cigar_offsets = r.refNameOffsets[:n + 1], r.cigarOffsets[:n + 1]
+    ref_names = string_at(r.refNames, ref_name_offsets[-1])
+    cigar_lengths = r.cigarLengths[:cigar_offsets[-1]]
+    cigar_ops = string_at(r.cigarOps, cigar_offsets[-1]).decode()
+    output_offsets = r.outputOffsets[:read_count + 1]
+    outputs = string_at(r.outputs, output_offsets[-1])
+    C_LIB.freeSemiGlobalBatchResults(results_ptr)
+
+    read_results = [[] for _ in range(read_count)]
+    for i in range(n):
+        cigar_start, cigar_end = cigar_offsets[i], cigar_offsets[i + 1]
+        cigar_parts = [str(length) + op for length, op in
+                       zip(cigar_lengths[cigar_start:cigar_end], cigar_ops[cigar_start:cigar_end])]
+        ref_name = ref_names[ref_name_offsets[i]:ref_name_offsets[i + 1]].decode()
+        read_results[read_indices[i]].append((ref_name, bool(rev_comps[i]), read_starts[i],
+                                              read_ends[i], ref_starts[i], ref_ends[i],
+                                              raw_scores[i], scaled_scores[i], milliseconds[i],
+                                              cigar_parts))
+    read_outputs = [outputs[output_offsets[i]:output_offsets[i + 1]].decode()
+                    for i in range(read_count)]
+    return read_results, read_outputs
+
+
+def concatenate_strings(strings):
+    """
+    Joins strings into one buffer for passing to C++, along with a ctypes array of where each
+    string starts (plus a final entry for the end of the buffer).
+    """
+    encoded = [x.encode('utf-8') for x in strings]
+    offsets = [0]
+    for x in encoded:
+        offsets.append(offsets[-1] + len(x))
+    return b''.join(encoded), (c_longlong * len(offsets))(*offsets)
+
+
+
+# Some of the alignment functions below have a second version (ending in 'Result') which returns
+# the alignment as a struct (see scoredalignment.h) instead of a string, so callers can use the
+# numbers directly without string formatting and parsing.
+class AlignmentResultStruct(Structure):
+    _fields_ = [('revComp', c_int),
+                ('readStart', c_int),
+                ('readEnd', c_int),
+                ('refStart', c_int),
+                ('refEnd', c_int),
+                ('rawScore', c_int),
+                ('scaledScore', c_double),
+                ('milliseconds', c_int),
+                ('cigarCount', c_int),
+                ('cigarLengths', POINTER(c_int)),
+                ('cigarOps', c_void_p)]
+
+C_LIB.freeAlignmentResult.argtypes = [POINTER(AlignmentResultStruct)]
+C_LIB.freeAlignmentResult.restype = None
+
+
+class AlignmentResult(object):
+    """
+    This class holds the values of an alignment done by one of the C++ pairwise aligners. Positions
+    are for sequence 1 (read) and sequence 2 (ref). The CIGAR is given as a list of run lengths and
+    a string of operations, e.g. [5, 100] and 'IM' for 5I100M.
+    """
+    __slots__ = ['rev_comp', 'read_start', 'read_end', 'ref_start', 'ref_end', 'raw_score',
+                 'scaled_score', 'milliseconds', 'cigar_lengths', 'cigar_ops']
+
+    def __init__(self, result_struct):
+        r = result_struct
+        self.rev_comp = bool(r.revComp)
+        self.read_start, self.read_end = r.readStart, r.readEnd
+        self.ref_start, self.ref_end = r.refStart, r.refEnd
+        self.raw_score, self.scaled_score = r.rawScore, r.scaledScore
+        self.milliseconds = r.milliseconds
+        self.cigar_lengths = r.cigarLengths[:r.cigarCount]
+        self.cigar_ops = string_at(r.cigarOps, r.cigarCount).decode()
+
+    def get_cigar_parts(self):
+        return [str(length) + op for length, op in zip(self.cigar_lengths, self.cigar_ops)]
+
+
+def alignment_result_ptr_to_python(result_ptr):
+    """
+    Copies an alignment result struct into an AlignmentResult object and frees the struct. Returns
+    None for a null pointer (the alignment failed).
+    """
+    if not result_ptr:
+        return None
+    result = AlignmentResult(result_ptr.contents)
+    C_LIB.freeAlignmentResult(result_ptr)
+    return result
+
+
 
 # This function does an exhaustive semi-global alignment (nothing fancy, only suitable for short
 # sequences).
@@ -73,6 +232,17 @@ def semi_global_alignment_exhaustive(sequence_1, sequence_2, scoring_scheme):
                                               scoring_scheme.gap_open, scoring_scheme.gap_extend)
     return c_string_to_python_string(ptr)
 
+C_LIB.semiGlobalAlignmentExhaustiveResult.argtypes = C_LIB.semiGlobalAlignmentExhaustive.argtypes
+C_LIB.semiGlobalAlignmentExhaustiveResult.restype = POINTER(AlignmentResultStruct)
+
+def semi_global_alignment_exhaustive_result(sequence_1, sequence_2, scoring_scheme):
+    ptr = C_LIB.semiGlobalAlignmentExhaustiveResult(sequence_1.encode('utf-8'),
+                                                    sequence_2.encode('utf-8'),
+                                                    scoring_scheme.match, scoring_scheme.mismatch,
+                                                    scoring_scheme.gap_open,
+                                                    scoring_scheme.gap_extend)
+    return alignment_result_ptr_to_python(ptr)
+
 
 
 # This is the global alignment function mainly used to compare read consensus sequences to assembly
@@ -94,6 +264,18 @@ def fully_global_alignment(sequence_1, sequence_2, scoring_scheme, use_banding,
                                      use_banding, band_size)
     return c_string_to_python_string(ptr)
 
+C_LIB.fullyGlobalAlignmentResult.argtypes = C_LIB.fullyGlobalAlignment.argtypes
+C_LIB.fullyGlobalAlignmentResult.restype = POINTER(AlignmentResultStruct)
+
+def fully_global_alignment_result(sequence_1, sequence_2, scoring_scheme, use_banding,
+                                  band_size):
+    ptr = C_LIB.fullyGlobalAlignmentResult(sequence_1.encode('utf-8'),
+                                           sequence_2.encode('utf-8'),
+                                           scoring_scheme.match, scoring_scheme.mismatch,
+                                           scoring_scheme.gap_open, scoring_scheme.gap_extend,
+                                           use_banding, band_size)
+    return alignment_result_ptr_to_python(ptr)
+
 
 
 # This is the mostly-global alignment function mainly used to compare potential path sequences to
@@ -116,6 +298,16 @@ def path_alignment(partial_seq, full_seq, scoring_scheme, use_banding, band_size
                               use_banding, band_size)
     return c_string_to_python_string(ptr)
 
+C_LIB.pathAlignmentResult.argtypes = C_LIB.pathAlignment.argtypes
+C_LIB.pathAlignmentResult.restype = POINTER(AlignmentResultStruct)
+
+def path_alignment_result(partial_seq, full_seq, scoring_scheme, use_banding, band_size):
+    ptr = C_LIB.pathAlignmentResult(partial_seq.encode('utf-8'), full_seq.encode('utf-8'),
+                                    scoring_scheme.match, scoring_scheme.mismatch,
+                                    scoring_scheme.gap_open, scoring_scheme.gap_extend,
+                                    use_banding, band_size)
+    return alignment_result_ptr_to_python(ptr)
+
 
 
 # This function cleans up the heap memory for the C strings returned by the other C functions. It
@@ -211,6 +403,35 @@ def simulate_depths(read_lengths, ref_length, iterations, threads):
     return c_string_to_python_string(ptr)
 
 
+# This version of the depth simulation returns the min and max depth distributions as arrays,
+# where element i is the fraction of iterations with that min/max depth.
+class DepthDistributionsStruct(Structure):
+    _fields_ = [('minCount', c_int),
+                ('minDistribution', POINTER(c_double)),
+                ('maxCount', c_int),
+                ('maxDistribution', POINTER(c_double))]
+
+C_LIB.simulateDepthDistributions.argtypes = [POINTER(c_int),  # Alignment lengths
+                                             c_int,  # Alignment count
+                                             c_int,  # Reference length
+                                             c_int,  # Iterations
+                                             c_int]  # Threads
+C_LIB.simulateDepthDistributions.restype = POINTER(DepthDistributionsStruct)
+C_LIB.freeDepthDistributions.argtypes = [POINTER(DepthDistributionsStruct)]
+C_LIB.freeDepthDistributions.restype = None
+
+def simulate_depth_distributions(read_lengths, ref_length, iterations, threads):
+    # noinspection PyCallingNonCallable
+    read_lengths_array = (c_int * len(read_lengths))(*read_lengths)
+    result_ptr = C_LIB.simulateDepthDistributions(read_lengths_array, len(read_lengths),
+                                                  ref_length, iterations, threads)
+    r = result_ptr.contents
+    min_distribution = array.array('d', r.minDistribution[:r.minCount])
+    max_distribution = array.array('d', r.maxDistribution[:r.maxCount])
+    C_LIB.freeDepthDistributions(result_ptr)
+    return min_distribution, max_distribution
+
+
 
 # This function gets the mean and standard deviation of alignments between random sequences.
 C_LIB.multipleSequenceAlignment.argtypes = [POINTER(c_char_p),  # Sequences
@@ -260,6 +481,12 @@ C_LIB.minimapAlignReads.restype = c_void_p     # String describing alignments
 
 def minimap_align_reads(reference_fasta, reads_fastq, threads, sensitivity_level,
                         preset_name='default'):
+    ptr = C_LIB.minimapAlignReads(reference_fasta.encode('utf-8'), reads_fastq.encode('utf-8'),
+                                  threads, sensitivity_level, get_minimap_preset(preset_name))
+    return c_string_to_python_string(ptr)
+
+
+def get_minimap_preset(preset_name):
     preset = 0  # default
     if preset_name == 'read vs read':
         preset = 1
@@ -269,10 +496,52 @@ def minimap_align_reads(reference_fasta, reads_fastq, threads, sensitivity_level
         preset = 1
     if preset_name == 'scrub assembly with reads':
         preset = 2
-    ptr = C_LIB.minimapAlignReads(reference_fasta.encode('utf-8'), reads_fastq.encode('utf-8'),
-                                  threads, sensitivity_level, preset)
+    return preset
+
+
+# These functions make/use/delete a C++ minimap index of reference sequences held in memory, so
+# the index can be built once and used for more than one alignment. The sensitivity level and
+# preset given when aligning must be the same as those used to build the index.
+C_LIB.newMinimapIndex.argtypes = [POINTER(c_char_p),  # Reference names
+                                  POINTER(c_char_p),  # Reference sequences
+                                  c_int,              # Reference count
+                                  c_int,              # Threads
+                                  c_int,              # Sensitivity level
+                                  c_int]              # Settings preset
+C_LIB.newMinimapIndex.restype = c_void_p              # Pointer to index
+
+def new_minimap_index(references, threads, sensitivity_level, preset_name='default'):
+    """
+    Takes a list of (name, sequence) tuples.
+    """
+    names = [x[0].encode('utf-8') for x in references]
+    sequences = [x[1].encode('utf-8') for x in references]
+    # noinspection PyCallingNonCallable
+    names = (c_char_p * len(names))(*names)
+    # noinspection PyCallingNonCallable
+    sequences = (c_char_p * len(sequences))(*sequences)
+    return C_LIB.newMinimapIndex(names, sequences, len(references), threads, sensitivity_level,
+                                 get_minimap_preset(preset_name))
+
+C_LIB.minimapAlignReadsToIndex.argtypes = [c_void_p,  # Index pointer
+                                           c_char_p,  # Reads FASTQ filename
+                                           c_int,     # Threads
+                                           c_int,     # Sensitivity level
+                                           c_int]     # Settings preset
+C_LIB.minimapAlignReadsToIndex.restype = c_void_p     # String describing alignments
+
+def minimap_align_reads_to_index(index_ptr, reads_fastq, threads, sensitivity_level,
+                                 preset_name='default'):
+    ptr = C_LIB.minimapAlignReadsToIndex(index_ptr, reads_fastq.encode('utf-8'), threads,
+                                         sensitivity_level, get_minimap_preset(preset_name))
     return c_string_to_python_string(ptr)
 
+C_LIB.deleteMinimapIndex.argtypes = [c_void_p]
+C_LIB.deleteMinimapIndex.restype = None
+
+def delete_minimap_index(index_ptr):
+    C_LIB.deleteMinimapIndex(index_ptr)
+
 C_LIB.minimapAlignReadsWithSettings.argtypes = [c_char_p,  # Reference FASTA filename
                                                 c_char_p,  # Reads FASTQ filename
                                                 c_int,     # Threads
@@ -321,12 +590,24 @@ C_LIB.overlapAlignment.argtypes = [c_char_p,  # Sequence 1
                                    c_int]     # Guess overlap
 C_LIB.overlapAlignment.restype = c_void_p     # String describing alignment
 
+C_LIB.overlapAlignmentOverlaps.argtypes = [c_char_p,        # Sequence 1
+                                           c_char_p,        # Sequence 2
+                                           c_int,           # Match score
+                                           c_int,           # Mismatch score
+                                           c_int,           # Gap open score
+                                           c_int,           # Gap extension score
+                                           c_int,           # Guess overlap
+                                           POINTER(c_int),  # Sequence 1 overlap (output)
+                                           POINTER(c_int)]  # Sequence 2 overlap (output)
+C_LIB.overlapAlignmentOverlaps.restype = None
+
 def overlap_alignment(sequence_1, sequence_2, scoring_scheme, guess_overlap):
-    ptr = C_LIB.overlapAlignment(sequence_1.encode('utf-8'), sequence_2.encode('utf-8'),
-                                 scoring_scheme.match, scoring_scheme.mismatch,
-                                 scoring_scheme.gap_open, scoring_scheme.gap_extend, guess_overlap)
-    result = c_string_to_python_string(ptr)
-    return (int(x) for x in result.split(','))
+    overlap_1, overlap_2 = c_int(), c_int()
+    C_LIB.overlapAlignmentOverlaps(sequence_1.encode('utf-8'), sequence_2.encode('utf-8'),
+                                   scoring_scheme.match, scoring_scheme.mismatch,
+                                   scoring_scheme.gap_open, scoring_scheme.gap_extend,
+                                   guess_overlap, byref(overlap_1), byref(overlap_2))
+    return overlap_1.value, overlap_2.value
 
 
 # When s1 is expected to be at the start of s2, this function will align them to give the s2
@@ -78,6 +78,7 @@ void mm_idx_set_max_occ(mm_idx_t *mi, float f);
 const uint64_t *mm_idx_get(const mm_idx_t *mi, uint64_t minier, int *n);
 
 mm_idx_t *mm_idx_build(const char *fn, int w, int k, int n_threads);
+mm_idx_t *mm_idx_gen_seqs(int n, char **names, char **seqs, int w, int k, int b, int n_threads);
 
 // minimizer index I/O
 void mm_idx_dump(FILE *fp, const mm_idx_t *mi);
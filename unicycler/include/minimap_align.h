@@ -22,6 +22,14 @@ extern "C" {
     char * minimapAlignReads(char * referenceFasta, char * readsFastq, int n_threads,
                              int sensitivityLevel, int preset);
 
+    void * newMinimapIndex(char ** names, char ** sequences, int count, int n_threads,
+                           int sensitivityLevel, int preset);
+
+    char * minimapAlignReadsToIndex(void * index, char * readsFastq, int n_threads,
+                                    int sensitivityLevel, int preset);
+
+    void deleteMinimapIndex(void * index);
+
     char * minimapAlignReadsWithSettings(char * referenceFasta, char * readsFastq, int n_threads,
                                          bool allVsAll, int kmerSize, int minimiserSize,
                                          float mergeFrac, int minMatchLength, int maxGap,
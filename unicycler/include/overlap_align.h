@@ -22,6 +22,11 @@ extern "C" {
     char * overlapAlignment(char * s1, char * s2,
                             int matchScore, int mismatchScore, int gapOpenScore, int gapExtensionScore,
                             int guessOverlap);
+
+    void overlapAlignmentOverlaps(char * s1, char * s2,
+                                  int matchScore, int mismatchScore,
+                                  int gapOpenScore, int gapExtensionScore,
+                                  int guessOverlap, int * overlap1, int * overlap2);
 }
 
 #endif // OVERLAP_ALIGN_H
@@ -24,6 +24,11 @@ extern "C" {
     char * pathAlignment(char * s1, char * s2,
                          int matchScore, int mismatchScore, int gapOpenScore, int gapExtensionScore,
                          bool useBanding=false, int bandSize=1000);
+
+    AlignmentResult * pathAlignmentResult(char * s1, char * s2,
+                                          int matchScore, int mismatchScore,
+                                          int gapOpenScore, int gapExtensionScore,
+                                          bool useBanding=false, int bandSize=1000);
 }
 
 
@@ -20,6 +20,15 @@
 
 using namespace seqan;
 
+// The min and max depth distributions from simulateDepthDistributions. Element i of each array is
+// the fraction of iterations with that min/max depth. Must be freed with freeDepthDistributions.
+struct DepthDistributions {
+    int minCount;
+    double * minDistribution;
+    int maxCount;
+    double * maxDistribution;
+};
+
 // Functions that are called by the Python script must have C linkage, not C++ linkage.
 extern "C" {
 
@@ -28,8 +37,14 @@ extern "C" {
     char * getRandomSequenceAlignmentErrorRates(int seqLength, int n,
                                                int matchScore, int mismatchScore, int gapOpenScore, int gapExtensionScore);
     char * simulateDepths(int alignmentLengths[], int alignmentCount, int refLength, int iterations, int threadCount);
+    DepthDistributions * simulateDepthDistributions(int alignmentLengths[], int alignmentCount, int refLength,
+                                                    int iterations, int threadCount);
+    void freeDepthDistributions(DepthDistributions * distributions);
 }
 
+void simulateDepthCounts(int alignmentLengths[], int alignmentCount, int refLength, int iterations, int threadCount,
+                         std::vector<int> * minDepthCounts, std::vector<int> * maxDepthCounts);
+
 void simulateDepthsOneThread(int alignmentLengths[], int alignmentCount, int refLength, int iterations,
                              std::vector<int> * minDepthCounts, std::vector<int> * maxDepthCounts,
                              std::mutex * mut);
@@ -14,6 +14,7 @@
 
 
 #include <string>
+#include <vector>
 #include <seqan/basic.h>
 #include <seqan/align.h>
 
@@ -22,6 +23,23 @@ using namespace seqan;
 enum CigarType {MATCH, INSERTION, DELETION, CLIP, NOTHING};
 
 
+// This struct holds one alignment's values for returning to Python without building and parsing a
+// string. The CIGAR is stored as run lengths and operation characters (cigarCount of each).
+struct AlignmentResult {
+    int revComp;
+    int readStart;
+    int readEnd;
+    int refStart;
+    int refEnd;
+    int rawScore;
+    double scaledScore;
+    int milliseconds;
+    int cigarCount;
+    int * cigarLengths;
+    char * cigarOps;
+};
+
+
 class ScoredAlignment {
 public:
     ScoredAlignment(Align<Dna5String, ArrayGaps> & alignment, 
@@ -32,6 +50,8 @@ public:
                     Score<int, Simple> & scoringScheme);
     std::string getFullString();
     std::string getShortDisplayString();
+    AlignmentResult * getAlignmentResult();
+    void getCigarRuns(std::vector<int> & lengths, std::string & ops);
     bool isRevComp();
     int getReadAlignmentLength() {return m_readEndPos - m_readStartPos;}
     int getRefAlignmentLength() {return m_refEndPos - m_refStartPos;}
@@ -60,4 +80,11 @@ private:
 
 long long getTime();
 
+AlignmentResult * getAlignmentResultAndDelete(ScoredAlignment * alignment);
+
+// Functions that are called by the Python script must have C linkage, not C++ linkage.
+extern "C" {
+    void freeAlignmentResult(AlignmentResult * result);
+}
+
 #endif // ALIGNMENT_H
@@ -50,6 +50,30 @@ typedef std::unordered_set<Point> PointSet;
 typedef std::vector<Point> PointVector;
 
 
+// The results of aligning a batch of reads, as flat arrays. The per-alignment arrays have one
+// value for each alignment. Variable-length values (reference names, CIGARs and each read's
+// console output) are stored end to end with offset arrays (one more entry than there are items)
+// marking where each one starts. CIGARs are stored as run lengths and operation characters.
+struct SemiGlobalBatchResults {
+    int alignmentCount;
+    int * readIndices;
+    int * revComps;
+    int * readStarts;
+    int * readEnds;
+    int * refStarts;
+    int * refEnds;
+    int * rawScores;
+    double * scaledScores;
+    int * milliseconds;
+    long long * refNameOffsets;
+    char * refNames;
+    long long * cigarOffsets;
+    int * cigarLengths;
+    char * cigarOps;
+    long long * outputOffsets;
+    char * outputs;
+};
+
 // Functions that are called by the Python script must have C linkage, not C++ linkage.
 extern "C" {
 
@@ -58,8 +82,29 @@ extern "C" {
                                int matchScore, int mismatchScore, int gapOpenScore,
                                int gapExtensionScore, double lowScoreThreshold, bool returnBad,
                                int sensitivityLevel);
+
+    SemiGlobalBatchResults * semiGlobalAlignmentBatch(int readCount, char * readNames,
+                                                      long long * readNameOffsets,
+                                                      char * readSeqs, long long * readSeqOffsets,
+                                                      char * minimapAlignmentsStrs,
+                                                      long long * minimapAlignmentsOffsets,
+                                                      int verbosity, SeqMap * refSeqs,
+                                                      int matchScore, int mismatchScore,
+                                                      int gapOpenScore, int gapExtensionScore,
+                                                      int sensitivityLevel, int threads);
+
+    void freeSemiGlobalBatchResults(SemiGlobalBatchResults * results);
 }
 
+std::vector<ScoredAlignment *> semiGlobalAlignmentOneRead(std::string & readName,
+                                                          std::string & posReadSeq,
+                                                          std::string & minimapAlignmentsStr,
+                                                          SeqMap * refSeqs, int matchScore,
+                                                          int mismatchScore, int gapOpenScore,
+                                                          int gapExtensionScore,
+                                                          int sensitivityLevel, int verbosity,
+                                                          std::string & output);
+
 std::vector<ScoredAlignment *> alignReadToReferenceRange(SeqMap * refSeqs, std::string refName,
                                                          StartEndRange refRange, int refLen,
                                                          std::string readName, char readStrand,
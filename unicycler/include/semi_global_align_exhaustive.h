@@ -24,6 +24,11 @@ extern "C" {
     char * semiGlobalAlignmentExhaustive(char * s1, char * s2,
                                          int matchScore, int mismatchScore,
                                          int gapOpenScore, int gapExtensionScore);
+
+    AlignmentResult * semiGlobalAlignmentExhaustiveResult(char * s1, char * s2,
+                                                          int matchScore, int mismatchScore,
+                                                          int gapOpenScore,
+                                                          int gapExtensionScore);
 }
 
 
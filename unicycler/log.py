@@ -15,6 +15,7 @@ not, see <http://www.gnu.org/licenses/>.
 
 import sys
 import os
+import io
 import datetime
 import re
 import shutil
@@ -158,6 +159,44 @@ def log_number_list(numbers, verbosity=1, print_to_screen=True, write_to_log_fil
         log(text, verbosity=verbosity, print_to_screen=False, write_to_log_file=True)
 
 
+class CapturedLog(object):
+    """
+    Used as a context manager, this captures everything logged inside the with block (both the
+    stdout and log file parts) instead of writing it out. It's for worker processes, so their log
+    output can be passed back to the main process and written out (using write_captured_log) in
+    a consistent order.
+    """
+
+    def __init__(self):
+        self.stdout_text = io.StringIO()
+        self.log_file_text = io.StringIO()
+        self.old_stdout = None
+        self.old_log_file = None
+
+    def __enter__(self):
+        self.old_stdout, self.old_log_file = sys.stdout, logger.log_file
+        sys.stdout = self.stdout_text
+        logger.log_file = self.log_file_text
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        sys.stdout = self.old_stdout
+        logger.log_file = self.old_log_file
+
+    def get_output(self):
+        return self.stdout_text.getvalue(), self.log_file_text.getvalue()
+
+
+def write_captured_log(stdout_text, log_file_text):
+    """
+    Writes out log output which was captured using CapturedLog.
+    """
+    if stdout_text:
+        print(stdout_text, end='', flush=True)
+    if logger.log_file and log_file_text:
+        logger.log_file.write(log_file_text)
+
+
 def int_to_str(num, max_num=0):
     if num is None:
         num_str = 'n/a'
@@ -96,7 +96,7 @@ def make_miniasm_string_graph(graph, read_dict, long_read_filename, scoring_sche
     # If not, we need to do all of the long read assembly steps now.
     else:
         assembly_read_names = get_miniasm_assembly_reads(graph, read_dict, long_read_filename,
-                                                         miniasm_dir, args.threads)
+                                                         args.threads)
 
         # TO DO: identify chimeric reads and throw them out. This was part of miniasm, but it was
         # removed due to 'not working as intended', so I pulled it out of my miniasm as well.
@@ -223,10 +223,10 @@ def make_miniasm_string_graph(graph, read_dict, long_read_filename, scoring_sche
     return unitig_graph
 
 
-def get_miniasm_assembly_reads(graph, read_dict, long_read_filename, miniasm_dir, threads):
+def get_miniasm_assembly_reads(graph, read_dict, long_read_filename, threads):
     if graph is not None:  # hybrid assembly
         minimap_alignments = align_long_reads_to_assembly_graph(graph, long_read_filename,
-                                                                miniasm_dir, threads)
+                                                                threads)
         miniasm_assembly_reads = []
         for read_name, alignments in minimap_alignments.items():
             if any(a.overlaps_reference() for a in alignments):
@@ -633,9 +633,9 @@ def find_contig_starts_and_ends(miniasm_dir, assembly_graph, unitig_graph, threa
     references = load_references(unitigs_fasta, section_header=None, show_progress=False)
     read_dict, read_names, read_filename = load_long_reads(contigs_fasta, silent=True)
     min_alignment_len = min(contig_search_end_size * 0.9, smallest_contig_seq_len * 0.9)
-    semi_global_align_long_reads(references, unitigs_fasta, read_dict, read_names, read_filename,
-                                 threads, scoring_scheme, [None], False, min_alignment_len, None,
-                                 None, 10, 0, None, verbosity=0)
+    semi_global_align_long_reads(references, read_dict, read_names, read_filename, threads,
+                                 scoring_scheme, [None], False, min_alignment_len, None, None, 10,
+                                 0, None, verbosity=0)
     start_positions = {}
     end_positions = {}
     for contig_name in read_names:
@@ -14,16 +14,17 @@ details. You should have received a copy of the GNU General Public License along
 not, see <http://www.gnu.org/licenses/>.
 """
 
-import os
+import hashlib
 import sys
-from collections import defaultdict
+from collections import defaultdict, OrderedDict
 from .misc import get_nice_header, dim, line_iterator, range_overlap, range_is_contained, \
     range_overlap_size, simplify_ranges
 from . import log
 from . import settings
 
 try:
-    from .cpp_wrappers import minimap_align_reads
+    from .cpp_wrappers import new_minimap_index, minimap_align_reads_to_index, \
+        delete_minimap_index
 except AttributeError as e:
     sys.exit('Error when importing C++ library: ' + str(e) + '\n'
              'Have you successfully built the library file using make?')
@@ -178,16 +179,16 @@ def alignments_overlap(a, other, allowed_overlap):
     return any(range_overlap(adjusted_start, a.read_end, x.read_start, x.read_end) for x in other)
 
 
-def align_long_reads_to_assembly_graph(graph, long_read_filename, working_dir, threads):
+def align_long_reads_to_assembly_graph(graph, long_read_filename, threads):
     """
     Aligns all long reads to all graph segments and returns a dictionary of alignments (key =
     read name, value = list of MinimapAlignment objects).
     """
-    segments_fasta = os.path.join(working_dir, 'all_segments.fasta')
     log.log('Aligning long reads to graph using minimap', 1)
-    graph.save_to_fasta(segments_fasta, verbosity=2)
-    minimap_alignments_str = minimap_align_reads(segments_fasta, long_read_filename, threads, 3,
-                                                 'default')
+    references = [(str(x.number), x.forward_sequence)
+                  for x in sorted(graph.segments.values(), key=lambda x: x.number)]
+    minimap_alignments_str = minimap_align_reads_to_references(references, long_read_filename,
+                                                               threads, 3, 'default')
     minimap_alignments = \
         load_minimap_alignments(minimap_alignments_str, filter_overlaps=True,
                                 allowed_overlap=settings.ALLOWED_MINIMAP_OVERLAP,
@@ -332,3 +333,46 @@ def get_opposite_alignment(alignment):
     opposite_alignment.ref_end_gap = opposite_alignment.ref_length - opposite_alignment.ref_end
 
     return opposite_alignment
+
+
+# Minimap indices of reference sequences which may be used again, least recently used first.
+MINIMAP_INDICES = OrderedDict()
+
+
+def minimap_align_reads_to_references(references, reads_fastq, threads, sensitivity_level,
+                                      preset_name='default'):
+    """
+    Aligns reads (in a file) to references (a list of (name, sequence) tuples) and returns the
+    minimap alignments string. The references are indexed in memory, and an index built earlier
+    in this run for the same references and settings is used again.
+    """
+    index_key = get_minimap_index_key(references, sensitivity_level, preset_name)
+    if index_key in MINIMAP_INDICES:
+        MINIMAP_INDICES.move_to_end(index_key)
+        log.log('Using existing minimap index of references', 3)
+    else:
+        MINIMAP_INDICES[index_key] = new_minimap_index(references, threads, sensitivity_level,
+                                                       preset_name)
+        while len(MINIMAP_INDICES) > settings.MINIMAP_INDEX_CACHE_SIZE:
+            delete_minimap_index(MINIMAP_INDICES.popitem(last=False)[1])
+    return minimap_align_reads_to_index(MINIMAP_INDICES[index_key], reads_fastq, threads,
+                                        sensitivity_level, preset_name)
+
+
+def clear_minimap_indices():
+    """
+    Frees all cached minimap indices. Called when the long-read alignment stages are done so the
+    indices don't sit in memory for the rest of the run.
+    """
+    while MINIMAP_INDICES:
+        delete_minimap_index(MINIMAP_INDICES.popitem()[1])
+
+
+def get_minimap_index_key(references, sensitivity_level, preset_name):
+    ref_hash = hashlib.sha256()
+    for name, sequence in references:
+        ref_hash.update(name.encode())
+        ref_hash.update(b'\t')
+        ref_hash.update(sequence.encode())
+        ref_hash.update(b'\n')
+    return ref_hash.hexdigest(), sensitivity_level, preset_name
@@ -39,6 +39,20 @@ REV_COMP_DICT = {'A': 'T', 'T': 'A', 'G': 'C', 'C': 'G',
                  'd': 'h', 'h': 'd', 'n': 'n',
                  '.': '.', '-': '-', '?': '?'}
 
+
+class ComplementTable(dict):
+    """
+    A translation table version of REV_COMP_DICT, for complementing whole sequences at once. The
+    first 256 characters are filled in ahead of time and any other character (like any character
+    which isn't in REV_COMP_DICT) complements to N.
+    """
+    def __missing__(self, key):
+        return 'N'
+
+
+COMPLEMENT_TABLE = ComplementTable(str.maketrans({chr(i): REV_COMP_DICT.get(chr(i), 'N')
+                                                  for i in range(256)}))
+
 RANDOM_SEQ_DICT = {0: 'A', 1: 'C', 2: 'G', 3: 'T'}
 
 
@@ -216,7 +230,14 @@ def reverse_complement(seq):
     """
     Given a DNA sequences, this function returns the reverse complement sequence.
     """
-    return ''.join([complement_base(x) for x in seq][::-1])
+    return seq.translate(COMPLEMENT_TABLE)[::-1]
+
+
+def complement(seq):
+    """
+    Given a DNA sequence, this function returns the complement sequence (not reversed).
+    """
+    return seq.translate(COMPLEMENT_TABLE)
 
 
 def complement_base(base):
@@ -229,6 +250,19 @@ def complement_base(base):
         return 'N'
 
 
+def is_homopolymer(seq):
+    """
+    Returns True if the sequence is made up of only one base (case-insensitive).
+    """
+    if not seq:
+        return False
+    lower_base, upper_base = seq[0].lower(), seq[0].upper()
+    base_count = seq.count(lower_base)
+    if upper_base != lower_base:
+        base_count += seq.count(upper_base)
+    return base_count == len(seq)
+
+
 def get_random_base():
     """
     Returns a random base with 25% probability of each.
@@ -460,12 +494,8 @@ def add_line_breaks_to_sequence(sequence, line_length=0):
         return '\n'
     if line_length <= 0:
         line_length = settings.BASES_PER_FASTA_LINE
-    seq_with_breaks = ''
-    pos = 0
-    while pos < len(sequence):
-        seq_with_breaks += sequence[pos:pos+line_length] + '\n'
-        pos += line_length
-    return seq_with_breaks
+    return ''.join([sequence[pos:pos+line_length] + '\n'
+                    for pos in range(0, len(sequence), line_length)])
 
 
 END_FORMATTING = '\033[0m'
@@ -0,0 +1,87 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module contains a class for holding nucleotide sequences in a compact 2-bit form.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import re
+
+# Each base is split into a high bit and a low bit: A = 00, C = 01, G = 10, T = 11. Anything which
+# isn't one of those four bases is packed as an A and also recorded in the ambiguity mask.
+HIGH_BIT_TABLE = bytes.maketrans(b'ACGT', b'0011')
+LOW_BIT_TABLE = bytes.maketrans(b'ACGT', b'0101')
+
+# When unpacking, the two bit strings ('0' = 0x30, '1' = 0x31) are combined byte-wise as
+# high * 2 + low, giving 0x90 to 0x93 for A, C, G and T.
+UNPACK_TABLE = bytes.maketrans(b'\x90\x91\x92\x93', b'ACGT')
+
+AMBIGUOUS_RUN_RE = re.compile(b'[^ACGT]+')
+
+
+class PackedSequence(object):
+    """
+    This class holds a nucleotide sequence using two bits per base. The high and low bits of the
+    bases are each stored as one (arbitrarily large) integer, which allows all of the packing and
+    unpacking to happen inside Python's C code instead of in a per-base loop. Runs of non-ACGT
+    characters (e.g. Ns) are kept separately in a sparse ambiguity mask of (position, run) tuples
+    so sequences round trip exactly.
+    """
+
+    __slots__ = ['length', 'high_bits', 'low_bits', 'ambiguous_runs']
+
+    def __init__(self, sequence):
+        seq_bytes = sequence.encode()
+        self.length = len(seq_bytes)
+        self.ambiguous_runs = [(m.start(), m.group().decode())
+                               for m in AMBIGUOUS_RUN_RE.finditer(seq_bytes)]
+        if self.ambiguous_runs:
+            seq_bytes = AMBIGUOUS_RUN_RE.sub(lambda m: b'A' * len(m.group()), seq_bytes)
+        if self.length:
+            self.high_bits = int(seq_bytes.translate(HIGH_BIT_TABLE), 2)
+            self.low_bits = int(seq_bytes.translate(LOW_BIT_TABLE), 2)
+        else:
+            self.high_bits, self.low_bits = 0, 0
+
+    def __len__(self):
+        return self.length
+
+    def __eq__(self, other):
+        return isinstance(other, PackedSequence) and self.length == other.length and \
+            self.high_bits == other.high_bits and self.low_bits == other.low_bits and \
+            self.ambiguous_runs == other.ambiguous_runs
+
+    def __getstate__(self):
+        return self.length, self.high_bits, self.low_bits, self.ambiguous_runs
+
+    def __setstate__(self, state):
+        self.length, self.high_bits, self.low_bits, self.ambiguous_runs = state
+
+    def get_sequence(self):
+        """
+        Unpacks and returns the full sequence as a string.
+        """
+        if not self.length:
+            return ''
+        bit_format = '0' + str(self.length) + 'b'
+        high = int.from_bytes(format(self.high_bits, bit_format).encode(), 'big')
+        low = int.from_bytes(format(self.low_bits, bit_format).encode(), 'big')
+        sequence = (high * 2 + low).to_bytes(self.length, 'big').translate(UNPACK_TABLE).decode()
+        if not self.ambiguous_runs:
+            return sequence
+        pieces = []
+        pos = 0
+        for start, run in self.ambiguous_runs:
+            pieces.append(sequence[pos:start])
+            pieces.append(run)
+            pos = start + len(run)
+        pieces.append(sequence[pos:])
+        return ''.join(pieces)
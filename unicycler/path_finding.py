@@ -15,12 +15,13 @@ not, see <http://www.gnu.org/licenses/>.
 """
 
 import sys
+import heapq
 from collections import defaultdict
 from .misc import weighted_average, reverse_complement, get_num_agreement
 from . import settings
 
 try:
-    from .cpp_wrappers import fully_global_alignment, path_alignment
+    from .cpp_wrappers import fully_global_alignment_result, path_alignment_result
 except AttributeError as e:
     sys.exit('Error when importing C++ library: ' + str(e) + '\n'
              'Have you successfully built the library file using make?')
@@ -30,6 +31,59 @@ class TooManyPaths(Exception):
     pass
 
 
+class PathSequenceCache(object):
+    """
+    This class gets path sequences from a graph, sharing the work between paths which start the
+    same way. Path sequences are stored in a trie (one node per segment), so a path which extends
+    one seen before only needs its new segments added. This helps when scoring many candidate
+    bridge paths, as they usually share long prefixes.
+
+    The cache assumes the graph doesn't change while it is in use, so it should be made for one
+    task (e.g. finding the paths for one bridge) and then discarded. To bound memory, it stops
+    storing new prefixes once it holds PATH_SEQUENCE_CACHE_MAX_BASES of sequence.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.root = {}  # Dict of signed segment number -> (path sequence, child dict)
+        self.cached_bases = 0
+
+    def get_path_sequence(self, path_segments):
+        """
+        Returns the same sequence as AssemblyGraph.get_path_sequence.
+        """
+        children = self.root
+        path_sequence = ''
+        prev_segment_number = None
+
+        # Follow the trie for as much of the path as we've already built.
+        i = 0
+        while i < len(path_segments):
+            node = children.get(path_segments[i])
+            if node is None:
+                break
+            path_sequence, children = node
+            prev_segment_number = path_segments[i]
+            i += 1
+
+        # Build the rest of the path, adding to the trie as we go (if there's room).
+        for seg_num in path_segments[i:]:
+            path_sequence += self.graph.get_path_sequence_addition(path_sequence,
+                                                                   prev_segment_number, seg_num,
+                                                                   path_segments)
+            prev_segment_number = seg_num
+            cache_full = self.cached_bases + len(path_sequence) > \
+                settings.PATH_SEQUENCE_CACHE_MAX_BASES
+            if children is not None and not cache_full:
+                child_dict = {}
+                children[seg_num] = (path_sequence, child_dict)
+                self.cached_bases += len(path_sequence)
+                children = child_dict
+            else:
+                children = None
+        return path_sequence
+
+
 def get_best_paths_for_seq(graph, start_seg, end_seg, target_length, sequence, scoring_scheme,
                            expected_scaled_score):
     """
@@ -44,6 +98,9 @@ def get_best_paths_for_seq(graph, start_seg, end_seg, target_length, sequence, s
     max_length = max(int(round(target_length * settings.MAX_RELATIVE_PATH_LENGTH)),
                      target_length + settings.RELATIVE_PATH_LENGTH_BUFFER_SIZE)
 
+    # Candidate paths often share long prefixes, so their sequences are built with a cache.
+    path_sequence_cache = PathSequenceCache(graph)
+
     # If there are few enough possible paths, we just try aligning to them all.
     try:
         paths = all_paths(graph, start_seg, end_seg, min_length, max_length)
@@ -54,7 +111,8 @@ def get_best_paths_for_seq(graph, start_seg, end_seg, target_length, sequence, s
     except TooManyPaths:
         progressive_path_search = True
         paths = progressive_path_find(graph, start_seg, end_seg, min_length, max_length,
-                                      sequence, scoring_scheme, expected_scaled_score)
+                                      sequence, scoring_scheme, expected_scaled_score,
+                                      path_sequence_cache)
 
     # Sort by length discrepancy from the target so the closest length matches come first.
     paths = sorted(paths, key=lambda x: abs(target_length - graph.get_bridge_path_length(x)))
@@ -67,15 +125,13 @@ def get_best_paths_for_seq(graph, start_seg, end_seg, target_length, sequence, s
 
         # If there is a consensus sequence, then we actually do an alignment against the path.
         if sequence:
-            path_seq = graph.get_path_sequence(path)
-            alignment_result = fully_global_alignment(sequence, path_seq, scoring_scheme,
-                                                      True, 1000)
-            if not alignment_result:
+            path_seq = path_sequence_cache.get_path_sequence(path)
+            alignment_result = fully_global_alignment_result(sequence, path_seq, scoring_scheme,
+                                                             True, 1000)
+            if alignment_result is None:
                 continue
-
-            seqan_parts = alignment_result.split(',', 9)
-            raw_score = int(seqan_parts[6])
-            scaled_score = float(seqan_parts[7])
+            raw_score = alignment_result.raw_score
+            scaled_score = alignment_result.scaled_score
 
         # If there isn't a consensus sequence (i.e. the start and end overlap), then each
         # path is only scored on how well its length agrees with the target length.
@@ -106,6 +162,8 @@ def all_paths(graph, start, end, min_length, max_length):
     length) can result in very large numbers of potential paths in complex areas. To somewhat
     manage this, we exclude paths which include too many copies of a segment. 'Too many copies'
     is defined as double the copy depth count or the double the depth over start/end depth.
+    Paths which can't reach the end segment without exceeding the max length are dropped as soon
+    as they are made.
     """
     if start not in graph.forward_links:
         return []
@@ -114,25 +172,37 @@ def all_paths(graph, start, end, min_length, max_length):
     end_seg = graph.segments[abs(end)]
     start_end_depth = weighted_average(start_seg.depth, end_seg.depth,
                                        start_seg.get_length(), end_seg.get_length())
-    working_paths = [[x] for x in graph.forward_links[start]]
+    max_counts = {}  # Dict of signed segment number -> max allowed count in a path
+    distances_to_end = get_distances_to_segment(graph, end, max_length)
+    working_paths = [PathNode(graph, x, None) for x in graph.forward_links[start]]
+    working_paths = [x for x in working_paths
+                     if can_reach_segment(x, end, distances_to_end, max_length)]
     final_paths = []
     while working_paths:
         new_working_paths = []
         for working_path in working_paths:
-            last_seg = working_path[-1]
+            last_seg = working_path.seg_num
             if last_seg == end:
-                potential_result = working_path[:-1]
-                if graph.get_path_length(potential_result) >= min_length:
-                    final_paths.append(potential_result)
+                potential_result = working_path.parent
+                potential_result_length = 0 if potential_result is None else \
+                    potential_result.length
+                if potential_result_length >= min_length:
+                    final_paths.append(get_linked_path(potential_result))
                     if len(final_paths) > settings.ALL_PATH_SEARCH_MAX_FINAL_PATHS:
                         raise TooManyPaths
-            elif graph.get_path_length(working_path) <= max_length and \
-                    last_seg in graph.forward_links:
+            elif working_path.length <= max_length and last_seg in graph.forward_links:
                 for next_seg in graph.forward_links[last_seg]:
-                    max_allowed_count = graph.max_path_segment_count(next_seg, start_end_depth)
-                    count_so_far = working_path.count(next_seg) + working_path.count(-next_seg)
+                    try:
+                        max_allowed_count = max_counts[next_seg]
+                    except KeyError:
+                        max_allowed_count = graph.max_path_segment_count(next_seg,
+                                                                         start_end_depth)
+                        max_counts[next_seg] = max_allowed_count
+                    count_so_far = working_path.get_count(next_seg)
                     if count_so_far < max_allowed_count:
-                        new_working_paths.append(working_path + [next_seg])
+                        new_path = PathNode(graph, next_seg, working_path, count_so_far + 1)
+                        if can_reach_segment(new_path, end, distances_to_end, max_length):
+                            new_working_paths.append(new_path)
 
         # If the number of working paths is too high, we give up.
         if len(working_paths) > settings.ALL_PATH_SEARCH_MAX_WORKING_PATHS:
@@ -142,8 +212,91 @@ def all_paths(graph, start, end, min_length, max_length):
     return final_paths
 
 
+class PathNode(object):
+    """
+    This class is one step of a path being built by all_paths. Each node points back to the path
+    it extends (its parent), so extending a path doesn't copy it, and it carries the path's
+    length so it doesn't need to be recounted. Many paths share their early nodes.
+
+    Each node also holds how many times its own segment is in the path (up to and including
+    itself), so the count for any segment is found at the segment's last use in the path, without
+    each node needing a copy of every segment's count.
+    """
+    __slots__ = ['seg_num', 'parent', 'length', 'count']
+
+    def __init__(self, graph, seg_num, parent, count=1):
+        self.seg_num = seg_num
+        self.parent = parent
+        self.count = count
+        seg_length = graph.segments[abs(seg_num)].get_length()
+        if parent is None:
+            self.length = seg_length
+        else:
+            self.length = parent.length + seg_length - graph.overlap
+
+    def get_count(self, seg_num):
+        """
+        Returns the number of times the segment (on either strand) is in the path.
+        """
+        seg_num = abs(seg_num)
+        path_node = self
+        while path_node is not None:
+            if abs(path_node.seg_num) == seg_num:
+                return path_node.count
+            path_node = path_node.parent
+        return 0
+
+
+def can_reach_segment(path_node, target, distances_to_target, max_length):
+    """
+    Returns whether the path could be continued to the target segment while staying within the
+    max length (the target itself doesn't count towards the length).
+    """
+    if path_node.seg_num == target:
+        return True
+    try:
+        return path_node.length + distances_to_target[path_node.seg_num] <= max_length
+    except KeyError:
+        return False
+
+
+def get_distances_to_segment(graph, target, max_distance):
+    """
+    Does a Dijkstra search backwards from the target segment. Returns a dictionary of signed
+    segment number -> the least sequence length which a path must add between that segment and
+    the target (0 if they are directly linked). Segments which are further than max_distance from
+    the target (or can't reach it at all) are left out.
+    """
+    distances = {}
+    queue = [(0, x) for x in graph.reverse_links.get(target, [])]
+    heapq.heapify(queue)
+    while queue:
+        distance, seg_num = heapq.heappop(queue)
+        if seg_num in distances:
+            continue
+        distances[seg_num] = distance
+        next_distance = distance + graph.segments[abs(seg_num)].get_length() - graph.overlap
+        if next_distance > max_distance:
+            continue
+        for prev_seg in graph.reverse_links.get(seg_num, []):
+            if prev_seg not in distances:
+                heapq.heappush(queue, (next_distance, prev_seg))
+    return distances
+
+
+def get_linked_path(path_node):
+    """
+    Returns the list of segment numbers for the path ending at the given PathNode.
+    """
+    path = []
+    while path_node is not None:
+        path.append(path_node.seg_num)
+        path_node = path_node.parent
+    return path[::-1]
+
+
 def progressive_path_find(graph, start, end, min_length, max_length, sequence, scoring_scheme,
-                          expected_scaled_score):
+                          expected_scaled_score, path_sequence_cache):
     """
     This function is called when all_paths fails due to too many paths. It searches for paths by
     extended outward from both the start and end, making paths where the two searches meet. When
@@ -156,11 +309,11 @@ def progressive_path_find(graph, start, end, min_length, max_length, sequence, s
     # (because they are hashable for a set).
     final_paths = set()
 
-    # We will work with a list of forward paths and a list of reverse paths. We set them up now
-    # along with dictionaries to allow easy access to all working paths which end in a particular
-    # segment.
-    forward_working_paths = [[start]]
-    reverse_working_paths = [[-end]]
+    # We will work with a list of forward paths and a list of reverse paths. Each working path is
+    # stored with its length (not counting its first segment, i.e. the start/end segment) so it
+    # doesn't need to be recalculated.
+    forward_working_paths = [([start], 0)]
+    reverse_working_paths = [([-end], 0)]
 
     # Knowing the start/end depth lets us put some limits on how many times a segment can be in a
     # path, which we use to avoid going through loops forever.
@@ -169,35 +322,51 @@ def progressive_path_find(graph, start, end, min_length, max_length, sequence, s
     start_end_depth = weighted_average(start_seg.depth, end_seg.depth,
                                        start_seg.get_length(), end_seg.get_length())
 
+    # Knowing how far each segment is from the end (for forward paths) or start (for reverse
+    # paths) lets us drop working paths which can't make it there within the max length.
+    distances_to_end = get_distances_to_segment(graph, end, max_length)
+    distances_to_start = get_distances_to_segment(graph, -start, max_length)
+
     # If one of the two directions gets clogged, then only the other direction will be advanced.
     # If both directions get clogged, then the culling score fraction will be increased (brought
     # closer to 1.0) such that path culling is more aggressive.
     forward_clogged = False
     reverse_clogged = False
 
+    # The dictionary of one direction's paths (used by the other direction) only needs to be
+    # rebuilt when that direction advances.
+    forward_paths_dict, reverse_paths_dict = None, None
+    shortest_forward_path, shortest_reverse_path = None, None
+
     while True:
         if not forward_clogged:
-            shortest_reverse_path = min(graph.get_path_length(x[1:]) for x in reverse_working_paths)
-            reverse_paths_dict = build_path_dictionary(reverse_working_paths)
+            if reverse_paths_dict is None:
+                shortest_reverse_path = min(x[1] for x in reverse_working_paths)
+                reverse_paths_dict = build_path_dictionary(x[0] for x in reverse_working_paths)
             forward_working_paths = advance_paths(forward_working_paths, reverse_paths_dict,
                                                   shortest_reverse_path, final_paths, False,
                                                   sequence, scoring_scheme, expected_scaled_score,
                                                   graph, start_end_depth, max_length,
-                                                  settings.PROGRESSIVE_PATH_SEARCH_SCORE_FRACTION)
+                                                  settings.PROGRESSIVE_PATH_SEARCH_SCORE_FRACTION,
+                                                  path_sequence_cache, distances_to_end)
+            forward_paths_dict = None
             if not forward_working_paths:
                 break
             elif len(forward_working_paths) > settings.PROGRESSIVE_PATH_SEARCH_MAX_WORKING_PATHS:
                 forward_clogged = True
 
         if not reverse_clogged:
-            shortest_forward_path = min(graph.get_path_length(x[1:]) for x in forward_working_paths)
-            forward_paths_dict = build_path_dictionary(forward_working_paths)
+            if forward_paths_dict is None:
+                shortest_forward_path = min(x[1] for x in forward_working_paths)
+                forward_paths_dict = build_path_dictionary(x[0] for x in forward_working_paths)
             reverse_working_paths = advance_paths(reverse_working_paths, forward_paths_dict,
                                                   shortest_forward_path, final_paths, True,
                                                   reverse_sequence, scoring_scheme,
                                                   expected_scaled_score, graph, start_end_depth,
                                                   max_length,
-                                                  settings.PROGRESSIVE_PATH_SEARCH_SCORE_FRACTION)
+                                                  settings.PROGRESSIVE_PATH_SEARCH_SCORE_FRACTION,
+                                                  path_sequence_cache, distances_to_start)
+            reverse_paths_dict = None
             if not reverse_working_paths:
                 break
             elif len(reverse_working_paths) > settings.PROGRESSIVE_PATH_SEARCH_MAX_WORKING_PATHS:
@@ -235,10 +404,11 @@ def reverse_path(path):
 def advance_paths(working_paths, opposite_paths_dict, shortest_opposite_path,
                   final_paths, flip_new_final_paths, sequence, scoring_scheme,
                   expected_scaled_score, graph, start_end_depth, total_max_length,
-                  cull_score_fraction):
+                  cull_score_fraction, path_sequence_cache, distances_to_target):
     """
     This function takes the working paths for one direction and extends them until there are too
-    many or there are no more.
+    many or there are no more. Working paths are (path, length) tuples, where the length doesn't
+    include the path's first segment.
     """
     # For this function, the longest we'll allow paths to get is the the max length minus how far
     # the other side has gotten.
@@ -250,16 +420,15 @@ def advance_paths(working_paths, opposite_paths_dict, shortest_opposite_path,
         if not 0 < len(working_paths) <= settings.PROGRESSIVE_PATH_SEARCH_MAX_WORKING_PATHS:
             break
 
-        shortest_path_len = min(graph.get_path_length(x) for x in working_paths)
+        shortest_path_len = min(x[1] for x in working_paths)
 
         # Extend the shortest working path(s) by adding downstream segments.
         new_working_paths = []
-        for path in working_paths:
-            path_len = graph.get_path_length(path)
+        for path, path_len in working_paths:
 
             # If this path isn't the shortest path, we don't deal with it this time.
             if path_len > shortest_path_len:
-                new_working_paths.append(path)
+                new_working_paths.append((path, path_len))
 
             # If it is the shortest path and has downstream segments...
             elif path[-1] in graph.forward_links:
@@ -280,21 +449,28 @@ def advance_paths(working_paths, opposite_paths_dict, shortest_opposite_path,
                                     final_path = reverse_path(final_path)
                                 final_paths.add(tuple(final_path))
 
-                        # Finally, extend the path if doing so won't make it too long.
-                        if graph.get_path_length(path[1:] + [next_seg]) <= max_length:
-                            new_working_paths.append(path + [next_seg])
+                        # Finally, extend the path if doing so won't make it too long, either now
+                        # or by the time it reaches the other side.
+                        new_len = path_len + graph.segments[abs(next_seg)].get_length()
+                        if len(path) > 1:
+                            new_len -= graph.overlap
+                        if new_len <= max_length and next_seg in distances_to_target and \
+                                new_len + distances_to_target[next_seg] <= total_max_length:
+                            new_working_paths.append((path + [next_seg], new_len))
 
         working_paths = new_working_paths
 
     # If we've exceeded the allowable working count, cull the paths down to size now.
     if len(working_paths) > settings.PROGRESSIVE_PATH_SEARCH_MAX_WORKING_PATHS:
-        working_paths = cull_paths(graph, working_paths, sequence, scoring_scheme,
-                                   expected_scaled_score, cull_score_fraction)
+        culled_paths = cull_paths(graph, [x[0] for x in working_paths], sequence, scoring_scheme,
+                                  expected_scaled_score, cull_score_fraction, path_sequence_cache)
+        working_paths = [(x, graph.get_path_length(x[1:])) for x in culled_paths]
 
     return working_paths
 
 
-def cull_paths(graph, paths, sequence, scoring_scheme, expected_scaled_score, cull_score_fraction):
+def cull_paths(graph, paths, sequence, scoring_scheme, expected_scaled_score, cull_score_fraction,
+               path_sequence_cache):
     """
     Returns a reduced list of paths - the ones which best align to the given sequence.
     """
@@ -317,11 +493,12 @@ def cull_paths(graph, paths, sequence, scoring_scheme, expected_scaled_score, cu
     # (which is the start segment and not part of the consensus) and back up a little bit so our
     # different alignments to follow won't start right at a difference. I.e. it's better to begin
     # with a bit of common sequence.
-    common_path_seq = graph.get_path_sequence(common_start[1:])[:-100]
+    common_path_seq = path_sequence_cache.get_path_sequence(common_start[1:])[:-100]
     path_align_start = len(common_path_seq)
     if common_path_seq:
-        alignment_result = path_alignment(common_path_seq, sequence, scoring_scheme, True, 1000)
-        seq_align_start = int(alignment_result.split(',', 6)[5])
+        alignment_result = path_alignment_result(common_path_seq, sequence, scoring_scheme, True,
+                                                 1000)
+        seq_align_start = alignment_result.ref_end
     else:
         seq_align_start = 0
 
@@ -330,12 +507,11 @@ def cull_paths(graph, paths, sequence, scoring_scheme, expected_scaled_score, cu
     seq_after_common_path = sequence[seq_align_start:]
     for path in paths:
         path_seq_after_common_path = \
-            graph.get_path_sequence(path[1:])[path_align_start:shortest_len]
-        alignment_result = path_alignment(path_seq_after_common_path, seq_after_common_path,
-                                          scoring_scheme, True, 500)
-        if alignment_result:
-            scaled_score = float(alignment_result.split(',', 8)[7])
-            scored_paths.append((path, scaled_score))
+            path_sequence_cache.get_path_sequence(path[1:])[path_align_start:shortest_len]
+        alignment_result = path_alignment_result(path_seq_after_common_path,
+                                                 seq_after_common_path, scoring_scheme, True, 500)
+        if alignment_result is not None:
+            scored_paths.append((path, alignment_result.scaled_score))
 
     scored_paths = sorted(scored_paths, key=lambda x: x[1], reverse=True)
     if not scored_paths:
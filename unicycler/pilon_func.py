@@ -14,8 +14,10 @@ not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import signal
 import subprocess
 import shutil
+import tempfile
 from collections import defaultdict
 from .misc import load_fasta, reverse_complement, int_to_str, underline, get_percentile_sorted, dim
 from .assembly_graph import AssemblyGraph
@@ -57,12 +59,26 @@ def polish_with_pilon_multiple_rounds(graph, insert_size_graph, args, polish_dir
 
     fix_type = 'bases'
     insert_size_1st, insert_size_99th = get_insert_size_range(insert_size_graph, args, polish_dir)
+    window_margin = max(insert_size_99th, settings.MIN_PILON_WINDOW_MARGIN)
+    previous_round = None
     for i in range(settings.MAX_PILON_POLISH_COUNT):
-        if i > 0:
+
+        # In incremental mode, a 'bases' round after one which made changes only polishes windows
+        # around those changes. Pilon's other fix types look for larger problems (e.g. local
+        # misassemblies) which the window edges could look like, so they always get a full round.
+        windows = None
+        if args.pilon_incremental and fix_type == 'bases' and previous_round is not None:
+            windows = get_polish_windows(graph, previous_round, window_margin,
+                                         args.min_polish_size)
+        if i > 0 and windows is None:
             graph.rotate_circular_sequences()
-        change_count = polish_with_pilon(graph, args, polish_dir, insert_size_1st,
-                                         insert_size_99th, i+1, fix_type)
-        if change_count == 0:
+        this_round = polish_with_pilon(graph, args, polish_dir, insert_size_1st,
+                                       insert_size_99th, i+1, fix_type, windows, previous_round,
+                                       window_margin)
+        if previous_round is not None and args.keep < 3:
+            previous_round.delete_bam_files()
+        previous_round = this_round
+        if this_round.change_count == 0:
             if fix_type == 'bases' and do_pilon_reassembly:
                 fix_type = 'all'
             else:
@@ -154,29 +170,37 @@ def get_insert_size_range(graph, args, polish_dir):
     return insert_size_1st, insert_size_99th
 
 
-def run_bowtie_samtools_commands(args, bowtie2_command, sam_filename, bam_filename):
-
-    # Run bowtie2 alignment command
-    log.log(dim('  ' + ' '.join(bowtie2_command)), 2)
-    try:
-        subprocess.check_output(bowtie2_command, stderr=subprocess.STDOUT)
-    except subprocess.CalledProcessError as e:
-        raise CannotPolish('Bowtie2 encountered an error:\n' + e.output.decode())
-
-    # Sort the alignments.
+def run_bowtie_samtools_commands(args, bowtie2_command, bam_filename):
+    """
+    Runs Bowtie2 with its alignments piped straight into samtools sort, so no SAM file is written
+    to disk, and then indexes the sorted BAM.
+    """
     samtools_sort_command = [args.samtools_path, 'sort', '-@', str(args.threads),
-                             '-o', bam_filename, '-O', 'bam', '-T', 'temp', sam_filename]
-    log.log(dim('  ' + ' '.join(samtools_sort_command)), 2)
-    try:
-        subprocess.check_output(samtools_sort_command, stderr=subprocess.STDOUT)
-    except subprocess.CalledProcessError as e:
-        raise CannotPolish('Samtools encountered an error:\n' + e.output.decode())
-
-    # Always delete the SAM file, regardless of keep level (it's big).
-    try:
-        os.remove(sam_filename)
-    except FileNotFoundError:
-        pass
+                             '-m', args.samtools_sort_mem, '-o', bam_filename, '-O', 'bam',
+                             '-T', 'temp', '-']
+    log.log(dim('  ' + ' '.join(bowtie2_command) + ' | ' + ' '.join(samtools_sort_command)), 2)
+
+    # Bowtie2's stderr goes to a file, not a pipe, so it can't fill up and stall the alignment.
+    with tempfile.TemporaryFile() as bowtie2_stderr:
+        bowtie2_process = subprocess.Popen(bowtie2_command, stdout=subprocess.PIPE,
+                                           stderr=bowtie2_stderr)
+        sort_process = subprocess.Popen(samtools_sort_command, stdin=bowtie2_process.stdout,
+                                        stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        bowtie2_process.stdout.close()  # so Bowtie2 gets a SIGPIPE if samtools sort quits
+        sort_output, _ = sort_process.communicate()
+        bowtie2_process.wait()
+
+        # A Bowtie2 failure is checked first, as samtools sort will also fail when its input stops
+        # early. The exception is a SIGPIPE, which means that samtools sort quit first. The bowtie2
+        # command is a wrapper script, so the SIGPIPE may instead show up as its exit code.
+        if bowtie2_process.returncode not in (0, -signal.SIGPIPE, 128 + signal.SIGPIPE):
+            bowtie2_stderr.seek(0)
+            raise CannotPolish('Bowtie2 encountered an error:\n' +
+                               bowtie2_stderr.read().decode())
+        if sort_process.returncode != 0:
+            raise CannotPolish('Samtools encountered an error:\n' + sort_output.decode())
+        if bowtie2_process.returncode != 0:
+            raise CannotPolish('Bowtie2 was stopped by a broken pipe to samtools sort')
 
     # Index the alignments.
     samtools_index_command = [args.samtools_path, 'index', bam_filename]
@@ -187,34 +211,100 @@ def run_bowtie_samtools_commands(args, bowtie2_command, sam_filename, bam_filena
         raise CannotPolish('Samtools encountered an error:\n' + e.output.decode())
 
 
-def polish_with_pilon(graph, args, polish_dir, insert_size_1st, insert_size_99th, round_num,
-                      fix_type):
+class PilonRound(object):
     """
-    Runs Pilon on the graph to hopefully fix up small mistakes.
+    This class describes a round of Pilon polishing, with what the next round needs to polish
+    incrementally: the alignment files, the references Pilon polished and the changes it made.
     """
-    log.log(underline('Pilon polish round ' + str(round_num)))
+    def __init__(self):
+        self.change_count = 0
+        self.bam_filenames = []
+
+        # Reference name -> (segment, start position in the polished segment, reference length,
+        # whether the reference is a whole circular segment).
+        self.references = {}
+
+        # Tuples of (reference name, old start, old end, new start, new end), where old positions
+        # are in the reference and new positions are in the Pilon-polished reference (0-based,
+        # end exclusive).
+        self.changes = []
+
+    def delete_bam_files(self):
+        for bam_filename in self.bam_filenames:
+            for f in [bam_filename, bam_filename + '.bai']:
+                try:
+                    os.remove(f)
+                except (FileNotFoundError, OSError):
+                    pass
+        self.bam_filenames = []
 
-    using_paired_reads = bool(args.short1) and bool(args.short2)
-    using_unpaired_reads = bool(args.unpaired)
-    assert using_paired_reads or using_unpaired_reads
 
+def polish_with_pilon(graph, args, polish_dir, insert_size_1st, insert_size_99th, round_num,
+                      fix_type, windows=None, previous_round=None, window_margin=0):
+    """
+    Runs Pilon on the graph to hopefully fix up small mistakes. If windows are given, only they are
+    polished, using the reads from the previous round which aligned near its changes.
+    """
+    if windows is None:
+        log.log(underline('Pilon polish round ' + str(round_num)))
+    else:
+        log.log(underline('Pilon polish round ' + str(round_num) + ' (' +
+                          int_to_str(len(windows)) + ' window' +
+                          ('s' if len(windows) > 1 else '') + ', ' +
+                          int_to_str(sum(end - start for _, start, end in windows)) + ' bp)'))
+
+    this_round = PilonRound()
     input_filename = str(round_num) + '_polish_input.fasta'
     output_prefix = str(round_num) + '_pilon'
     pilon_fasta_filename = str(round_num) + '_pilon.fasta'
     pilon_changes_filename = str(round_num) + '_pilon.changes'
     pilon_output_filename = str(round_num) + '_pilon.out'
-
-    segments_to_polish = [x for x in graph.segments.values()
-                          if x.get_length() >= args.min_polish_size]
-    if not segments_to_polish:
-        raise CannotPolish('no segments are long enough to polish')
+    read_filenames = []
+
+    if windows is None:
+        segments_to_polish = [x for x in graph.segments.values()
+                              if x.get_length() >= args.min_polish_size]
+        if not segments_to_polish:
+            raise CannotPolish('no segments are long enough to polish')
+        circular_seg_names = get_circular_segment_names(graph)
+        for segment in segments_to_polish:
+            this_round.references[get_segment_name(segment)] = \
+                (segment, 0, segment.get_length(),
+                 get_segment_name_or_number(segment) in circular_seg_names)
+    else:
+        for i, window in enumerate(windows):
+            segment, start, end = window
+            this_round.references['window_' + str(i + 1)] = (segment, start, end - start, False)
+        segments_to_polish = []
+        for segment, _, _ in windows:
+            if segment not in segments_to_polish:
+                segments_to_polish.append(segment)
 
     with open(input_filename, 'w') as polish_fasta:
-        for segment in segments_to_polish:
-            polish_fasta.write('>' + get_segment_name(segment) + '\n')
-            polish_fasta.write(segment.forward_sequence)
+        for ref_name, reference in this_round.references.items():
+            segment, start, length, _ = reference
+            polish_fasta.write('>' + ref_name + '\n')
+            polish_fasta.write(segment.forward_sequence[start:start + length])
             polish_fasta.write('\n')
 
+    # Get the reads to align. For a full round this is all of them, but for a windowed round it is
+    # just the reads which the previous round aligned near its changes.
+    if windows is None:
+        paired_reads = [args.short1, args.short2] if args.short1 and args.short2 else []
+        unpaired_reads = args.unpaired
+    else:
+        paired_reads, unpaired_reads = \
+            extract_reads_near_changes(args, previous_round, window_margin, round_num)
+        read_filenames = paired_reads + ([unpaired_reads] if unpaired_reads else [])
+    using_paired_reads = bool(paired_reads)
+    using_unpaired_reads = bool(unpaired_reads)
+    if not using_paired_reads and not using_unpaired_reads:
+        if windows is None:
+            raise CannotPolish('no reads to align')
+        log.log('No reads aligned near the previous changes\n')
+        delete_round_files(args, this_round, round_num, read_filenames)
+        return this_round
+
     # Prepare the FASTA for Bowtie2 alignment.
     bowtie2_build_command = [args.bowtie2_build_path, input_filename, input_filename]
     log.log(dim('  ' + ' '.join(bowtie2_build_command)), 2)
@@ -230,21 +320,18 @@ def polish_with_pilon(graph, args, polish_dir, insert_size_1st, insert_size_99th
                        '--threads', str(args.threads), '-I', str(insert_size_1st),
                        '-X', str(insert_size_99th), '-x', input_filename]
     if using_paired_reads:
-        paired_sam_filename = str(round_num) + '_paired_alignments.sam'
         paired_bam_filename = str(round_num) + '_paired_alignments.bam'
-        this_bowtie2_command = bowtie2_command + ['-S', paired_sam_filename,
-                                                  '-1', args.short1, '-2', args.short2]
-        run_bowtie_samtools_commands(args, this_bowtie2_command, paired_sam_filename,
-                                     paired_bam_filename)
+        this_bowtie2_command = bowtie2_command + ['-1', paired_reads[0], '-2', paired_reads[1]]
+        run_bowtie_samtools_commands(args, this_bowtie2_command, paired_bam_filename)
+        this_round.bam_filenames.append(paired_bam_filename)
     else:
         paired_bam_filename = ''
 
     if using_unpaired_reads:
-        unpaired_sam_filename = str(round_num) + '_unpaired_alignments.sam'
         unpaired_bam_filename = str(round_num) + '_unpaired_alignments.bam'
-        this_bowtie2_command = bowtie2_command + ['-S', unpaired_sam_filename, '-U', args.unpaired]
-        run_bowtie_samtools_commands(args, this_bowtie2_command, unpaired_sam_filename,
-                                     unpaired_bam_filename)
+        this_bowtie2_command = bowtie2_command + ['-U', unpaired_reads]
+        run_bowtie_samtools_commands(args, this_bowtie2_command, unpaired_bam_filename)
+        this_round.bam_filenames.append(unpaired_bam_filename)
     else:
         unpaired_bam_filename = ''
 
@@ -275,71 +362,276 @@ def polish_with_pilon(graph, args, polish_dir, insert_size_1st, insert_size_99th
     # Display Pilon changes.
     change_count = defaultdict(int)
     change_lines = defaultdict(list)
-    total_count = 0
     pilon_changes = open(pilon_changes_filename, 'rt')
     for line in pilon_changes:
         try:
-            seg_name = line.split(':')[0]
-            change_count[seg_name] += 1
-            total_count += 1
-            change_lines[seg_name].append(line.strip())
-        except ValueError:
-            pass
-    if total_count == 0:
+            parts = line.split()
+            ref_name, old_start, old_end = parse_pilon_change_position(parts[0])
+            _, new_start, new_end = parse_pilon_change_position(parts[1])
+            segment, ref_start = this_round.references[ref_name][:2]
+        except (ValueError, IndexError, KeyError):
+            continue
+        seg_name = get_segment_name_or_number(segment)
+        change_count[seg_name] += 1
+        change_lines[seg_name].append((ref_start + old_start, line.strip()))
+        this_round.changes.append((ref_name, old_start, old_end, new_start, new_end))
+    pilon_changes.close()
+    this_round.change_count = len(this_round.changes)
+
+    if this_round.change_count == 0:
         log.log('No Pilon changes')
     else:
-        log.log('Total number of changes: ' + int_to_str(total_count))
+        log.log('Total number of changes: ' + int_to_str(this_round.change_count))
         log.log('', 2)
         seg_names = sorted(graph.segments)
         polish_input_seg_names = set(get_segment_name_or_number(x) for x in segments_to_polish)
         for seg_name in seg_names:
             if seg_name in polish_input_seg_names:
-                count = change_count[str(seg_name)]
+                count = change_count[seg_name]
                 if count < 1:
                     continue
                 log.log('Segment ' + str(seg_name) + ' (' +
                         int_to_str(graph.segments[seg_name].get_length()) + ' bp): ' +
                         int_to_str(count) + ' change' +
                         ('s' if count > 1 else ''), 2)
-                try:
-                    changes = change_lines[str(seg_name)]
-                    changes = sorted(changes, key=lambda x:
-                                     int(x.replace(' ', ':').replace('-', ':').split(':')[1]))
-                    for change in changes:
-                        log.log('  ' + dim(change), 3)
-                except (ValueError, IndexError):
-                    pass
+                for _, change in sorted(change_lines[seg_name]):
+                    log.log('  ' + dim(change), 3)
 
-        # Replace segment sequences with Pilon-polished versions.
+        # Replace segment (or window) sequences with Pilon-polished versions.
         pilon_results = load_fasta(pilon_fasta_filename)
+        polished_sequences = {}
         for header, sequence in pilon_results:
             if header.endswith('_pilon'):
                 header = header[:-6]
-            if isinstance(graph, AssemblyGraph):
-                segment = graph.segments[int(header)]
-            elif isinstance(graph, StringGraph):
-                segment = graph.segments[header]
-            else:
-                assert False
-            segment.forward_sequence = sequence
-            segment.reverse_sequence = reverse_complement(sequence)
+            polished_sequences[header] = sequence
+        apply_polished_sequences(this_round, polished_sequences)
 
     log.log('')
+    delete_round_files(args, this_round, round_num, read_filenames)
+    return this_round
 
-    if args.keep < 3:
-        list_of_files = [input_filename, pilon_fasta_filename, pilon_changes_filename,
-                         input_filename + '.1.bt2', input_filename + '.2.bt2',
-                         input_filename + '.3.bt2', input_filename + '.4.bt2',
-                         input_filename + '.rev.1.bt2', input_filename + '.rev.2.bt2',
-                         pilon_output_filename, paired_bam_filename, paired_bam_filename + '.bai',
-                         unpaired_bam_filename, unpaired_bam_filename + '.bai']
-        for f in list_of_files:
+
+def delete_round_files(args, pilon_round, round_num, read_filenames):
+    """
+    Deletes the files made by a round of Pilon polishing, unless the user wants to keep them. In
+    incremental mode, the alignments are kept because the next round gets its reads from them.
+    """
+    if args.keep >= 3:
+        return
+    input_filename = str(round_num) + '_polish_input.fasta'
+    list_of_files = [input_filename, str(round_num) + '_pilon.fasta',
+                     str(round_num) + '_pilon.changes',
+                     input_filename + '.1.bt2', input_filename + '.2.bt2',
+                     input_filename + '.3.bt2', input_filename + '.4.bt2',
+                     input_filename + '.rev.1.bt2', input_filename + '.rev.2.bt2',
+                     str(round_num) + '_pilon.out'] + read_filenames
+    if not args.pilon_incremental:
+        pilon_round.delete_bam_files()
+    for f in list_of_files:
+        try:
+            os.remove(f)
+        except (FileNotFoundError, OSError):
+            pass
+
+
+def parse_pilon_change_position(position):
+    """
+    Parses a position from a Pilon changes file (e.g. '12:345' or '12:345-350', 1-based and
+    inclusive) into a reference name, a 0-based start and an exclusive end.
+    """
+    ref_name, positions = position.rsplit(':', 1)
+    start, _, end = positions.partition('-')
+    return ref_name, int(start) - 1, int(end or start)
+
+
+def apply_polished_sequences(pilon_round, polished_sequences):
+    """
+    Puts the Pilon-polished reference sequences into their segments. Windows can change length, so
+    each window's start position is updated to where it now is in its polished segment.
+    """
+    references_by_segment = defaultdict(list)
+    for ref_name, reference in pilon_round.references.items():
+        references_by_segment[reference[0]].append((reference[1], ref_name))
+    for segment, segment_references in references_by_segment.items():
+        seq = segment.forward_sequence
+        pieces = []
+        position = 0
+        for start, ref_name in sorted(segment_references):
+            _, _, length, circular = pilon_round.references[ref_name]
+            polished_seq = polished_sequences.get(ref_name, seq[start:start + length])
+            pieces.append(seq[position:start])
+            new_start = sum(len(x) for x in pieces)
+            pieces.append(polished_seq)
+            pilon_round.references[ref_name] = (segment, new_start, length, circular)
+            position = start + length
+        pieces.append(seq[position:])
+        segment.set_forward_sequence(''.join(pieces))
+
+
+def get_polish_windows(graph, previous_round, margin, min_polish_size):
+    """
+    Returns the windows (segment, start, end) around the previous round's changes, in the current
+    (polished) segment coordinates. Returns None if there are no changes or if the windows cover
+    too much of the sequence to be worth it.
+
+    If the previous round polished whole circular segments, a window is also put over each of their
+    ends, as a full round would have rotated them so reads spanning the start/end could align.
+    Circular segments with a window spanning the start/end are rotated so it no longer does.
+    """
+    if not previous_round.changes:
+        return None
+    ring_windows = defaultdict(list)
+    for ref_name, _, _, new_start, new_end in previous_round.changes:
+        segment, ref_start = previous_round.references[ref_name][:2]
+        ring_windows[segment].append((ref_start + new_start - margin,
+                                      ref_start + new_end + margin))
+    for segment, _, _, circular in previous_round.references.values():
+        if circular:
+            length = segment.get_length()
+            ring_windows[segment].append((length - margin, length + margin))
+
+    circular_seg_names = get_circular_segment_names(graph)
+    windows = []
+    for segment, segment_windows in ring_windows.items():
+        length = segment.get_length()
+        if length < min_polish_size:
+            continue
+        circular = get_segment_name_or_number(segment) in circular_seg_names
+        segment_windows = merge_windows(segment_windows, length, circular)
+        if segment_windows is None:
+            return None
+        if segment_windows[-1][1] > length:
+            shift = get_rotation_out_of_windows(segment_windows, length)
+            segment.rotate_sequence(shift, False)
+            segment_windows = sorted(((start - shift) % length, (start - shift) % length +
+                                      end - start) for start, end in segment_windows)
+        windows += [(segment, start, end) for start, end in segment_windows]
+
+    total_length = sum(x.get_length() for x in graph.segments.values()
+                       if x.get_length() >= min_polish_size)
+    if sum(end - start for _, start, end in windows) > \
+            total_length * settings.PILON_INCREMENTAL_MAX_FRACTION:
+        return None
+    return sorted(windows, key=lambda x: (str(get_segment_name_or_number(x[0])), x[1]))
+
+
+def merge_windows(windows, length, circular):
+    """
+    Merges overlapping windows on a segment. Linear segment windows are clipped to the segment,
+    while circular segment windows can run past the end (i.e. wrap around to the start). Returns
+    None if the windows cover the whole circular segment.
+    """
+    if circular:
+        windows = [(start % length, start % length + end - start) for start, end in windows]
+    else:
+        windows = [(max(start, 0), min(end, length)) for start, end in windows]
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    if circular:
+        while len(merged) > 1 and merged[-1][1] - length >= merged[0][0]:
+            first_start, first_end = merged.pop(0)
+            merged[-1] = (merged[-1][0], max(merged[-1][1], first_end + length))
+        if merged[-1][1] - merged[0][0] >= length:
+            return None
+    return merged
+
+
+def get_rotation_out_of_windows(windows, length):
+    """
+    Returns a rotation for a circular segment which puts its start in the middle of the biggest gap
+    between the windows.
+    """
+    gaps = [(windows[i + 1][0] - windows[i][1], windows[i][1]) for i in range(len(windows) - 1)]
+    gaps.append((windows[0][0] + length - windows[-1][1], windows[-1][1]))
+    gap_size, gap_start = max(gaps)
+    return (gap_start + gap_size // 2) % length
+
+
+def get_read_regions(pilon_round, margin):
+    """
+    Returns samtools regions around a round's changes (and over the ends of its whole circular
+    segments), in the coordinates of the round's references.
+    """
+    ref_windows = defaultdict(list)
+    for ref_name, old_start, old_end, _, _ in pilon_round.changes:
+        ref_windows[ref_name].append((old_start - margin, old_end + margin))
+    for ref_name, reference in pilon_round.references.items():
+        if reference[3]:
+            ref_windows[ref_name].append((reference[2] - margin, reference[2] + margin))
+    regions = []
+    for ref_name in sorted(ref_windows):
+        _, _, length, circular = pilon_round.references[ref_name]
+        for start, end in merge_windows(ref_windows[ref_name], length, circular) or [(0, length)]:
+            if end > length:
+                regions.append((ref_name, start, length))
+                regions.append((ref_name, 0, end - length))
+            else:
+                regions.append((ref_name, start, end))
+    return [ref_name + ':' + str(start + 1) + '-' + str(end)
+            for ref_name, start, end in regions if end > start]
+
+
+def extract_reads_near_changes(args, pilon_round, margin, round_num):
+    """
+    Saves the reads which the given round aligned near its changes to FASTQ files. Returns the
+    paired read filenames (empty if there are no pairs) and the unpaired read filename (empty if
+    there are no unpaired reads). A read pair with only one read near a change is saved as an
+    unpaired read.
+    """
+    regions = get_read_regions(pilon_round, margin)
+    reads = {}
+    for bam_filename in pilon_round.bam_filenames:
+        samtools_view_command = [args.samtools_path, 'view', bam_filename] + regions
+        log.log(dim('  ' + ' '.join(samtools_view_command)), 2)
+        try:
+            sam_output = subprocess.check_output(samtools_view_command,
+                                                 stderr=subprocess.PIPE).decode()
+        except subprocess.CalledProcessError as e:
+            raise CannotPolish('Samtools encountered an error:\n' + e.stderr.decode())
+        for sam_line in sam_output.splitlines():
+            sam_parts = sam_line.split('\t')
             try:
-                os.remove(f)
-            except (FileNotFoundError, OSError):
-                pass
+                sam_flags = int(sam_parts[1])
+                read_seq, read_qual = sam_parts[9], sam_parts[10]
+            except (ValueError, IndexError):
+                continue
+            if sam_flags & 0x900:  # secondary or supplementary alignment
+                continue
+            if sam_flags & 0x10:
+                read_seq, read_qual = reverse_complement(read_seq), read_qual[::-1]
+            reads[(sam_parts[0], sam_flags & 0xc0)] = (read_seq, read_qual)
+
+    paired_filenames = [str(round_num) + '_reads_1.fastq', str(round_num) + '_reads_2.fastq']
+    unpaired_filename = str(round_num) + '_reads_unpaired.fastq'
+    pair_count, unpaired_count = 0, 0
+    with open(paired_filenames[0], 'wt') as reads_1, open(paired_filenames[1], 'wt') as reads_2, \
+            open(unpaired_filename, 'wt') as unpaired:
+        for (read_name, mate), (read_seq, read_qual) in sorted(reads.items()):
+            if mate == 0x40 and (read_name, 0x80) in reads:
+                mate_seq, mate_qual = reads[(read_name, 0x80)]
+                reads_1.write('@' + read_name + '\n' + read_seq + '\n+\n' + read_qual + '\n')
+                reads_2.write('@' + read_name + '\n' + mate_seq + '\n+\n' + mate_qual + '\n')
+                pair_count += 1
+            elif mate == 0x80 and (read_name, 0x40) in reads:
+                continue
+            else:
+                unpaired.write('@' + read_name + '\n' + read_seq + '\n+\n' + read_qual + '\n')
+                unpaired_count += 1
+    log.log('Reads near previous changes: ' + int_to_str(pair_count) + ' pairs, ' +
+            int_to_str(unpaired_count) + ' unpaired', 2)
 
-    return total_count
+    if not pair_count:
+        for f in paired_filenames:
+            os.remove(f)
+        paired_filenames = []
+    if not unpaired_count:
+        os.remove(unpaired_filename)
+        unpaired_filename = ''
+    return paired_filenames, unpaired_filename
 
 
 def get_segment_name(segment):
@@ -358,3 +650,15 @@ def get_segment_name_or_number(segment):
         return segment.full_name
     else:
         assert False
+
+
+def get_circular_segment_names(graph):
+    """
+    Returns the names (or numbers) of the graph's circular segments.
+    """
+    if isinstance(graph, AssemblyGraph):
+        return set(graph.completed_circular_replicons())
+    elif isinstance(graph, StringGraph):
+        return set(x for x in graph.segments if graph.segment_is_circular(x))
+    else:
+        assert False
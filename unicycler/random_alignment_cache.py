@@ -0,0 +1,155 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module caches the results of random simulations: alignments of random sequences (used to
+calibrate alignment score thresholds and error rates) and random placements of reads on a
+reference (used to set depth thresholds). These only depend on their inputs, so they are kept in
+memory for the rest of the run and saved to a file in the user's cache directory for later runs.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import array
+import collections
+import hashlib
+import json
+import os
+from .checkpoint import get_file_fingerprint
+from .cpp_wrappers import get_random_sequence_alignment_mean_and_std_dev, \
+    get_random_sequence_alignment_error_rates, simulate_depth_distributions, SO_FILE_FULL
+from .version import __version__
+
+CACHE_FILENAME = 'random_alignments.json'
+MAX_CACHED_RESULTS = 1000  # the oldest results are dropped from the file past this many
+
+# Results already looked up in this process, keyed by cache key.
+MEMO = {}
+
+
+def get_cache_filename(cache_filename=CACHE_FILENAME):
+    """
+    Returns the path of a cache file. The directory can be set with the UNICYCLER_CACHE_DIR
+    environment variable (an empty value turns off the file cache), otherwise it follows the XDG
+    convention.
+    """
+    cache_dir = os.environ.get('UNICYCLER_CACHE_DIR')
+    if cache_dir is None:
+        xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or \
+            os.path.join(os.path.expanduser('~'), '.cache')
+        cache_dir = os.path.join(xdg_cache_home, 'unicycler')
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, cache_filename)
+
+
+def get_build_id():
+    """
+    Returns a description of this Unicycler build. Cached results from a different build (e.g. a
+    rebuilt C++ library) are not used.
+    """
+    return [__version__] + get_file_fingerprint(SO_FILE_FULL)[1:]
+
+
+def load_cached_results(cache_filename):
+    try:
+        with open(cache_filename, 'rt') as cache_file:
+            cache = json.load(cache_file)
+        if cache['build'] == get_build_id():
+            return cache['results']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return {}
+
+
+def save_cached_result(cache_filename, key, result):
+    save_cached_results(cache_filename, {key: result})
+
+
+def save_cached_results(cache_filename, new_results, max_results=MAX_CACHED_RESULTS):
+    """
+    Adds results to the cache file. Failing to save isn't an error (e.g. the cache directory might
+    not be writable), as the results can always be calculated again.
+    """
+    results = load_cached_results(cache_filename)
+    for key, result in new_results.items():
+        results.pop(key, None)
+        results[key] = result
+    while len(results) > max_results:
+        del results[next(iter(results))]
+    try:
+        os.makedirs(os.path.dirname(cache_filename), exist_ok=True)
+        temp_filename = cache_filename + '.' + str(os.getpid())
+        with open(temp_filename, 'wt') as cache_file:
+            json.dump({'build': get_build_id(), 'results': results}, cache_file)
+        os.replace(temp_filename, cache_filename)
+    except OSError:
+        pass
+
+
+def get_cached_result(name, seq_length, count, scoring_scheme, calculate):
+    """
+    Returns the result for the given calibration, using calculate to make it only if it isn't
+    already in memory or in the cache file.
+    """
+    key = ','.join([name, str(seq_length), str(count), str(scoring_scheme)])
+    return get_cached_value(key, lambda: calculate(seq_length, count, scoring_scheme))
+
+
+def get_cached_value(key, calculate):
+    """
+    Returns the value for the given key, calling calculate (which must return something that can
+    be saved as JSON) to make it only if it isn't already in memory or in the cache file.
+    """
+    if key in MEMO:
+        return MEMO[key]
+    cache_filename = get_cache_filename()
+    result = None
+    if cache_filename:
+        result = load_cached_results(cache_filename).get(key)
+    if result is None:
+        result = calculate()
+        if cache_filename:
+            save_cached_result(cache_filename, key, result)
+    MEMO[key] = result
+    return result
+
+
+def cached_random_sequence_alignment_mean_and_std_dev(seq_length, count, scoring_scheme):
+    """
+    A cached version of get_random_sequence_alignment_mean_and_std_dev.
+    """
+    return tuple(get_cached_result('mean_and_std_dev', seq_length, count, scoring_scheme,
+                                   get_random_sequence_alignment_mean_and_std_dev))
+
+
+def cached_random_sequence_alignment_error_rates(seq_length, count, scoring_scheme):
+    """
+    A cached version of get_random_sequence_alignment_error_rates.
+    """
+    return get_cached_result('error_rates', seq_length, count, scoring_scheme,
+                             get_random_sequence_alignment_error_rates)
+
+
+def cached_depth_distributions(read_lengths, ref_length, iterations, threads):
+    """
+    A cached version of simulate_depth_distributions. The read order doesn't matter to the
+    simulation, so the cache key uses a digest of the read length histogram.
+    """
+    histogram = sorted(collections.Counter(read_lengths).items())
+    digest = hashlib.sha256(json.dumps(histogram).encode()).hexdigest()
+    key = ','.join(['depth_distributions', str(ref_length), str(iterations), digest])
+
+    def calculate():
+        min_distribution, max_distribution = \
+            simulate_depth_distributions(read_lengths, ref_length, iterations, threads)
+        return [list(min_distribution), list(max_distribution)]
+
+    min_distribution, max_distribution = get_cached_value(key, calculate)
+    return array.array('d', min_distribution), array.array('d', max_distribution)
@@ -15,11 +15,14 @@ not, see <http://www.gnu.org/licenses/>.
 
 import random
 import gzip
+import io
 import os
 import math
+import mmap
 from .misc import quit_with_error, get_nice_header, get_compression_type, get_sequence_file_type,\
     strip_read_extensions, print_table, float_to_str, range_is_contained, range_overlap_size, \
     simplify_ranges, add_line_breaks_to_sequence
+from .packed_sequence import PackedSequence
 from . import settings
 from . import log
 
@@ -90,11 +93,17 @@ def load_references(fasta_filename, contamination=False, section_header='Loading
     return references
 
 
-def load_long_reads(filename, silent=False, section_header='Loading reads', output_dir=None):
+def load_long_reads(filename, silent=False, section_header='Loading reads', output_dir=None,
+                    index_dir=None):
     """
     This function loads in long reads from a FASTQ file and returns a dictionary where key = read
     name and value = Read object. It also returns a list of read names, in the order they are in
     the file.
+
+    The file is only read once. If index_dir is given, the read sequences are not kept in memory.
+    They are instead written to an on-disk read store (with an offset index) in that directory and
+    the returned reads fetch their sequences from it when needed. If a matching store already
+    exists there from a previous run, it is reused and the read file isn't parsed at all.
     """
     # Read files can be either FASTA or FASTQ and optionally gzipped.
     try:
@@ -102,10 +111,6 @@ def load_long_reads(filename, silent=False, section_header='Loading reads', outp
     except ValueError:
         file_type = ''
         quit_with_error(filename + ' is not in either FASTA or FASTQ format')
-    if get_compression_type(filename) == 'gz':
-        open_func = gzip.open
-    else:  # plain text
-        open_func = open
 
     if not silent:
         log.log_section_header(section_header)
@@ -113,91 +118,55 @@ def load_long_reads(filename, silent=False, section_header='Loading reads', outp
     read_dict = {}
     read_names = []
     total_bases = 0
-    last_progress = 0.0
-    step = settings.LOADING_READS_PROGRESS_STEP
     duplicate_read_names_found = False
+    read_store = ReadStore(index_dir) if index_dir is not None else None
+
+    index_entries = read_store.load_index(filename) if read_store is not None else None
+    if index_entries is not None:
+        for name, offset, length, has_qualities in index_entries:
+            read_dict[name] = IndexedRead(name, read_store, offset, length, has_qualities)
+            read_names.append(name)
+            total_bases += length
+        duplicate_read_names_found = read_store.duplicate_read_names_found
+        if not silent:
+            log.log('Using existing read index: ' + read_store.index_filename)
 
-    if file_type == 'FASTQ':
-        with open_func(filename, 'rt') as fastq:
-            num_reads = sum(1 for _ in fastq) // 4
-    else:  # file_type == 'FASTA'
-        with open_func(filename, 'rt') as fasta:
-            num_reads = sum(1 for line in fasta if line.startswith('>'))
-    if not num_reads:
-        quit_with_error('There are no read sequences in ' + filename)
-    if not silent:
-        log.log_progress_line(0, num_reads)
-
-    if file_type == 'FASTQ':
-        with open_func(filename, 'rt') as fastq:
-            for line in fastq:
-                stripped_line = line.strip()
-                if len(stripped_line) == 0:
-                    continue
-                if not stripped_line.startswith('@'):
-                    continue
-                original_name = stripped_line[1:].split()[0]
-                sequence = next(fastq).strip()
-                _ = next(fastq)
-                qualities = next(fastq).strip()
-
-                # Don't allow duplicate read names, so add a trailing number when they occur.
-                name = original_name
-                duplicate_name_number = 1
-                while name in read_dict:
-                    duplicate_read_names_found = True
-                    duplicate_name_number += 1
-                    name = original_name + '_' + str(duplicate_name_number)
-
+    else:
+        if read_store is not None:
+            read_store.open_for_writing()
+        last_progress = 0.0
+        step = settings.LOADING_READS_PROGRESS_STEP
+        for original_name, sequence, qualities, fraction in stream_reads(filename, file_type):
+
+            # Don't allow duplicate read names, so add a trailing number when they occur.
+            name = original_name
+            duplicate_name_number = 1
+            while name in read_dict:
+                duplicate_read_names_found = True
+                duplicate_name_number += 1
+                name = original_name + '_' + str(duplicate_name_number)
+
+            if read_store is None:
                 read_dict[name] = Read(name, sequence, qualities)
-                read_names.append(name)
-                total_bases += len(sequence)
-                progress = 100.0 * len(read_dict) / num_reads
-                progress_rounded_down = math.floor(progress / step) * step
-                if progress == 100.0 or progress_rounded_down > last_progress:
-                    if not silent:
-                        log.log_progress_line(len(read_dict), num_reads, total_bases)
-                    last_progress = progress_rounded_down
-
-    else:  # file_type == 'FASTA'
-        with open_func(filename, 'rt') as fasta:
-            name = ''
-            sequence = ''
-            last_progress = 0.0
-            for line in fasta:
-                line = line.strip()
-                if not line:
-                    continue
-                if line.startswith('>'):  # Header line = start of new contig
-                    if name:
-                        read_dict[name] = Read(name, sequence, None)
-                        read_names.append(name)
-                        total_bases += len(sequence)
-                        progress = 100.0 * len(read_dict) / num_reads
-                        progress_rounded_down = math.floor(progress / step) * step
-                        if progress == 100.0 or progress_rounded_down > last_progress:
-                            if not silent:
-                                log.log_progress_line(len(read_dict), num_reads, total_bases)
-                            last_progress = progress_rounded_down
-                        sequence = ''
-
-                    # Don't allow duplicate read names, so add a trailing number when they occur.
-                    original_name = get_nice_header(line[1:])
-                    name = original_name
-                    duplicate_name_number = 1
-                    while name in read_dict:
-                        duplicate_read_names_found = True
-                        duplicate_name_number += 1
-                        name = original_name + '_' + str(duplicate_name_number)
-
-                else:
-                    sequence += line
-            if name:
-                read_dict[name] = Read(name, sequence, None)
-                read_names.append(name)
-                total_bases += len(sequence)
+            else:
+                read_dict[name] = read_store.add_read(name, sequence, qualities)
+            read_names.append(name)
+            total_bases += len(sequence)
+
+            # We don't know the read count in advance, so progress is based on how much of the
+            # file has been read and the total is an estimate.
+            progress = 100.0 * fraction
+            progress_rounded_down = math.floor(progress / step) * step
+            if progress_rounded_down > last_progress:
                 if not silent:
-                    log.log_progress_line(len(read_dict), num_reads, total_bases)
+                    estimated_total = max(len(read_dict), int(round(len(read_dict) / fraction)))
+                    log.log_progress_line(len(read_dict), estimated_total, total_bases)
+                last_progress = progress_rounded_down
+
+        if not read_dict:
+            quit_with_error('There are no read sequences in ' + filename)
+        if read_store is not None:
+            read_store.finish_writing(filename, duplicate_read_names_found)
 
     if not silent:
         log.log_progress_line(len(read_dict), len(read_dict), total_bases, end_newline=True)
@@ -221,16 +190,20 @@ def load_long_reads(filename, silent=False, section_header='Loading reads', outp
             no_dup_filename = os.path.join(os.path.dirname(os.path.abspath(filename)),
                                            no_dup_filename)
 
-        if not silent:
+        # If the read index was reused, the duplicate-free file was made by a previous run.
+        already_saved = read_store is not None and read_store.reused and \
+            os.path.isfile(no_dup_filename)
+        if not silent and not already_saved:
             log.log('\nDuplicate read names found. Saving duplicate-free file:')
             log.log(no_dup_filename)
-        with gzip.open(no_dup_filename, 'wb') as f:
-            for read_name in read_names:
-                read = read_dict[read_name]
-                if file_type == 'FASTQ':
-                    f.write(read.get_fastq().encode())
-                else:  # file_type == 'FASTA'
-                    f.write(read.get_fasta().encode())
+        if not already_saved:
+            with gzip.open(no_dup_filename, 'wb') as f:
+                for read_name in read_names:
+                    read = read_dict[read_name]
+                    if file_type == 'FASTQ':
+                        f.write(read.get_fastq().encode())
+                    else:  # file_type == 'FASTA'
+                        f.write(read.get_fasta().encode())
 
     else:
         no_dup_filename = filename
@@ -238,6 +211,52 @@ def load_long_reads(filename, silent=False, section_header='Loading reads', outp
     return read_dict, read_names, no_dup_filename
 
 
+def stream_reads(filename, file_type):
+    """
+    This generator makes a single pass through a FASTQ/FASTA file (optionally gzipped) and yields
+    a tuple of (name, sequence, qualities, fraction) for each read. The fraction is how far through
+    the file (in on-disk bytes) the reader has gotten, which allows for progress reporting without
+    an extra pass to count the reads. FASTA reads have None for their qualities.
+    """
+    file_size = max(os.path.getsize(filename), 1)
+    with open(filename, 'rb') as raw_file:
+        if get_compression_type(filename) == 'gz':
+            seq_file = gzip.open(raw_file, 'rt')
+        else:  # plain text
+            seq_file = io.TextIOWrapper(raw_file)
+
+        if file_type == 'FASTQ':
+            for line in seq_file:
+                stripped_line = line.strip()
+                if len(stripped_line) == 0:
+                    continue
+                if not stripped_line.startswith('@'):
+                    continue
+                name = stripped_line[1:].split()[0]
+                sequence = next(seq_file).strip()
+                _ = next(seq_file)
+                qualities = next(seq_file).strip()
+                yield name, sequence, qualities, min(raw_file.tell() / file_size, 1.0)
+
+        else:  # file_type == 'FASTA'
+            name = ''
+            sequence = []
+            for line in seq_file:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('>'):  # Header line = start of new read
+                    if name:
+                        yield name, ''.join(sequence), None, \
+                            min(raw_file.tell() / file_size, 1.0)
+                        sequence = []
+                    name = get_nice_header(line[1:])
+                else:
+                    sequence.append(line)
+            if name:
+                yield name, ''.join(sequence), None, 1.0
+
+
 class Reference(object):
     """
     This class holds a reference sequence: just a name and a nucleotide sequence.
@@ -266,10 +285,16 @@ class Reference(object):
 class Read(object):
     """
     This class holds a long read, e.g. from PacBio or Oxford Nanopore.
+
+    If pack_sequences is set, reads made from then on hold their sequence as a PackedSequence
+    instead of as a string.
     """
+    pack_sequences = False
 
     def __init__(self, name, sequence, qualities):
         self.name = name
+        self.packed_sequence = None
+        self._sequence = ''
         self.sequence = sequence.upper()
 
         if qualities:
@@ -277,18 +302,33 @@ class Read(object):
 
         # If no qualities are given, then they are all set to '+', the Phred+33 score for 10% error.
         else:
-            self.qualities = '+' * len(self.sequence)
+            self.qualities = '+' * self.get_length()
 
         self.alignments = []
 
+    @property
+    def sequence(self):
+        if self.packed_sequence is not None:
+            return self.packed_sequence.get_sequence()
+        return self._sequence
+
+    @sequence.setter
+    def sequence(self, sequence):
+        if self.pack_sequences:
+            self.packed_sequence = PackedSequence(sequence)
+        else:
+            self._sequence = sequence
+
     def __repr__(self):
-        return self.name + ' (' + str(len(self.sequence)) + ' bp)'
+        return self.name + ' (' + str(self.get_length()) + ' bp)'
 
     def get_length(self):
         """
         Returns the sequence length.
         """
-        return len(self.sequence)
+        if self.packed_sequence is not None:
+            return self.packed_sequence.length
+        return len(self._sequence)
 
     def remove_conflicting_alignments(self, allowed_overlap):
         """
@@ -360,13 +400,13 @@ class Read(object):
         This function returns the fraction of the read which is covered by any of the read's
         alignments.
         """
-        if len(self.sequence) == 0:
+        if self.get_length() == 0:
             return 0.0
         read_ranges = [x.read_start_end_positive_strand()
                        for x in self.alignments]
         read_ranges = simplify_ranges(read_ranges)
         aligned_length = sum([x[1] - x[0] for x in read_ranges])
-        return aligned_length / len(self.sequence)
+        return aligned_length / self.get_length()
 
     def get_reference_bases_aligned(self):
         """
@@ -386,7 +426,7 @@ class Read(object):
         """
         Returns true if 50% or more of the alignments are to contaminant sequences.
         """
-        if len(self.sequence) == 0:
+        if self.get_length() == 0:
             return False
         if not self.alignments:
             return False
@@ -423,6 +463,148 @@ class Read(object):
                            header_format=None, col_separation=2, indent=2)
 
 
+class IndexedRead(Read):
+    """
+    This class is a long read with its sequence and qualities held in a ReadStore instead of in
+    memory. They are fetched from the store each time they are accessed.
+    """
+
+    def __init__(self, name, read_store, offset, length, has_qualities):
+        self.name = name
+        self.read_store = read_store
+        self.offset = offset
+        self.length = length
+        self.has_qualities = has_qualities
+        self.alignments = []
+
+    @property
+    def sequence(self):
+        return self.read_store.get_string(self.offset, self.length)
+
+    @property
+    def qualities(self):
+        if self.has_qualities:
+            return self.read_store.get_string(self.offset + self.length, self.length)
+        else:
+            return '+' * self.length
+
+    def __repr__(self):
+        return self.name + ' (' + str(self.length) + ' bp)'
+
+    def get_length(self):
+        return self.length
+
+
+class ReadStore(object):
+    """
+    This class holds long read sequences and qualities on disk. Each read's sequence (followed by
+    its qualities, if it has them) is written to an uncompressed store file, and an index file
+    records each read's name, offset and length. The store file is then accessed via mmap, so
+    memory use depends on the reads being used, not on the size of the read set.
+
+    The index also records the size and modification time of the source read file, so a later run
+    with the same reads can reuse the store without parsing the read file again.
+    """
+
+    def __init__(self, store_dir):
+        self.store_filename = os.path.join(store_dir, 'long_reads.store')
+        self.index_filename = os.path.join(store_dir, 'long_reads.index')
+        self.store_file = None
+        self.store_mmap = None
+        self.offset = 0
+        self.reads = []
+        self.duplicate_read_names_found = False
+        self.reused = False
+
+    def __getstate__(self):
+        # Open files can't be pickled, so other processes reopen the store when first used.
+        state = self.__dict__.copy()
+        state['store_file'] = None
+        state['store_mmap'] = None
+        return state
+
+    def open_for_writing(self):
+        self.store_file = open(self.store_filename, 'wb')
+        self.offset = 0
+        self.reads = []
+
+    def add_read(self, name, sequence, qualities):
+        """
+        Writes a read to the store and returns an IndexedRead which refers to it.
+        """
+        seq_bytes = sequence.upper().encode()
+        has_qualities = bool(qualities)
+
+        # IndexedRead finds a read's qualities by its sequence length, so they must match.
+        if has_qualities and len(qualities) != len(sequence):
+            quit_with_error('read ' + name + ' has ' + str(len(sequence)) + ' bases but ' +
+                            str(len(qualities)) + ' quality scores')
+        read = IndexedRead(name, self, self.offset, len(seq_bytes), has_qualities)
+        self.store_file.write(seq_bytes)
+        self.offset += len(seq_bytes)
+        if has_qualities:
+            qual_bytes = qualities.encode()
+            self.store_file.write(qual_bytes)
+            self.offset += len(qual_bytes)
+        self.reads.append(read)
+        return read
+
+    def finish_writing(self, source_filename, duplicate_read_names_found):
+        """
+        Closes the store file and saves the index. The index is written to a temporary file and
+        then moved into place, so an interrupted run can't leave behind an index which looks
+        complete.
+        """
+        self.store_file.close()
+        self.store_file = None
+        self.duplicate_read_names_found = duplicate_read_names_found
+        temp_index_filename = self.index_filename + '.incomplete'
+        with open(temp_index_filename, 'wt') as index_file:
+            index_file.write(self.get_source_description(source_filename,
+                                                         duplicate_read_names_found))
+            for read in self.reads:
+                index_file.write('\t'.join([read.name, str(read.offset), str(read.length),
+                                            '1' if read.has_qualities else '0']) + '\n')
+        os.replace(temp_index_filename, self.index_filename)
+        self.reads = []
+
+    def load_index(self, source_filename):
+        """
+        Loads an existing index, if there is one which was made from the given read file. Returns
+        a list of (name, offset, length, has_qualities) tuples, or None if there isn't a usable
+        index.
+        """
+        if not os.path.isfile(self.index_filename) or not os.path.isfile(self.store_filename):
+            return None
+        with open(self.index_filename, 'rt') as index_file:
+            header = index_file.readline()
+            duplicates = header.rstrip('\n').endswith('\t1')
+            if header != self.get_source_description(source_filename, duplicates):
+                return None
+            entries = []
+            for line in index_file:
+                parts = line.rstrip('\n').split('\t')
+                entries.append((parts[0], int(parts[1]), int(parts[2]), parts[3] == '1'))
+        self.duplicate_read_names_found = duplicates
+        self.reused = True
+        return entries
+
+    def get_string(self, offset, length):
+        if length == 0:
+            return ''
+        if self.store_mmap is None:
+            self.store_file = open(self.store_filename, 'rb')
+            self.store_mmap = mmap.mmap(self.store_file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.store_mmap[offset:offset + length].decode()
+
+    @staticmethod
+    def get_source_description(source_filename, duplicate_read_names_found):
+        stat = os.stat(source_filename)
+        return '\t'.join(['#' + os.path.abspath(source_filename), str(stat.st_size),
+                          str(stat.st_mtime_ns), '1' if duplicate_read_names_found else '0']) + \
+            '\n'
+
+
 def get_read_nickname_dict(read_names):
     """
     Read names can be quite long, so for the sake of output brevity, this function tries to come
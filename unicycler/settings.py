@@ -21,6 +21,10 @@ ALLOWED_MINIMAP_OVERLAP = 5
 # best hit.
 MAX_TO_MIN_MINIMISER_RATIO = 10
 
+# Minimap indices of reference sequences are kept for reuse (e.g. the same graph being aligned to in
+# more than one pipeline stage). This many are kept, with the least recently used freed first.
+MINIMAP_INDEX_CACHE_SIZE = 2
+
 # When testing various repeat counts using fully global alignment in Seqan, we use this band size
 # to make the alignment faster.
 SIMPLE_REPEAT_BRIDGING_BAND_SIZE = 50
@@ -94,6 +98,11 @@ ALL_PATH_SEARCH_MAX_FINAL_PATHS = 500
 PROGRESSIVE_PATH_SEARCH_MAX_WORKING_PATHS = 100
 PROGRESSIVE_PATH_SEARCH_SCORE_FRACTION = 0.995
 
+# When scoring candidate bridge paths, path sequences are cached so paths with a common start can
+# share the work of building their sequence. This limits how much sequence (in bases) the cache for
+# one bridge will hold.
+PATH_SEQUENCE_CACHE_MAX_BASES = 50000000
+
 # These settings are used for Unicycler's copy number determination - the process by which it
 # tries to figure out the depth of constituent components of each segment.
 #   * INITIAL_SINGLE_COPY_TOLERANCE controls how much excess depth is acceptable for the first
@@ -164,6 +173,13 @@ BASES_PER_FASTA_LINE = 70
 # changes are made or this limit is hit.
 MAX_PILON_POLISH_COUNT = 10
 
+# With --pilon_incremental, rounds after the first only polish windows around the previous round's
+# changes. Each window extends this far (or the 99th percentile insert size, if larger) either side
+# of a change. If the windows would cover more than the given fraction of the polished sequence,
+# a full round is done instead.
+MIN_PILON_WINDOW_MARGIN = 500
+PILON_INCREMENTAL_MAX_FRACTION = 0.5
+
 MINIASM_BRIDGE_QUAL_WITH_GRAPH_PATH = 1.0
 MINIASM_BRIDGE_QUAL_WITH_DEAD_END = 1.0
 MINIASM_BRIDGE_QUAL_WITHOUT_PATH_OR_DEAD_END = 0.7
@@ -183,3 +199,12 @@ REQUIRED_MINIASM_ASSEMBLY_SIZE_FOR_BRIDGING = 0.5
 MAX_MINIASM_DEAD_END_TRIM_SIZE = 100
 
 MAX_SIMPLE_LOOP_SIZE = 10000
+
+# When long reads are aligned in separate processes (instead of threads), they are sent to the
+# worker processes in batches of this many reads. Bigger batches mean less communication between
+# processes but less frequent progress updates.
+ALIGNMENT_PROCESS_BATCH_SIZE = 10
+
+# When long reads are aligned with multiple threads, each call to the C++ batch aligner gets this
+# many reads per thread.
+ALIGNMENT_BATCH_READS_PER_THREAD = 10
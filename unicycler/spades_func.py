@@ -18,6 +18,7 @@ import subprocess
 import gzip
 import shutil
 import statistics
+import multiprocessing
 from .misc import round_to_nearest_odd, get_compression_type, int_to_str, quit_with_error,\
     strip_read_extensions, bold, dim, print_table, get_left_arrow, float_to_str
 from .assembly_graph import AssemblyGraph
@@ -101,58 +102,14 @@ def get_best_spades_graph(short1, short2, short_unpaired, out_dir, read_depth_fi
     if not existing_graph_files:
         quit_with_error('SPAdes failed to produce assemblies. '
                         'See spades_assembly/assembly/spades.log for more info.')
-    median_segment_count = statistics.median(count_segments_in_spades_fastg(x)
-                                             for x in existing_graph_files)
-
-    for graph_file, kmer in zip(graph_files, kmer_range):
-        table_line = [int_to_str(kmer)]
-
-        if graph_file is None:
-            table_line += [''] * (7 if verbosity > 1 else 2)
-            table_line.append('failed')
-            spades_results_table.append(table_line)
-            continue
-
-        assembly_graph = AssemblyGraph(graph_file, kmer, paths_file=None,
-                                       insert_size_mean=insert_size_mean,
-                                       insert_size_deviation=insert_size_deviation)
-
-        # If this graph has way too many segments, then we will just skip it because very complex
-        # graphs take forever to clean up.
-        # TO DO: I can remove this awkward hack if I make the graph cleaning more efficient.
-        if len(assembly_graph.segments) > 4 * median_segment_count:
-            table_line += [''] * (6 if verbosity > 1 else 2)
-            table_line.append('too complex')
-            spades_results_table.append(table_line)
-            continue
-
-        log.log('\nCleaning k{} graph'.format(kmer), 2)
-        assembly_graph.clean(read_depth_filter, largest_component)
-        clean_graph_filename = os.path.join(spades_dir, ('k%03d' % kmer) + '_assembly_graph.gfa')
-        assembly_graph.save_to_gfa(clean_graph_filename, verbosity=2)
-
-        segment_count = len(assembly_graph.segments)
-        dead_ends = assembly_graph.total_dead_end_count()
-
-        # If the user is expecting some linear sequences, then the dead end count can be adjusted
-        # down so expected dead ends don't penalise this k-mer.
-        adjusted_dead_ends = max(0, dead_ends - (2 * expected_linear_seqs))
-        if segment_count == 0:
-            score = 0.0
-        else:
-            score = 1.0 / (segment_count * (adjusted_dead_ends + 2))
-
-        # Prepare the table line for this k-mer graph.
-        table_line += [int_to_str(segment_count)]
-        if verbosity > 1:
-            n50, shortest, lower_quartile, median, upper_quartile, longest = \
-                assembly_graph.get_contig_stats()
-            table_line += [int_to_str(assembly_graph.get_total_link_count()),
-                           int_to_str(assembly_graph.get_total_length()),
-                           int_to_str(n50), int_to_str(longest)]
-        table_line += [int_to_str(dead_ends), '{:.2e}'.format(score)]
-        spades_results_table.append(table_line)
 
+    kmer_graph_results = score_spades_graphs(graph_files, kmer_range, insert_size_mean,
+                                             insert_size_deviation, read_depth_filter,
+                                             largest_component, expected_linear_seqs, spades_dir,
+                                             verbosity, threads)
+    for (graph_file, kmer), (table_line, score) in zip(zip(graph_files, kmer_range),
+                                                      kmer_graph_results):
+        spades_results_table.append(table_line)
         if score > best_score:
             best_kmer = kmer
             best_score = score
@@ -214,6 +171,90 @@ def get_best_spades_graph(short1, short2, short_unpaired, out_dir, read_depth_fi
     return assembly_graph
 
 
+def score_spades_graphs(graph_files, kmer_range, insert_size_mean, insert_size_deviation,
+                        read_depth_filter, largest_component, expected_linear_seqs, spades_dir,
+                        verbosity, threads):
+    """
+    This function loads, cleans, saves and scores the SPAdes graph for each k-mer. It returns a
+    list of (table line, score) tuples, one per k-mer in k-mer order.
+
+    When more than one thread is available, the graphs are done in parallel using a process pool.
+    Each worker's log output is captured and then logged here in k-mer order, so the results and
+    the output are the same as when the graphs are done one at a time.
+    """
+    all_args = [(graph_file, kmer, insert_size_mean, insert_size_deviation, read_depth_filter,
+                 largest_component, expected_linear_seqs, spades_dir, verbosity)
+                for graph_file, kmer in zip(graph_files, kmer_range)]
+    process_count = min(threads, sum(1 for x in graph_files if x is not None))
+    if process_count < 2:
+        return [score_spades_graph(*x) for x in all_args]
+
+    with multiprocessing.Pool(process_count) as pool:
+        pool_results = pool.map(score_spades_graph_pool, all_args, chunksize=1)
+    kmer_graph_results = []
+    for table_line, score, stdout_text, log_file_text in pool_results:
+        log.write_captured_log(stdout_text, log_file_text)
+        kmer_graph_results.append((table_line, score))
+    return kmer_graph_results
+
+
+def score_spades_graph_pool(all_args):
+    """
+    A version of score_spades_graph for use in a process pool. It captures its log output and
+    returns it along with the results.
+    """
+    with log.CapturedLog() as captured_log:
+        table_line, score = score_spades_graph(*all_args)
+    stdout_text, log_file_text = captured_log.get_output()
+    return table_line, score, stdout_text, log_file_text
+
+
+def score_spades_graph(graph_file, kmer, insert_size_mean, insert_size_deviation,
+                       read_depth_filter, largest_component, expected_linear_seqs, spades_dir,
+                       verbosity):
+    """
+    This function loads, cleans and saves one k-mer's SPAdes graph and then scores it. It returns
+    the graph's line for the SPAdes results table and its score.
+    """
+    table_line = [int_to_str(kmer)]
+
+    if graph_file is None:
+        table_line += [''] * (7 if verbosity > 1 else 2)
+        table_line.append('failed')
+        return table_line, 0.0
+
+    assembly_graph = AssemblyGraph(graph_file, kmer, paths_file=None,
+                                   insert_size_mean=insert_size_mean,
+                                   insert_size_deviation=insert_size_deviation)
+
+    log.log('\nCleaning k{} graph'.format(kmer), 2)
+    assembly_graph.clean(read_depth_filter, largest_component)
+    clean_graph_filename = os.path.join(spades_dir, ('k%03d' % kmer) + '_assembly_graph.gfa')
+    assembly_graph.save_to_gfa(clean_graph_filename, verbosity=2)
+
+    segment_count = len(assembly_graph.segments)
+    dead_ends = assembly_graph.total_dead_end_count()
+
+    # If the user is expecting some linear sequences, then the dead end count can be adjusted
+    # down so expected dead ends don't penalise this k-mer.
+    adjusted_dead_ends = max(0, dead_ends - (2 * expected_linear_seqs))
+    if segment_count == 0:
+        score = 0.0
+    else:
+        score = 1.0 / (segment_count * (adjusted_dead_ends + 2))
+
+    # Prepare the table line for this k-mer graph.
+    table_line += [int_to_str(segment_count)]
+    if verbosity > 1:
+        n50, shortest, lower_quartile, median, upper_quartile, longest = \
+            assembly_graph.get_contig_stats()
+        table_line += [int_to_str(assembly_graph.get_total_link_count()),
+                       int_to_str(assembly_graph.get_total_length()),
+                       int_to_str(n50), int_to_str(longest)]
+    table_line += [int_to_str(dead_ends), '{:.2e}'.format(score)]
+    return table_line, score
+
+
 def spades_read_correction(short1, short2, unpaired, spades_dir, threads, spades_path, keep,
                            spades_tmp_dir):
     """
@@ -563,12 +604,3 @@ def get_read_count(reads_filename):
                 read_count += 1
             i += 1
     return read_count
-
-
-def count_segments_in_spades_fastg(fastg_file):
-    seq_count = 0
-    with open(fastg_file, 'rt') as fastg:
-        for line in fastg:
-            if line.startswith('>'):
-                seq_count += 1
-    return seq_count // 2
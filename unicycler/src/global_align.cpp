@@ -37,6 +37,20 @@ char * fullyGlobalAlignment(char * s1, char * s2,
         return cppStringToCString("");
 }
 
+// This is the same as the above function, but it returns the alignment as a struct instead of a
+// string (null if the alignment failed).
+AlignmentResult * fullyGlobalAlignmentResult(char * s1, char * s2,
+                                             int matchScore, int mismatchScore,
+                                             int gapOpenScore, int gapExtensionScore,
+                                             bool useBanding, int bandSize) {
+    std::string sequence1(s1);
+    std::string sequence2(s2);
+    return getAlignmentResultAndDelete(fullyGlobalAlignment(sequence1, sequence2,
+                                                            matchScore, mismatchScore,
+                                                            gapOpenScore, gapExtensionScore,
+                                                            useBanding, bandSize));
+}
+
 // This function runs a global alignment between two sequences.
 ScoredAlignment * fullyGlobalAlignment(std::string s1, std::string s2,
                                        int matchScore, int mismatchScore, int gapOpenScore, int gapExtensionScore,
@@ -269,6 +269,28 @@ mm_idx_t *mm_idx_build(const char *fn, int w, int k, int n_threads) // a simpler
 	return mi;
 }
 
+mm_idx_t *mm_idx_gen_seqs(int n, char **names, char **seqs, int w, int k, int b, int n_threads) // RRW: index sequences already in memory, no FASTA file needed
+{
+	int i;
+	mm_idx_t *mi;
+	mm128_v a = {0, 0, 0};
+	mi = mm_idx_init(w, k, b);
+	mi->n = n;
+	mi->name = (char**)calloc(n > 0? n : 1, sizeof(char*));
+	mi->len = (int32_t*)calloc(n > 0? n : 1, sizeof(int32_t));
+	for (i = 0; i < n; ++i) {
+		assert(strlen(names[i]) <= 254);
+		mi->name[i] = strdup(names[i]);
+		mi->len[i] = strlen(seqs[i]);
+		if (mi->len[i] > 0)
+			mm_sketch(seqs[i], mi->len[i], mi->w, mi->k, i, &a);
+	}
+	mm_idx_add(mi, a.n, a.a);
+	free(a.a);
+	mm_idx_post(mi, n_threads);
+	return mi;
+}
+
 /*************
  * index I/O *
  *************/
@@ -25,41 +25,52 @@
 KSEQ_INIT(gzFile, gzread)
 
 
-char * minimapAlignReads(char * referenceFasta, char * readsFastq, int n_threads,
-                         int sensitivityLevel, int preset) {
-    // The k-mer size depends on the sensitivity level.
-    int k = LEVEL_0_MINIMAP_KMER_SIZE;
+// The k-mer size depends on the sensitivity level.
+static int getMinimapKmerSize(int sensitivityLevel) {
     if (sensitivityLevel == 1)
-        k = LEVEL_1_MINIMAP_KMER_SIZE;
+        return LEVEL_1_MINIMAP_KMER_SIZE;
     else if (sensitivityLevel == 2)
-        k = LEVEL_2_MINIMAP_KMER_SIZE;
+        return LEVEL_2_MINIMAP_KMER_SIZE;
     else if (sensitivityLevel == 3)
-        k = LEVEL_3_MINIMAP_KMER_SIZE;
+        return LEVEL_3_MINIMAP_KMER_SIZE;
+    return LEVEL_0_MINIMAP_KMER_SIZE;
+}
 
-    // Set up some options and parameters.
-    int w = int(.6666667 * k + .499);  // 2/3 of k
-    mm_verbose = 0;
-    mm_mapopt_t opt;
-    mm_mapopt_init(&opt);
-	int tbatch_size = 100000000;
-	uint64_t ibatch_size = 4000000000ULL;
-	float f = 0.001;
+
+// Sets the mapping options and minimiser window size for one of the presets.
+static void setMinimapPreset(int preset, int k, mm_mapopt_t * opt, int * w) {
+    *w = int(.6666667 * k + .499);  // 2/3 of k
+    mm_mapopt_init(opt);
 
     // preset of 0 is default settings.
 
     // preset of 1 is for mapping reads against themselves: -Sw5 -L100 -m0
     if (preset == 1) {
-        opt.flag |= MM_F_AVA | MM_F_NO_SELF;
-        opt.min_match = 100;
-        opt.merge_frac = 0.0;
-        w = 5;
+        opt->flag |= MM_F_AVA | MM_F_NO_SELF;
+        opt->min_match = 100;
+        opt->merge_frac = 0.0;
+        *w = 5;
     }
     // preset of 2 is for finding contigs in the string graph: -w5 -L100 -m0
     else if (preset == 2) {
-        opt.min_match = 100;
-        opt.merge_frac = 0.0;
-        w = 5;
+        opt->min_match = 100;
+        opt->merge_frac = 0.0;
+        *w = 5;
     }
+}
+
+
+char * minimapAlignReads(char * referenceFasta, char * readsFastq, int n_threads,
+                         int sensitivityLevel, int preset) {
+    // Set up some options and parameters.
+    int k = getMinimapKmerSize(sensitivityLevel);
+    int w;
+    mm_verbose = 0;
+    mm_mapopt_t opt;
+    setMinimapPreset(preset, k, &opt, &w);
+	int tbatch_size = 100000000;
+	uint64_t ibatch_size = 4000000000ULL;
+	float f = 0.001;
 
     // Redirect minimap's output to a stringstream, instead of outputting it to stdout.
     // http://stackoverflow.com/questions/5419356/redirect-stdout-stderr-to-a-string
@@ -86,6 +97,42 @@ char * minimapAlignReads(char * referenceFasta, char * readsFastq, int n_threads
 }
 
 
+void * newMinimapIndex(char ** names, char ** sequences, int count, int n_threads,
+                       int sensitivityLevel, int preset) {
+    int k = getMinimapKmerSize(sensitivityLevel);
+    int w;
+    mm_mapopt_t opt;
+    setMinimapPreset(preset, k, &opt, &w);
+    mm_verbose = 0;
+    mm_idx_t * mi = mm_idx_gen_seqs(count, names, sequences, w, k, MM_IDX_DEF_B, n_threads);
+    mm_idx_set_max_occ(mi, 0.001);
+    return (void *) mi;
+}
+
+
+char * minimapAlignReadsToIndex(void * index, char * readsFastq, int n_threads,
+                                int sensitivityLevel, int preset) {
+    int k = getMinimapKmerSize(sensitivityLevel);
+    int w;
+    mm_verbose = 0;
+    mm_mapopt_t opt;
+    setMinimapPreset(preset, k, &opt, &w);
+    int tbatch_size = 100000000;
+
+    std::stringstream outputBuffer;
+    std::streambuf * old = std::cout.rdbuf(outputBuffer.rdbuf());
+    mm_map_file((mm_idx_t *) index, readsFastq, &opt, n_threads, tbatch_size);
+    std::cout.rdbuf(old);
+
+    return cppStringToCString(outputBuffer.str());
+}
+
+
+void deleteMinimapIndex(void * index) {
+    mm_idx_destroy((mm_idx_t *) index);
+}
+
+
 
 char * minimapAlignReadsWithSettings(char * referenceFasta, char * readsFastq, int n_threads,
                                      bool allVsAll, int kmerSize, int minimiserSize,
@@ -36,6 +36,20 @@ char * pathAlignment(char * s1, char * s2,
         return cppStringToCString("");
 }
 
+// This is the same as the above function, but it returns the alignment as a struct instead of a
+// string (null if the alignment failed).
+AlignmentResult * pathAlignmentResult(char * s1, char * s2,
+                                      int matchScore, int mismatchScore,
+                                      int gapOpenScore, int gapExtensionScore,
+                                      bool useBanding, int bandSize) {
+    std::string sequence1(s1);
+    std::string sequence2(s2);
+    return getAlignmentResultAndDelete(pathAlignment(sequence1, sequence2,
+                                                     matchScore, mismatchScore,
+                                                     gapOpenScore, gapExtensionScore,
+                                                     useBanding, bandSize));
+}
+
 // This function runs a mostly-global alignment between two sequences. The only free gaps are those
 // at the end of sequence 2.
 // It is intended to align a partial path sequence (s1) to a consensus read sequence (s2).
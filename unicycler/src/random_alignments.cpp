@@ -202,30 +202,10 @@ void getMeanAndStDev(std::vector<double> & v, double & mean, double & stdDev) {
 }
 
 char * simulateDepths(int alignmentLengths[], int alignmentCount, int refLength, int iterations, int threadCount) {
-
-
     std::vector<int> minDepthCounts;
     std::vector<int> maxDepthCounts;
-    std::mutex mut;
-
-    std::vector<std::thread *> threads;
-    int iterationsPerThread = iterations / threadCount;
-    int iterationsInFirstThread = iterations - (iterationsPerThread * (threadCount - 1));
-    for (int i = 0; i < threadCount; ++i) {
-        int iterationsThisThread;
-        if (i == 0)
-            iterationsThisThread = iterationsInFirstThread;
-        else
-            iterationsThisThread = iterationsPerThread;
-        std::thread * thread = new std::thread(simulateDepthsOneThread, alignmentLengths, alignmentCount, refLength, iterationsThisThread,
-                                               &minDepthCounts, &maxDepthCounts, &mut);
-        threads.push_back(thread);
-    }
-    for (int i = 0; i < threadCount; ++i) {
-        threads[i]->join();
-        delete threads[i];
-    }
-
+    simulateDepthCounts(alignmentLengths, alignmentCount, refLength, iterations, threadCount,
+                        &minDepthCounts, &maxDepthCounts);
 
     std::vector<double> minDepthDistribution;
     for (size_t i = 0; i < minDepthCounts.size(); ++i)
@@ -250,6 +230,59 @@ char * simulateDepths(int alignmentLengths[], int alignmentCount, int refLength,
     return cppStringToCString(returnString);
 }
 
+// Does the same simulation as simulateDepths, but returns the distributions as arrays instead of a
+// string.
+DepthDistributions * simulateDepthDistributions(int alignmentLengths[], int alignmentCount, int refLength,
+                                                int iterations, int threadCount) {
+    std::vector<int> minDepthCounts;
+    std::vector<int> maxDepthCounts;
+    simulateDepthCounts(alignmentLengths, alignmentCount, refLength, iterations, threadCount,
+                        &minDepthCounts, &maxDepthCounts);
+
+    DepthDistributions * distributions = (DepthDistributions *)malloc(sizeof(DepthDistributions));
+    distributions->minCount = int(minDepthCounts.size());
+    distributions->minDistribution = (double *)malloc(sizeof(double) * (minDepthCounts.size() + 1));
+    for (size_t i = 0; i < minDepthCounts.size(); ++i)
+        distributions->minDistribution[i] = double(minDepthCounts[i]) / iterations;
+    distributions->maxCount = int(maxDepthCounts.size());
+    distributions->maxDistribution = (double *)malloc(sizeof(double) * (maxDepthCounts.size() + 1));
+    for (size_t i = 0; i < maxDepthCounts.size(); ++i)
+        distributions->maxDistribution[i] = double(maxDepthCounts[i]) / iterations;
+    return distributions;
+}
+
+void freeDepthDistributions(DepthDistributions * distributions) {
+    if (distributions == 0)
+        return;
+    free(distributions->minDistribution);
+    free(distributions->maxDistribution);
+    free(distributions);
+}
+
+// Runs the depth simulation iterations over the given number of threads, tallying up how many
+// iterations had each min and max depth.
+void simulateDepthCounts(int alignmentLengths[], int alignmentCount, int refLength, int iterations, int threadCount,
+                         std::vector<int> * minDepthCounts, std::vector<int> * maxDepthCounts) {
+    std::mutex mut;
+    std::vector<std::thread *> threads;
+    int iterationsPerThread = iterations / threadCount;
+    int iterationsInFirstThread = iterations - (iterationsPerThread * (threadCount - 1));
+    for (int i = 0; i < threadCount; ++i) {
+        int iterationsThisThread;
+        if (i == 0)
+            iterationsThisThread = iterationsInFirstThread;
+        else
+            iterationsThisThread = iterationsPerThread;
+        std::thread * thread = new std::thread(simulateDepthsOneThread, alignmentLengths, alignmentCount, refLength, iterationsThisThread,
+                                               minDepthCounts, maxDepthCounts, &mut);
+        threads.push_back(thread);
+    }
+    for (int i = 0; i < threadCount; ++i) {
+        threads[i]->join();
+        delete threads[i];
+    }
+}
+
 void simulateDepthsOneThread(int alignmentLengths[], int alignmentCount, int refLength, int iterations,
                              std::vector<int> * minDepthCounts, std::vector<int> * maxDepthCounts,
                              std::mutex * mut) {
@@ -12,6 +12,7 @@
 #include "scoredalignment.h"
 
 #include <iostream>
+#include <cstdlib>
 
 ScoredAlignment::ScoredAlignment(Align<Dna5String, ArrayGaps> & alignment, 
                                  std::string & readName, std::string & refName,
@@ -156,6 +157,47 @@ std::string ScoredAlignment::getFullString() {
 }
 
 
+// Builds a struct version of the alignment (the same values as getFullString) on the heap. It must
+// be freed with freeAlignmentResult.
+AlignmentResult * ScoredAlignment::getAlignmentResult() {
+    std::vector<int> cigarLengths;
+    std::string cigarOps;
+    getCigarRuns(cigarLengths, cigarOps);
+    int cigarCount = int(cigarOps.size());
+
+    AlignmentResult * result = (AlignmentResult *)malloc(sizeof(AlignmentResult));
+    result->revComp = isRevComp() ? 1 : 0;
+    result->readStart = m_readStartPos;
+    result->readEnd = m_readEndPos;
+    result->refStart = m_refStartPos;
+    result->refEnd = m_refEndPos;
+    result->rawScore = m_rawScore;
+    result->scaledScore = m_scaledScore;
+    result->milliseconds = m_milliseconds;
+    result->cigarCount = cigarCount;
+    result->cigarLengths = (int *)malloc(sizeof(int) * (cigarCount + 1));
+    result->cigarOps = (char *)malloc(sizeof(char) * (cigarCount + 1));
+    std::copy(cigarLengths.begin(), cigarLengths.end(), result->cigarLengths);
+    std::copy(cigarOps.begin(), cigarOps.end(), result->cigarOps);
+    return result;
+}
+
+
+// Splits the CIGAR string into run lengths and operation characters, e.g. 5S100M -> [5, 100], SM.
+void ScoredAlignment::getCigarRuns(std::vector<int> & lengths, std::string & ops) {
+    int length = 0;
+    for (char c : m_cigar) {
+        if (c >= '0' && c <= '9')
+            length = length * 10 + (c - '0');
+        else {
+            ops.push_back(c);
+            lengths.push_back(length);
+            length = 0;
+        }
+    }
+}
+
+
 std::string ScoredAlignment::getShortDisplayString() {
     std::stringstream ss;
     ss << std::fixed << std::setprecision(2) << m_scaledScore;
@@ -231,4 +273,24 @@ bool ScoredAlignment::isRevComp() {
 
 long long getTime() {
     return std::chrono::duration_cast<std::chrono::milliseconds>(std::chrono::system_clock::now().time_since_epoch()).count();
-}
\ No newline at end of file
+}
+
+
+// This is used by the C-linkage alignment functions which return a struct: a failed alignment
+// (null) gives a null result.
+AlignmentResult * getAlignmentResultAndDelete(ScoredAlignment * alignment) {
+    if (alignment == 0)
+        return 0;
+    AlignmentResult * result = alignment->getAlignmentResult();
+    delete alignment;
+    return result;
+}
+
+
+void freeAlignmentResult(AlignmentResult * result) {
+    if (result == 0)
+        return;
+    free(result->cigarLengths);
+    free(result->cigarOps);
+    free(result);
+}
@@ -17,6 +17,8 @@
 #include <algorithm>
 #include <utility>
 #include <math.h>
+#include <thread>
+#include <atomic>
 
 #include "settings.h"
 
@@ -26,6 +28,185 @@ char * semiGlobalAlignment(char * readNameC, char * readSeqC, int verbosity,
                            int matchScore, int mismatchScore, int gapOpenScore,
                            int gapExtensionScore, double /*lowScoreThreshold*/, bool /*returnBad*/,
                            int sensitivityLevel) {
+    std::string output;
+    std::string returnString;
+
+    // Change the read name, sequence and minimap alignments to C++ strings.
+    std::string readName(readNameC);
+    std::string readSeq(readSeqC);
+    std::string minimapAlignmentsCppStr(minimapAlignmentsStr);
+    std::vector<ScoredAlignment *> returnedAlignments =
+        semiGlobalAlignmentOneRead(readName, readSeq, minimapAlignmentsCppStr, refSeqs,
+                                   matchScore, mismatchScore, gapOpenScore, gapExtensionScore,
+                                   sensitivityLevel, verbosity, output);
+
+    // The returned string is semicolon-delimited. The last part is the console output and the
+    // other parts are alignment description strings.
+    for (auto const & alignment : returnedAlignments) {
+        if (alignment != 0) {
+            returnString += alignment->getFullString() + ";";
+            delete alignment;
+        }
+    }
+    returnString += output;
+
+    return cppStringToCString(returnString);
+}
+
+
+SemiGlobalBatchResults * semiGlobalAlignmentBatch(int readCount, char * readNames,
+                                                  long long * readNameOffsets, char * readSeqs,
+                                                  long long * readSeqOffsets,
+                                                  char * minimapAlignmentsStrs,
+                                                  long long * minimapAlignmentsOffsets,
+                                                  int verbosity, SeqMap * refSeqs,
+                                                  int matchScore, int mismatchScore,
+                                                  int gapOpenScore, int gapExtensionScore,
+                                                  int sensitivityLevel, int threads) {
+    std::vector<std::vector<ScoredAlignment *> > readAlignments(readCount);
+    std::vector<std::string> readOutputs(readCount);
+
+    // Worker threads take reads one at a time (using an atomic counter) and store each read's
+    // results in its own slot, so no locking is needed.
+    std::atomic<int> nextRead(0);
+    auto alignReads = [&]() {
+        while (true) {
+            int i = nextRead++;
+            if (i >= readCount)
+                break;
+            std::string readName(readNames + readNameOffsets[i],
+                                 size_t(readNameOffsets[i+1] - readNameOffsets[i]));
+            std::string readSeq(readSeqs + readSeqOffsets[i],
+                                size_t(readSeqOffsets[i+1] - readSeqOffsets[i]));
+            std::string minimapAlignmentsStr(
+                minimapAlignmentsStrs + minimapAlignmentsOffsets[i],
+                size_t(minimapAlignmentsOffsets[i+1] - minimapAlignmentsOffsets[i]));
+            readAlignments[i] =
+                semiGlobalAlignmentOneRead(readName, readSeq, minimapAlignmentsStr, refSeqs,
+                                           matchScore, mismatchScore, gapOpenScore,
+                                           gapExtensionScore, sensitivityLevel, verbosity,
+                                           readOutputs[i]);
+        }
+    };
+    int threadCount = std::max(1, std::min(threads, readCount));
+    std::vector<std::thread> workers;
+    for (int t = 1; t < threadCount; ++t)
+        workers.push_back(std::thread(alignReads));
+    alignReads();
+    for (auto & worker : workers)
+        worker.join();
+
+    // Now put the results into flat arrays for Python.
+    std::vector<ScoredAlignment *> allAlignments;
+    std::vector<int> allReadIndices;
+    for (int i = 0; i < readCount; ++i) {
+        for (auto const & alignment : readAlignments[i]) {
+            if (alignment != 0) {
+                allAlignments.push_back(alignment);
+                allReadIndices.push_back(i);
+            }
+        }
+    }
+    int alignmentCount = int(allAlignments.size());
+
+    std::vector<std::string> cigarOps(alignmentCount);
+    std::vector<std::vector<int> > cigarLengths(alignmentCount);
+    long long totalCigarParts = 0, totalRefNameLength = 0, totalOutputLength = 0;
+    for (int j = 0; j < alignmentCount; ++j) {
+        allAlignments[j]->getCigarRuns(cigarLengths[j], cigarOps[j]);
+        totalCigarParts += cigarOps[j].size();
+        totalRefNameLength += allAlignments[j]->m_refName.size();
+    }
+    for (int i = 0; i < readCount; ++i)
+        totalOutputLength += readOutputs[i].size();
+
+    SemiGlobalBatchResults * results =
+        (SemiGlobalBatchResults *)malloc(sizeof(SemiGlobalBatchResults));
+    results->alignmentCount = alignmentCount;
+    results->readIndices = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->revComps = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->readStarts = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->readEnds = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->refStarts = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->refEnds = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->rawScores = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->scaledScores = (double *)malloc(sizeof(double) * std::max(alignmentCount, 1));
+    results->milliseconds = (int *)malloc(sizeof(int) * std::max(alignmentCount, 1));
+    results->refNameOffsets = (long long *)malloc(sizeof(long long) * (alignmentCount + 1));
+    results->refNames = (char *)malloc(sizeof(char) * (totalRefNameLength + 1));
+    results->cigarOffsets = (long long *)malloc(sizeof(long long) * (alignmentCount + 1));
+    results->cigarLengths = (int *)malloc(sizeof(int) * (totalCigarParts + 1));
+    results->cigarOps = (char *)malloc(sizeof(char) * (totalCigarParts + 1));
+    results->outputOffsets = (long long *)malloc(sizeof(long long) * (readCount + 1));
+    results->outputs = (char *)malloc(sizeof(char) * (totalOutputLength + 1));
+
+    long long refNamePos = 0, cigarPos = 0;
+    for (int j = 0; j < alignmentCount; ++j) {
+        ScoredAlignment * alignment = allAlignments[j];
+        results->readIndices[j] = allReadIndices[j];
+        results->revComps[j] = alignment->isRevComp() ? 1 : 0;
+        results->readStarts[j] = alignment->m_readStartPos;
+        results->readEnds[j] = alignment->m_readEndPos;
+        results->refStarts[j] = alignment->m_refStartPos;
+        results->refEnds[j] = alignment->m_refEndPos;
+        results->rawScores[j] = alignment->m_rawScore;
+        results->scaledScores[j] = alignment->m_scaledScore;
+        results->milliseconds[j] = alignment->m_milliseconds;
+        results->refNameOffsets[j] = refNamePos;
+        std::copy(alignment->m_refName.begin(), alignment->m_refName.end(),
+                  results->refNames + refNamePos);
+        refNamePos += alignment->m_refName.size();
+        results->cigarOffsets[j] = cigarPos;
+        std::copy(cigarLengths[j].begin(), cigarLengths[j].end(),
+                  results->cigarLengths + cigarPos);
+        std::copy(cigarOps[j].begin(), cigarOps[j].end(), results->cigarOps + cigarPos);
+        cigarPos += cigarOps[j].size();
+        delete alignment;
+    }
+    results->refNameOffsets[alignmentCount] = refNamePos;
+    results->cigarOffsets[alignmentCount] = cigarPos;
+
+    long long outputPos = 0;
+    for (int i = 0; i < readCount; ++i) {
+        results->outputOffsets[i] = outputPos;
+        std::copy(readOutputs[i].begin(), readOutputs[i].end(), results->outputs + outputPos);
+        outputPos += readOutputs[i].size();
+    }
+    results->outputOffsets[readCount] = outputPos;
+
+    return results;
+}
+
+
+void freeSemiGlobalBatchResults(SemiGlobalBatchResults * results) {
+    free(results->readIndices);
+    free(results->revComps);
+    free(results->readStarts);
+    free(results->readEnds);
+    free(results->refStarts);
+    free(results->refEnds);
+    free(results->rawScores);
+    free(results->scaledScores);
+    free(results->milliseconds);
+    free(results->refNameOffsets);
+    free(results->refNames);
+    free(results->cigarOffsets);
+    free(results->cigarLengths);
+    free(results->cigarOps);
+    free(results->outputOffsets);
+    free(results->outputs);
+    free(results);
+}
+
+
+std::vector<ScoredAlignment *> semiGlobalAlignmentOneRead(std::string & readName,
+                                                          std::string & posReadSeq,
+                                                          std::string & minimapAlignmentsStr,
+                                                          SeqMap * refSeqs, int matchScore,
+                                                          int mismatchScore, int gapOpenScore,
+                                                          int gapExtensionScore,
+                                                          int sensitivityLevel, int verbosity,
+                                                          std::string & output) {
     int kSize = LEVEL_0_KMER_SIZE;
     if (sensitivityLevel == 1)
         kSize = LEVEL_1_KMER_SIZE;
@@ -34,15 +215,10 @@ char * semiGlobalAlignment(char * readNameC, char * readSeqC, int verbosity,
     else if (sensitivityLevel == 3)
         kSize = LEVEL_3_KMER_SIZE;
 
-    std::string output;
-    std::string returnString;
     std::vector<ScoredAlignment *> returnedAlignments;
 
-    // Change the read name and sequence to C++ strings.
-    std::string readName(readNameC);
     std::string posReadName = readName + "+";
     std::string negReadName = readName + "-";
-    std::string posReadSeq(readSeqC);
     std::string negReadSeq;  // Will make later, if necessary.
     int readLength = int(posReadSeq.length());
 
@@ -141,15 +317,7 @@ char * semiGlobalAlignment(char * readNameC, char * readSeqC, int verbosity,
         }
     }
 
-    // The returned string is semicolon-delimited. The last part is the console output and the
-    // other parts are alignment description strings.
-    for (auto const & alignment : returnedAlignments) {
-        if (alignment != 0)
-            returnString += alignment->getFullString() + ";";
-    }
-    returnString += output;
-
-    return cppStringToCString(returnString);
+    return returnedAlignments;
 }
 
 
@@ -37,6 +37,20 @@ char * semiGlobalAlignmentExhaustive(char * s1, char * s2,
 }
 
 
+// This is the same as the above function, but it returns the alignment as a struct instead of a
+// string (null if the alignment failed).
+AlignmentResult * semiGlobalAlignmentExhaustiveResult(char * s1, char * s2,
+                                                      int matchScore, int mismatchScore,
+                                                      int gapOpenScore, int gapExtensionScore) {
+    std::string sequence1(s1);
+    std::string sequence2(s2);
+    return getAlignmentResultAndDelete(semiGlobalAlignmentExhaustive(sequence1, sequence2,
+                                                                     matchScore, mismatchScore,
+                                                                     gapOpenScore,
+                                                                     gapExtensionScore));
+}
+
+
 ScoredAlignment * semiGlobalAlignmentExhaustive(std::string s1, std::string s2,
                                                 int matchScore, int mismatchScore,
                                                 int gapOpenScore, int gapExtensionScore) {
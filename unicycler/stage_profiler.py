@@ -0,0 +1,115 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module records how much time and memory each major stage of a Unicycler run uses and saves
+it to a JSON file in the output directory, alongside unicycler.log.
+
+Peak RSS values come from getrusage, which only reports a high-water mark for the life of the
+process (or for the largest finished child process, e.g. SPAdes). A stage's peak RSS is therefore
+the highest seen by the end of that stage, not necessarily the memory used by that stage alone.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import contextlib
+import json
+import os
+import resource
+import sys
+import time
+from .version import __version__
+
+
+class StageProfiler(object):
+
+    def __init__(self, profile_filename=None, command=None):
+        self.profile_filename = profile_filename
+        self.command = command
+        self.start_time = time.time()
+        self.start_usage = get_usage()
+        self.stages = []
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        Measures the code run in the with block as a pipeline stage. The block can add item counts
+        to the yielded dictionary. The stage is recorded (and the profile saved) even if the block
+        raises an exception.
+        """
+        counts = {}
+        start_time, start_usage = time.time(), get_usage()
+        try:
+            yield counts
+        finally:
+            self.stages.append(get_stage_record(name, start_time, start_usage, counts))
+            self.save()
+
+    def save(self):
+        """
+        Writes the profile to file. It is saved after every stage, so a run which was killed still
+        leaves a profile of the stages it finished.
+        """
+        if not self.profile_filename:
+            return
+        profile = {'unicycler_version': __version__,
+                   'command': self.command,
+                   'stages': self.stages,
+                   'total': get_stage_record('total', self.start_time, self.start_usage, {})}
+        del profile['total']['name']
+        with open(self.profile_filename, 'wt') as profile_file:
+            json.dump(profile, profile_file, indent=2)
+            profile_file.write('\n')
+
+
+def get_usage():
+    """
+    Returns the CPU times (user + system, in seconds) and peak RSS values (in MB) for this process
+    and its finished child processes.
+    """
+    self_usage = resource.getrusage(resource.RUSAGE_SELF)
+    child_usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return {'cpu_seconds': self_usage.ru_utime + self_usage.ru_stime,
+            'child_cpu_seconds': child_usage.ru_utime + child_usage.ru_stime,
+            'peak_rss_mb': max_rss_to_mb(self_usage.ru_maxrss),
+            'child_peak_rss_mb': max_rss_to_mb(child_usage.ru_maxrss)}
+
+
+def max_rss_to_mb(max_rss):
+    """
+    getrusage gives max RSS in bytes on macOS and in kilobytes elsewhere.
+    """
+    if sys.platform == 'darwin':
+        return max_rss / 1048576
+    return max_rss / 1024
+
+
+def get_stage_record(name, start_time, start_usage, counts):
+    end_usage = get_usage()
+    return {'name': name,
+            'wall_seconds': round(time.time() - start_time, 3),
+            'cpu_seconds': round(end_usage['cpu_seconds'] - start_usage['cpu_seconds'], 3),
+            'child_cpu_seconds': round(end_usage['child_cpu_seconds'] -
+                                       start_usage['child_cpu_seconds'], 3),
+            'peak_rss_mb': round(end_usage['peak_rss_mb'], 1),
+            'child_peak_rss_mb': round(end_usage['child_peak_rss_mb'], 1),
+            'counts': counts}
+
+
+def get_profile_filename(out_dir):
+    return os.path.join(out_dir, 'unicycler_profile.json')
+
+
+# This is the one and only instance of the StageProfiler class. It doesn't save anything until
+# Unicycler replaces it with one that has an output filename.
+profiler = StageProfiler()
+
+
+def stage(name):
+    return profiler.stage(name)
@@ -0,0 +1,98 @@
+"""
+Copyright 2017 Ryan Wick (rrwick@gmail.com)
+https://github.com/rrwick/Unicycler
+
+This module caches the results of searching completed replicons for start genes, so a replicon
+which has been searched before (e.g. when reassembling the same isolate) doesn't need BLAST. The
+results are saved in the same cache directory as the random alignment calibrations.
+
+This file is part of Unicycler. Unicycler is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by the Free Software Foundation,
+either version 3 of the License, or (at your option) any later version. Unicycler is distributed in
+the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more
+details. You should have received a copy of the GNU General Public License along with Unicycler. If
+not, see <http://www.gnu.org/licenses/>.
+"""
+
+import hashlib
+import shutil
+from .blast_func import find_start_genes, BlastHit, CannotFindStart
+from .checkpoint import get_file_fingerprint
+from .random_alignment_cache import get_cache_filename, load_cached_results, save_cached_results
+from . import log
+
+CACHE_FILENAME = 'start_genes.json'
+MAX_CACHED_RESULTS = 20000
+
+
+def cached_find_start_genes(sequences, start_genes_fasta, identity_threshold, coverage_threshold,
+                            blast_dir, makeblastdb_path, tblastn_path, threads):
+    """
+    A cached version of find_start_genes. Results are keyed by a hash of the replicon sequence and
+    of everything else which can change the search: the start gene sequences, the thresholds and
+    the tblastn executable. Only replicons without a cached result are searched with BLAST.
+    """
+    search_key = get_search_key(start_genes_fasta, identity_threshold, coverage_threshold,
+                                tblastn_path)
+    cache_filename = get_cache_filename(CACHE_FILENAME)
+    cached_results = load_cached_results(cache_filename) if cache_filename else {}
+
+    keys = [search_key + ',' + hashlib.sha256(x.encode()).hexdigest() for x in sequences]
+    best_hits = [None] * len(sequences)
+    to_search = []
+    for i, key in enumerate(keys):
+        if key in cached_results:
+            best_hits[i] = list_to_blast_hit(cached_results[key])
+        else:
+            to_search.append(i)
+    if len(to_search) < len(sequences):
+        log.log('Using cached start gene search results for ' +
+                str(len(sequences) - len(to_search)) + ' of ' + str(len(sequences)) +
+                ' replicons', 2)
+    if not to_search:
+        return best_hits
+
+    # If the search fails, the replicons with cached results can still be used, but nothing is
+    # saved to the cache: the failure may not happen next time.
+    try:
+        new_hits = find_start_genes([sequences[i] for i in to_search], start_genes_fasta,
+                                    identity_threshold, coverage_threshold, blast_dir,
+                                    makeblastdb_path, tblastn_path, threads)
+    except CannotFindStart:
+        if len(to_search) == len(sequences):
+            raise
+        return best_hits
+    new_results = {}
+    for i, hit in zip(to_search, new_hits):
+        best_hits[i] = hit
+        new_results[keys[i]] = blast_hit_to_list(hit)
+    if cache_filename:
+        save_cached_results(cache_filename, new_results, MAX_CACHED_RESULTS)
+    return best_hits
+
+
+def get_search_key(start_genes_fasta, identity_threshold, coverage_threshold, tblastn_path):
+    with open(start_genes_fasta, 'rb') as start_genes:
+        start_genes_hash = hashlib.sha256(start_genes.read()).hexdigest()
+    tblastn_fingerprint = get_file_fingerprint(shutil.which(tblastn_path) or tblastn_path)
+    return ','.join([start_genes_hash, str(identity_threshold), str(coverage_threshold),
+                     str(tblastn_fingerprint)])
+
+
+def blast_hit_to_list(hit):
+    """
+    Returns the parts of a BLAST hit which are used for rotation, in a form which can be saved as
+    JSON (None if there isn't a hit).
+    """
+    if hit is None:
+        return None
+    return [hit.qseqid, hit.start_pos, hit.flip, hit.pident, hit.query_cov, hit.bitscore]
+
+
+def list_to_blast_hit(values):
+    if values is None:
+        return None
+    hit = BlastHit('', 0)
+    hit.qseqid, hit.start_pos, hit.flip, hit.pident, hit.query_cov, hit.bitscore = values
+    return hit
@@ -15,7 +15,6 @@ not, see <http://www.gnu.org/licenses/>.
 """
 
 import sys
-import re
 from collections import deque, defaultdict
 from .misc import reverse_complement, add_line_breaks_to_sequence, get_right_arrow, bold, \
     load_fasta, load_fasta_with_full_header, get_first_character_of_file
@@ -24,7 +23,7 @@ from . import settings
 from . import log
 
 try:
-    from .cpp_wrappers import semi_global_alignment_exhaustive
+    from .cpp_wrappers import semi_global_alignment_exhaustive_result
 except AttributeError as e:
     sys.exit('Error when importing C++ library: ' + str(e) + '\n'
              'Have you successfully built the library file using make?')
@@ -448,31 +447,22 @@ class StringGraph(object):
                 unpolished_seq_end = segment.forward_sequence[-gap:]
                 polished_seq_start = polished_seq[:gap]
                 polished_seq_end = polished_seq[-gap:]
-                start_alignment = semi_global_alignment_exhaustive(unpolished_seq_start,
-                                                                   polished_seq_start,
-                                                                   scoring_scheme)
-                end_alignment = semi_global_alignment_exhaustive(unpolished_seq_end,
-                                                                 polished_seq_end, scoring_scheme)
+                start_alignment = semi_global_alignment_exhaustive_result(unpolished_seq_start,
+                                                                          polished_seq_start,
+                                                                          scoring_scheme)
+                end_alignment = semi_global_alignment_exhaustive_result(unpolished_seq_end,
+                                                                        polished_seq_end,
+                                                                        scoring_scheme)
 
                 missing_start_seq = ''
-                try:
-                    cigar_parts = re.findall(r'\d+\w', start_alignment.split(',')[9])
-                    first_cigar = cigar_parts[0]
-                    if first_cigar[-1] == 'I':
-                        missing_start_count = int(first_cigar[:-1])
-                        missing_start_seq = unpolished_seq_start[:missing_start_count]
-                except (ValueError, IndexError):
-                    pass
+                if start_alignment is not None and start_alignment.cigar_ops[:1] == 'I':
+                    missing_start_count = start_alignment.cigar_lengths[0]
+                    missing_start_seq = unpolished_seq_start[:missing_start_count]
 
                 missing_end_seq = ''
-                try:
-                    cigar_parts = re.findall(r'\d+\w', end_alignment.split(',')[9])
-                    last_cigar = cigar_parts[-1]
-                    if last_cigar[-1] == 'I':
-                        missing_end_count = int(last_cigar[:-1])
-                        missing_end_seq = unpolished_seq_end[-missing_end_count:]
-                except (ValueError, IndexError):
-                    pass
+                if end_alignment is not None and end_alignment.cigar_ops[-1:] == 'I':
+                    missing_end_count = end_alignment.cigar_lengths[-1]
+                    missing_end_seq = unpolished_seq_end[-missing_end_count:]
 
                 if missing_start_seq or missing_end_seq:
                     polished_seq = missing_start_seq + polished_seq + missing_end_seq
@@ -17,15 +17,18 @@ not, see <http://www.gnu.org/licenses/>.
 
 import argparse
 import os
+import re
 import sys
 import shutil
 import random
 import itertools
 import multiprocessing
 from .assembly_graph import AssemblyGraph
+from .assembly_graph_segment import Segment
 from .assembly_graph_copy_depth import determine_copy_depth
 from .bridge_long_read_simple import create_simple_long_read_bridges
 from .miniasm_assembly import make_miniasm_string_graph
+from .minimap_alignment import clear_minimap_indices
 from .bridge_miniasm import create_miniasm_bridges
 from .bridge_long_read import create_long_read_bridges
 from .bridge_spades_contig import create_spades_contig_bridges
@@ -37,18 +40,35 @@ from .misc import int_to_str, float_to_str, quit_with_error, get_percentile, bol
     samtools_path_and_version, java_path_and_version, pilon_path_and_version, \
     racon_path_and_version, bcftools_path_and_version, gfa_path, red
 from .spades_func import get_best_spades_graph
-from .blast_func import find_start_gene, CannotFindStart
+from .blast_func import CannotFindStart
 from .unicycler_align import add_aligning_arguments, fix_up_arguments, AlignmentScoringScheme, \
-    semi_global_align_long_reads, load_references, load_long_reads, load_sam_alignments, \
+    semi_global_align_long_reads, load_long_reads, load_sam_alignments, \
     print_alignment_summary_table
-from .read_ref import get_read_nickname_dict
+from .read_ref import get_read_nickname_dict, Read, Reference
 from .pilon_func import polish_with_pilon_multiple_rounds, CannotPolish
 from .vcf_func import make_vcf
+from .checkpoint import StageManifest
+from .start_gene_cache import cached_find_start_genes
 from . import log
 from . import settings
+from . import stage_profiler
 from .version import __version__
 
 
+# These are the options which can change the results of each checkpointed pipeline stage. If any
+# of them change, the stage (and all later stages) will be redone when resuming.
+STAGE_ARGUMENTS = {
+    'short_read_assembly': ['mode', 'linear_seqs', 'min_anchor_seg_len', 'pack_sequences',
+                            'spades_path', 'no_correct', 'min_kmer_frac', 'max_kmer_frac', 'kmers',
+                            'kmer_count', 'depth_filter', 'largest_component'],
+    'long_read_assembly': ['no_miniasm', 'racon_path', 'scores'],
+    'long_read_bridging': ['no_miniasm', 'no_long_read_alignment', 'min_bridge_qual', 'scores',
+                           'low_score', 'linear_seqs'],
+    'bridge_application': ['min_bridge_qual', 'min_component_size', 'min_dead_end_size'],
+    'pilon_polish': ['bowtie2_path', 'bowtie2_build_path', 'samtools_path', 'pilon_path',
+                     'java_path', 'min_polish_size', 'pilon_incremental']}
+
+
 def main():
     """
     Script execution starts here.
@@ -58,7 +78,12 @@ def main():
 
     full_command = ' '.join(('"' + x + '"' if ' ' in x else x) for x in sys.argv)
     args = get_arguments()
+    if args.pack_sequences:
+        Segment.pack_sequences = True
+        Read.pack_sequences = True
     out_dir_message = make_output_directory(args.out, args.verbosity)
+    stage_profiler.profiler = \
+        stage_profiler.StageProfiler(stage_profiler.get_profile_filename(args.out), full_command)
     short_reads_available = bool(args.short1) or bool(args.unpaired)
     long_reads_available = bool(args.long)
 
@@ -70,8 +95,29 @@ def main():
     counter = itertools.count(start=1)
     bridges = []
 
+    # Each completed stage is checkpointed in the output directory, so if Unicycler is rerun (e.g.
+    # after being killed), it can skip any stage whose inputs and options haven't changed. The
+    # stage keys are made in pipeline order, as each one depends on the key before it.
+    manifest = StageManifest(args.out)
+    short_read_key = get_stage_key(manifest, 'short_read_assembly', args,
+                                   [args.short1, args.short2, args.unpaired])
+    long_read_assembly_key = get_stage_key(manifest, 'long_read_assembly', args,
+                                           [args.long, args.existing_long_read_assembly])
+    long_read_bridging_key = get_stage_key(manifest, 'long_read_bridging', args,
+                                           [args.long, args.contamination])
+    bridge_application_key = get_stage_key(manifest, 'bridge_application', args, [])
+    pilon_polish_key = get_stage_key(manifest, 'pilon_polish', args,
+                                     [args.short1, args.short2, args.unpaired])
+
     # If we have short reads, do all the SPAdes stuff.
+    short_read_state = None
     if short_reads_available:
+        short_read_state, counter = load_checkpoint(manifest, 'short_read_assembly',
+                                                    short_read_key, counter)
+    if short_read_state is not None:
+        graph, anchor_segments, bridges = short_read_state
+
+    elif short_reads_available:
 
         # Produce a SPAdes assembly graph with a k-mer that balances contig length and connectivity.
         best_spades_graph = gfa_path(args.out, next(counter), 'best_spades_graph')
@@ -80,24 +126,33 @@ def main():
                     'SPAdes:\n  ' + best_spades_graph)
             graph = AssemblyGraph(best_spades_graph, None)
         else:
-            graph = get_best_spades_graph(args.short1, args.short2, args.unpaired, args.out,
-                                          args.depth_filter, args.verbosity,
-                                          args.spades_path, args.threads, args.keep,
-                                          args.kmer_count, args.min_kmer_frac, args.max_kmer_frac,
-                                          args.kmers, args.no_correct, args.linear_seqs,
-                                          args.spades_tmp_dir, args.largest_component)
-        determine_copy_depth(graph)
+            with stage_profiler.stage('spades') as counts:
+                graph = get_best_spades_graph(args.short1, args.short2, args.unpaired, args.out,
+                                              args.depth_filter, args.verbosity,
+                                              args.spades_path, args.threads, args.keep,
+                                              args.kmer_count, args.min_kmer_frac,
+                                              args.max_kmer_frac, args.kmers, args.no_correct,
+                                              args.linear_seqs, args.spades_tmp_dir,
+                                              args.largest_component)
+                counts['segments'] = len(graph.segments)
+        with stage_profiler.stage('copy_depth') as counts:
+            determine_copy_depth(graph)
+            counts['segments_with_copy_depth'] = len(graph.copy_depths)
         if args.keep > 0 and not os.path.isfile(best_spades_graph):
             graph.save_to_gfa(best_spades_graph, save_copy_depth_info=True, newline=True,
                               include_insert_size=True)
 
-        clean_up_spades_graph(graph)
-        if args.keep > 0:
-            overlap_removed_graph_filename = gfa_path(args.out, next(counter), 'overlaps_removed')
-            graph.save_to_gfa(overlap_removed_graph_filename, save_copy_depth_info=True,
-                              newline=True, include_insert_size=True)
+        with stage_profiler.stage('graph_cleaning') as counts:
+            clean_up_spades_graph(graph)
+            if args.keep > 0:
+                overlap_removed_graph_filename = gfa_path(args.out, next(counter),
+                                                          'overlaps_removed')
+                graph.save_to_gfa(overlap_removed_graph_filename, save_copy_depth_info=True,
+                                  newline=True, include_insert_size=True)
 
-        anchor_segments = get_anchor_segments(graph, args.min_anchor_seg_len)
+            anchor_segments = get_anchor_segments(graph, args.min_anchor_seg_len)
+            counts['segments'] = len(graph.segments)
+            counts['anchor_segments'] = len(anchor_segments)
 
         # TO DO: SHORT READ ALIGNMENT TO GRAPH
         # * This would be very useful for a number of reasons:
@@ -112,13 +167,17 @@ def main():
         # Make an initial set of bridges using the SPAdes contig paths. This step is skipped when
         # using conservative bridging mode (in that case we don't trust SPAdes contig paths at all).
         if args.mode != 0:
-            bridges += create_spades_contig_bridges(graph, anchor_segments)
-            bridges += create_loop_unrolling_bridges(graph, anchor_segments)
-            if not bridges:
-                log.log('none found', 1)
+            with stage_profiler.stage('short_read_bridging') as counts:
+                bridges += create_spades_contig_bridges(graph, anchor_segments)
+                bridges += create_loop_unrolling_bridges(graph, anchor_segments)
+                if not bridges:
+                    log.log('none found', 1)
+                counts['bridges'] = len(bridges)
 
         # Now that we've made short read bridges, we no longer need the paths in the graph.
         graph.paths = {}
+        counter = save_checkpoint(manifest, 'short_read_assembly', short_read_key,
+                                  (graph, anchor_segments, bridges), counter)
 
     else:  # short reads not available
         graph = None
@@ -136,84 +195,125 @@ def main():
     else:
         scoring_scheme = AlignmentScoringScheme(args.scores)
 
-    if long_reads_available:
-        read_dict, read_names, long_read_filename = load_long_reads(args.long, output_dir=args.out)
-        read_nicknames = get_read_nickname_dict(read_names)
+    # If long-read bridging was already done, then neither the long reads nor the miniasm assembly
+    # are needed.
+    long_read_bridging_state = None
+    if short_reads_available and long_reads_available:
+        long_read_bridging_state, counter = load_checkpoint(manifest, 'long_read_bridging',
+                                                            long_read_bridging_key, counter)
+
+    if long_reads_available and long_read_bridging_state is None:
+        read_index_dir = args.out if args.index_long_reads else None
+        with stage_profiler.stage('long_read_loading') as counts:
+            read_dict, read_names, long_read_filename = \
+                load_long_reads(args.long, output_dir=args.out, index_dir=read_index_dir)
+            read_nicknames = get_read_nickname_dict(read_names)
+            counts['reads'] = len(read_names)
     else:
         read_dict, read_names, long_read_filename = {}, [], ''
         read_nicknames = {}
 
-    if long_reads_available and not args.no_miniasm:
-        string_graph = make_miniasm_string_graph(graph, read_dict, long_read_filename,
-                                                 scoring_scheme, read_nicknames, counter, args,
-                                                 anchor_segments, args.existing_long_read_assembly)
-    else:
-        string_graph = None
+    string_graph = None
+    if long_reads_available and not args.no_miniasm and long_read_bridging_state is None:
+        long_read_assembly_state, counter = load_checkpoint(manifest, 'long_read_assembly',
+                                                            long_read_assembly_key, counter)
+        if long_read_assembly_state is not None:
+            graph, anchor_segments, string_graph = long_read_assembly_state
+        else:
+            with stage_profiler.stage('miniasm_racon') as counts:
+                string_graph = make_miniasm_string_graph(graph, read_dict, long_read_filename,
+                                                         scoring_scheme, read_nicknames, counter,
+                                                         args, anchor_segments,
+                                                         args.existing_long_read_assembly)
+                counts['reads'] = len(read_dict)
+                if string_graph is not None:
+                    counts['string_graph_segments'] = len(string_graph.segments)
+            if string_graph is not None:
+                counter = save_checkpoint(manifest, 'long_read_assembly', long_read_assembly_key,
+                                          (graph, anchor_segments, string_graph), counter)
 
     # If there aren't short reads and the miniasm assembly failed, then there's nothing we can do!
     if not short_reads_available and string_graph is None:
         quit_with_error('miniasm assembly failed')
 
-    if short_reads_available and long_reads_available:
+    if long_read_bridging_state is not None:
+        graph, anchor_segments, bridges = long_read_bridging_state
+
+    elif short_reads_available and long_reads_available:
         if string_graph is not None and not args.no_miniasm:
-            bridges += create_miniasm_bridges(graph, string_graph, anchor_segments,
-                                              scoring_scheme, args.verbosity, args.min_bridge_qual)
+            with stage_profiler.stage('miniasm_bridging') as counts:
+                miniasm_bridges = create_miniasm_bridges(graph, string_graph, anchor_segments,
+                                                         scoring_scheme, args.verbosity,
+                                                         args.min_bridge_qual)
+                counts['bridges'] = len(miniasm_bridges)
+            bridges += miniasm_bridges
+
+        with stage_profiler.stage('simple_bridging') as counts:
+            simple_bridges = create_simple_long_read_bridges(graph, args.threads, read_dict,
+                                                             long_read_filename, scoring_scheme,
+                                                             anchor_segments)
+            counts['reads'] = len(read_dict)
+            counts['bridges'] = len(simple_bridges)
+        bridges += simple_bridges
 
-        bridges += create_simple_long_read_bridges(graph, args.out, args.keep, args.threads,
-                                                   read_dict, long_read_filename, scoring_scheme,
-                                                   anchor_segments)
         if not args.no_long_read_alignment:
-            read_names, min_scaled_score, min_alignment_length = \
-                align_long_reads_to_assembly_graph(graph, anchor_segments, args, full_command,
-                                                   read_dict, read_names, long_read_filename)
+            with stage_profiler.stage('alignment') as counts:
+                read_names, min_scaled_score, min_alignment_length = \
+                    align_long_reads_to_assembly_graph(graph, anchor_segments, args,
+                                                       full_command, read_dict, read_names,
+                                                       long_read_filename)
+                counts['reads'] = len(read_names)
+                counts['aligned_reads'] = sum(1 for x in read_names if read_dict[x].alignments)
 
             expected_linear_seqs = args.linear_seqs > 0
-            bridges += create_long_read_bridges(graph, read_dict, read_names, anchor_segments,
-                                                args.verbosity, min_scaled_score, args.threads,
-                                                scoring_scheme, min_alignment_length,
-                                                expected_linear_seqs, args.min_bridge_qual)
-
+            with stage_profiler.stage('long_read_bridging') as counts:
+                long_read_bridges = create_long_read_bridges(graph, read_dict, read_names,
+                                                             anchor_segments, args.verbosity,
+                                                             min_scaled_score, args.threads,
+                                                             scoring_scheme, min_alignment_length,
+                                                             expected_linear_seqs,
+                                                             args.min_bridge_qual)
+                counts['bridges'] = len(long_read_bridges)
+                counts['candidate_paths'] = sum(len(x.all_paths) for x in long_read_bridges)
+            bridges += long_read_bridges
+        counter = save_checkpoint(manifest, 'long_read_bridging', long_read_bridging_key,
+                                  (graph, anchor_segments, bridges), counter)
+    clear_minimap_indices()
+
+    bridge_application_state = None
     if short_reads_available:
-        seg_nums_used_in_bridges = graph.apply_bridges(bridges, args.verbosity,
-                                                       args.min_bridge_qual)
-        if args.keep > 0:
-            graph.save_to_gfa(gfa_path(args.out, next(counter), 'bridges_applied'),
-                              save_seg_type_info=True, save_copy_depth_info=True, newline=True)
-
-        graph.clean_up_after_bridging_1(anchor_segments, seg_nums_used_in_bridges)
-        graph.clean_up_after_bridging_2(seg_nums_used_in_bridges, args.min_component_size,
-                                        args.min_dead_end_size, graph, anchor_segments)
-        if args.keep > 2:
-            log.log('', 2)
-            graph.save_to_gfa(gfa_path(args.out, next(counter), 'cleaned'),
-                              save_seg_type_info=True, save_copy_depth_info=True)
-        graph.merge_all_possible(anchor_segments, args.mode)
-        if args.keep > 2:
-            graph.save_to_gfa(gfa_path(args.out, next(counter), 'merged'))
-
-        # Perform some final cleaning on the graph.
-        log.log_section_header('Bridged assembly graph')
-        log.log_explanation('The assembly is now mostly finished and no more structural changes '
-                            'will be made. Ideally the assembly graph should now have one contig '
-                            'per replicon and no erroneous contigs (i.e a complete assembly). '
-                            'If there are more contigs, then the assembly is not complete.',
-                            verbosity=1)
-        graph.final_clean()
-        if args.keep > 0:
-            graph.save_to_gfa(gfa_path(args.out, next(counter), 'final_clean'))
-        log.log('')
-        graph.print_component_table()
+        bridge_application_state, counter = load_checkpoint(manifest, 'bridge_application',
+                                                            bridge_application_key, counter)
+    if bridge_application_state is not None:
+        graph = bridge_application_state
+
+    elif short_reads_available:
+        with stage_profiler.stage('bridge_application') as counts:
+            apply_bridges_and_clean(graph, bridges, anchor_segments, args, counter)
+            counts['bridges'] = len(bridges)
+            counts['segments'] = len(graph.segments)
+        counter = save_checkpoint(manifest, 'bridge_application', bridge_application_key, graph,
+                                  counter)
 
     else:  # only long reads available
         graph = string_graph
 
     insert_size_1st, insert_size_99th = None, None
     if short_reads_available and not args.no_pilon:
-        insert_size_1st, insert_size_99th = \
-            final_polish(graph, args, counter, long_reads_available)
+        pilon_polish_state, counter = load_checkpoint(manifest, 'pilon_polish', pilon_polish_key,
+                                                      counter)
+        if pilon_polish_state is not None:
+            graph, insert_size_1st, insert_size_99th = pilon_polish_state
+        else:
+            with stage_profiler.stage('pilon'):
+                insert_size_1st, insert_size_99th = \
+                    final_polish(graph, args, counter, long_reads_available)
+            counter = save_checkpoint(manifest, 'pilon_polish', pilon_polish_key,
+                                      (graph, insert_size_1st, insert_size_99th), counter)
 
     if not args.no_rotate:
-        rotate_completed_replicons(graph, args, counter)
+        with stage_profiler.stage('rotation'):
+            rotate_completed_replicons(graph, args, counter)
 
     # Save the final state as both a GFA and FASTA file.
     log.log_section_header('Assembly complete')
@@ -226,6 +326,16 @@ def main():
         final_assembly_vcf = os.path.join(args.out, 'assembly.vcf')
         make_vcf(final_assembly_vcf, args, final_assembly_fasta, insert_size_1st, insert_size_99th)
 
+    if args.index_long_reads and args.keep < 2:
+        for read_store_file in ['long_reads.store', 'long_reads.index']:
+            read_store_path = os.path.join(args.out, read_store_file)
+            if os.path.isfile(read_store_path):
+                os.remove(read_store_path)
+
+    # The run finished, so the checkpoints are only needed if the user wants intermediate files.
+    if args.keep < 2:
+        manifest.delete()
+
     log.log('')
 
 
@@ -310,6 +420,16 @@ def get_arguments():
     other_group.add_argument('--linear_seqs', type=int, required=False, default=0,
                              help='The expected number of linear (i.e. non-circular) sequences in '
                                   'the underlying sequence')
+    other_group.add_argument('--index_long_reads', action='store_true',
+                             help='Keep long read sequences in an indexed file in the output '
+                                  'directory instead of in memory (uses less RAM for large read '
+                                  'sets, default: keep long reads in memory)'
+                                  if show_all_args else argparse.SUPPRESS)
+    other_group.add_argument('--pack_sequences', action='store_true',
+                             help='Store graph and long read sequences in a compact 2-bit form '
+                                  '(uses less RAM but is slower, default: store sequences as '
+                                  'text)'
+                                  if show_all_args else argparse.SUPPRESS)
     other_group.add_argument('--min_anchor_seg_len', type=int, required=False,
                              help='If set, Unicycler will not use segments shorter than this as '
                                   'scaffolding anchors (default: automatic threshold)'
@@ -424,6 +544,10 @@ def get_arguments():
     polish_group.add_argument('--samtools_path', type=str, default='samtools',
                               help='Path to the samtools executable'
                                    if show_all_args else argparse.SUPPRESS)
+    polish_group.add_argument('--samtools_sort_mem', type=str, default='768M',
+                              help='Memory per thread for samtools sort when sorting the read '
+                                   'alignments for Pilon (e.g. 768M or 2G)'
+                                   if show_all_args else argparse.SUPPRESS)
     polish_group.add_argument('--pilon_path', type=str, default='pilon',
                               help='Path to a Pilon executable or the Pilon Java archive file'
                                    if show_all_args else argparse.SUPPRESS)
@@ -434,6 +558,11 @@ def get_arguments():
                               help='Contigs shorter than this value (bp) will not be polished '
                                    'using Pilon'
                                    if show_all_args else argparse.SUPPRESS)
+    polish_group.add_argument('--pilon_incremental', action='store_true',
+                              help='After the first round of Pilon polishing, only polish the '
+                                   'regions around the previous round\'s changes (default: every '
+                                   'round polishes the whole assembly)'
+                                   if show_all_args else argparse.SUPPRESS)
 
     # VCF options
     polish_group = parser.add_argument_group('VCF',
@@ -504,6 +633,10 @@ def get_arguments():
     if args.kmer_count < 1:
         quit_with_error('--kmer_count must be at least 1')
 
+    if re.match(r'^[1-9]\d*[KMG]?$', args.samtools_sort_mem) is None:
+        quit_with_error('--samtools_sort_mem must be a whole number of bytes, optionally with a '
+                        'K, M or G suffix (example: --samtools_sort_mem 2G)')
+
     if args.kmers is not None:
         args.kmers = args.kmers.split(',')
         try:
@@ -933,24 +1066,29 @@ def rotate_completed_replicons(graph, args, counter):
             os.makedirs(blast_dir)
         completed_replicons = sorted(completed_replicons, reverse=True,
                                      key=lambda x: graph.segments[x].get_length())
-        rotation_count = 0
-        for completed_replicon in completed_replicons:
-            segment = graph.segments[completed_replicon]
-            sequence = segment.forward_sequence
+        segments = [graph.segments[x] for x in completed_replicons]
+
+        # All replicons are searched at once, with one BLAST database and a multi-threaded tblastn.
+        # Replicons which have been searched before use the cached result instead.
+        try:
+            blast_hits = cached_find_start_genes([x.forward_sequence for x in segments],
+                                                 args.start_genes, args.start_gene_id,
+                                                 args.start_gene_cov, blast_dir,
+                                                 args.makeblastdb_path, args.tblastn_path,
+                                                 args.threads)
+        except CannotFindStart:
+            blast_hits = [None] * len(segments)
 
+        rotation_count = 0
+        for segment, blast_hit in zip(segments, blast_hits):
             try:
                 seg_name = str(segment.number)
             except AttributeError:
                 seg_name = segment.full_name
 
-            log.log('Segment ' + seg_name + ':', 2)
-            rotation_result_row = [seg_name, int_to_str(len(sequence)),
+            rotation_result_row = [seg_name, int_to_str(segment.get_length()),
                                    float_to_str(segment.depth, 2) + 'x']
-            try:
-                blast_hit = find_start_gene(sequence, args.start_genes, args.start_gene_id,
-                                            args.start_gene_cov, blast_dir, args.makeblastdb_path,
-                                            args.tblastn_path)
-            except CannotFindStart:
+            if blast_hit is None:
                 rotation_result_row += ['none found', '', '', '', '']
             else:
                 rotation_result_row += [blast_hit.qseqid, int_to_str(blast_hit.start_pos),
@@ -992,16 +1130,17 @@ def final_polish(graph, args, counter, do_pilon_reassembly):
 def align_long_reads_to_assembly_graph(graph, anchor_segments, args, full_command,
                                        read_dict, read_names, long_read_filename):
     alignment_dir = os.path.join(args.out, 'read_alignment')
-    graph_fasta = os.path.join(alignment_dir, 'all_segments.fasta')
     anchor_segment_names = set(str(x.number) for x in anchor_segments)
     alignments_sam = os.path.join(alignment_dir, 'long_read_alignments.sam')
+    alignment_cache_filename = os.path.join(alignment_dir, 'long_read_alignments.alncache')
     scoring_scheme = AlignmentScoringScheme(args.scores)
     min_alignment_length = settings.MIN_LONG_READ_ALIGNMENT_LENGTH
 
     if not os.path.exists(alignment_dir):
         os.makedirs(alignment_dir)
-    graph.save_to_fasta(graph_fasta, silent=True)
-    references = load_references(graph_fasta, section_header=None, show_progress=False)
+    references = [Reference(str(x.number), x.forward_sequence)
+                  for x in sorted(graph.segments.values(), key=lambda x: x.number)
+                  if x.get_length() > 0]
     reference_dict = {x.name: x for x in references}
 
     # Load existing alignments if available.
@@ -1022,12 +1161,13 @@ def align_long_reads_to_assembly_graph(graph, anchor_segments, args, full_comman
 
         allowed_overlap = int(round(graph.overlap * settings.ALLOWED_ALIGNMENT_OVERLAP))
         low_score_threshold = [args.low_score]
-        semi_global_align_long_reads(references, graph_fasta, read_dict, read_names,
-                                     long_read_filename, args.threads, scoring_scheme,
-                                     low_score_threshold, False, min_alignment_length,
-                                     alignments_in_progress, full_command, allowed_overlap,
-                                     0, args.contamination, args.verbosity,
-                                     single_copy_segment_names=anchor_segment_names)
+        semi_global_align_long_reads(references, read_dict, read_names, long_read_filename,
+                                     args.threads, scoring_scheme, low_score_threshold, False,
+                                     min_alignment_length, alignments_in_progress, full_command,
+                                     allowed_overlap, 0, args.contamination, args.verbosity,
+                                     single_copy_segment_names=anchor_segment_names,
+                                     alignment_cache_filename=alignment_cache_filename,
+                                     use_processes=args.alignment_processes)
         shutil.move(alignments_in_progress, alignments_sam)
 
         if args.keep < 2:
@@ -1035,8 +1175,6 @@ def align_long_reads_to_assembly_graph(graph, anchor_segments, args, full_comman
             log.log('\nDeleting ' + alignment_dir + '/')
         if args.keep < 3 and os.path.isfile(alignments_sam):
             os.remove(alignments_sam)
-        if args.keep < 3 and os.path.isfile(graph_fasta):
-            os.remove(graph_fasta)
 
     # Discard any reads that mostly align to known contamination.
     if args.contamination:
@@ -1068,6 +1206,72 @@ def align_long_reads_to_assembly_graph(graph, anchor_segments, args, full_comman
     return read_names, min_scaled_score, min_alignment_length
 
 
+def apply_bridges_and_clean(graph, bridges, anchor_segments, args, counter):
+    """
+    Applies the bridges to the graph and then cleans it up, giving the finished assembly graph.
+    """
+    seg_nums_used_in_bridges = graph.apply_bridges(bridges, args.verbosity, args.min_bridge_qual)
+    if args.keep > 0:
+        graph.save_to_gfa(gfa_path(args.out, next(counter), 'bridges_applied'),
+                          save_seg_type_info=True, save_copy_depth_info=True, newline=True)
+
+    graph.clean_up_after_bridging_1(anchor_segments, seg_nums_used_in_bridges)
+    graph.clean_up_after_bridging_2(seg_nums_used_in_bridges, args.min_component_size,
+                                    args.min_dead_end_size, graph, anchor_segments)
+    if args.keep > 2:
+        log.log('', 2)
+        graph.save_to_gfa(gfa_path(args.out, next(counter), 'cleaned'),
+                          save_seg_type_info=True, save_copy_depth_info=True)
+    graph.merge_all_possible(anchor_segments, args.mode)
+    if args.keep > 2:
+        graph.save_to_gfa(gfa_path(args.out, next(counter), 'merged'))
+
+    # Perform some final cleaning on the graph.
+    log.log_section_header('Bridged assembly graph')
+    log.log_explanation('The assembly is now mostly finished and no more structural changes '
+                        'will be made. Ideally the assembly graph should now have one contig '
+                        'per replicon and no erroneous contigs (i.e a complete assembly). '
+                        'If there are more contigs, then the assembly is not complete.',
+                        verbosity=1)
+    graph.final_clean()
+    if args.keep > 0:
+        graph.save_to_gfa(gfa_path(args.out, next(counter), 'final_clean'))
+    log.log('')
+    graph.print_component_table()
+
+
+def get_stage_key(manifest, stage_name, args, input_files):
+    """
+    Returns the checkpoint key for a pipeline stage, using only the options which can affect that
+    stage's results.
+    """
+    parameters = {x: getattr(args, x) for x in STAGE_ARGUMENTS[stage_name]}
+    return manifest.get_stage_key(stage_name, input_files, parameters)
+
+
+def load_checkpoint(manifest, stage_name, stage_key, counter):
+    """
+    Returns a stage's saved state (or None if the stage must be run) and the file counter to use
+    from here on. The counter is restored from the checkpoint so file numbering matches an
+    uninterrupted run.
+    """
+    checkpoint = manifest.load_stage(stage_name, stage_key)
+    if checkpoint is None:
+        return None, counter
+    state, file_num = checkpoint
+    return state, itertools.count(start=file_num)
+
+
+def save_checkpoint(manifest, stage_name, stage_key, state, counter):
+    """
+    Saves a completed stage's state along with the next file number. Returns the file counter to
+    use from here on.
+    """
+    file_num = next(counter)
+    manifest.save_stage(stage_name, stage_key, (state, file_num))
+    return itertools.count(start=file_num)
+
+
 def clean_up_spades_graph(graph):
     log.log_section_header('Cleaning graph')
     log.log_explanation('Unicycler now performs various cleaning procedures on the graph to '
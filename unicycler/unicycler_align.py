@@ -42,6 +42,7 @@ import time
 import random
 import shutil
 import math
+import multiprocessing
 from multiprocessing.dummy import Pool as ThreadPool
 import threading
 from .misc import int_to_str, float_to_str, check_file_exists, quit_with_error, \
@@ -49,13 +50,15 @@ from .misc import int_to_str, float_to_str, check_file_exists, quit_with_error,
     get_default_thread_count
 from .read_ref import load_references, load_long_reads
 from .alignment import Alignment, AlignmentScoringScheme
+from .alignment_cache import AlignmentCache, load_alignment_cache, get_alignment_cache_key
 from . import settings
-from .minimap_alignment import load_minimap_alignments
+from .minimap_alignment import load_minimap_alignments, minimap_align_reads_to_references
 from . import log
 
 try:
-    from .cpp_wrappers import semi_global_alignment, new_ref_seqs, add_ref_seq, \
-        delete_ref_seqs, get_random_sequence_alignment_mean_and_std_dev, minimap_align_reads
+    from .cpp_wrappers import semi_global_alignment, semi_global_alignment_batch, new_ref_seqs, \
+        add_ref_seq, delete_ref_seqs
+    from .random_alignment_cache import cached_random_sequence_alignment_mean_and_std_dev
 except AttributeError as e:
     sys.exit('Error when importing C++ library: ' + str(e) + '\n'
              'Have you successfully built the library file using make?')
@@ -64,6 +67,11 @@ except AttributeError as e:
 # Used to ensure that multiple threads writing to the same SAM file don't write at the same time.
 SAM_WRITE_LOCK = threading.Lock()
 
+# When aligning in separate processes, this holds the alignment inputs (reads, references, C++
+# ReferenceSeqs pointer, etc.). It is set just before the process pool is made, so the forked
+# worker processes inherit it instead of it being pickled and sent to them.
+PROCESS_ALIGNMENT_ARGS = None
+
 # VERBOSITY controls how much the script prints to the screen.
 # 0 = nothing is printed
 # 1 = a relatively simple output is printed
@@ -89,10 +97,12 @@ def main():
     read_dict, read_names, read_filename = load_long_reads(args.reads)
     scoring_scheme = AlignmentScoringScheme(args.scores)
 
-    semi_global_align_long_reads(references, args.ref, read_dict, read_names, read_filename,
-                                 args.threads, scoring_scheme, [args.low_score], args.keep_bad,
+    semi_global_align_long_reads(references, read_dict, read_names, read_filename, args.threads,
+                                 scoring_scheme, [args.low_score], args.keep_bad,
                                  args.min_len, args.sam, full_command, args.allowed_overlap,
-                                 args.sensitivity, args.contamination, VERBOSITY)
+                                 args.sensitivity, args.contamination, VERBOSITY,
+                                 alignment_cache_filename=args.alignment_cache,
+                                 use_processes=args.alignment_processes)
     sys.exit(0)
 
 
@@ -131,6 +141,10 @@ def get_arguments():
                              'length')
     parser.add_argument('--allowed_overlap', type=int, required=False, default=100,
                         help='Allow this much overlap between alignments in a single read')
+    parser.add_argument('--alignment_cache', type=str, required=False,
+                        help='Binary file for caching alignments - if it exists and was made with '
+                             'the same reads, references and settings, the alignments are loaded '
+                             'from it instead of being redone (default: do not cache)')
 
     args = parser.parse_args()
 
@@ -159,6 +173,10 @@ def add_aligning_arguments(parser, show_help):
                         help='Score threshold - alignments below this are considered poor '
                              '(default: set threshold automatically)'
                              if show_help else argparse.SUPPRESS)
+    parser.add_argument('--alignment_processes', action='store_true',
+                        help='Align reads in separate processes instead of threads (faster on '
+                             'machines with many cores, but uses more memory)'
+                             if show_help else argparse.SUPPRESS)
 
 
 def fix_up_arguments(args):
@@ -180,18 +198,24 @@ def fix_up_arguments(args):
             quit_with_error('Long read contamination file must be FASTA format')
 
 
-def semi_global_align_long_reads(references, ref_fasta, read_dict, read_names, reads_fastq,
-                                 threads, scoring_scheme, low_score_threshold_list, keep_bad,
+def semi_global_align_long_reads(references, read_dict, read_names, reads_fastq, threads,
+                                 scoring_scheme, low_score_threshold_list, keep_bad,
                                  min_align_length, sam_filename, full_command, allowed_overlap,
                                  sensitivity_level, contamination_fasta, verbosity=None,
                                  stdout_header='Aligning reads', display_low_score=True,
-                                 single_copy_segment_names=None):
+                                 single_copy_segment_names=None, alignment_cache_filename=None,
+                                 use_processes=False):
     """
     This function does the primary work of this module: aligning long reads to references in an
     end-gap-free, semi-global manner. It returns a dictionary of Read objects which contain their
     alignments.
     The low score threshold is taken as a list so the function can alter it and the caller can
     get the altered value.
+    If an alignment cache filename is given, the alignments are saved there, and a later call
+    with the same reads, references and settings loads them instead of aligning again.
+    If use_processes is set (and the platform can fork), multi-threaded alignment is done in a
+    process pool instead of a thread pool, so the Python side of each read's alignment isn't
+    limited by the GIL.
     """
     if sensitivity_level is None:
         sensitivity_level = 0
@@ -230,15 +254,43 @@ def semi_global_align_long_reads(references, ref_fasta, read_dict, read_names, r
                     str(std_devs_over_mean) + ' x ' + float_to_str(rand_std_dev, 2) + ') = ' +
                     float_to_str(low_score_threshold, 2))
 
+    # Minimap seeds alignments to the given references, not to any contamination sequences.
+    minimap_references = [(x.name, x.sequence) for x in references]
     using_contamination = contamination_fasta is not None
     if using_contamination:
         references += load_references(contamination_fasta, contamination=True)
 
     reference_dict = {x.name: x for x in references}
 
+    if alignment_cache_filename:
+        cache_key = get_alignment_cache_key([reads_fastq], references, read_names,
+                                            [str(scoring_scheme), low_score_threshold, keep_bad,
+                                             min_align_length, allowed_overlap, sensitivity_level])
+        alignment_cache = load_alignment_cache(alignment_cache_filename, cache_key)
+        if alignment_cache is not None:
+            if verbosity > 0:
+                log.log_section_header(stdout_header)
+                log.log('Loading ' + int_to_str(len(alignment_cache)) + ' alignments from cache: ' +
+                        alignment_cache_filename)
+            for alignment in alignment_cache.get_alignments(read_dict, reference_dict):
+                alignment.read.alignments.append(alignment)
+            if sam_filename:
+                write_sam_header(sam_filename, references, full_command, scoring_scheme)
+                with open(sam_filename, 'a') as sam_file:
+                    for read_name in read_names:
+                        for alignment in read_dict[read_name].alignments:
+                            if not alignment.ref.name.startswith('CONTAMINATION_'):
+                                sam_file.write(alignment.get_sam_line())
+            if verbosity > 0:
+                print_alignment_summary_table(read_dict, VERBOSITY, using_contamination)
+            return read_dict
+    else:
+        cache_key = None
+
     if verbosity > 0:
         log.log_section_header('Aligning reads with minimap', verbosity=2)
-    minimap_alignments_str = minimap_align_reads(ref_fasta, reads_fastq, threads, 0, 'default')
+    minimap_alignments_str = minimap_align_reads_to_references(minimap_references, reads_fastq,
+                                                               threads, 0, 'default')
     minimap_alignments = load_minimap_alignments(minimap_alignments_str)
     if verbosity > 0:
         log.log('', 3)
@@ -247,24 +299,7 @@ def semi_global_align_long_reads(references, ref_fasta, read_dict, read_names, r
 
     # Create the SAM file.
     if sam_filename:
-        with open(sam_filename, 'w') as sam_file:
-            # Header line.
-            sam_file.write('@HD' + '\t')
-            sam_file.write('VN:1.5' + '\t')
-            sam_file.write('SO:unknown' + '\n')
-
-            # Reference lines.
-            for ref in references:
-                sam_file.write('@SQ' + '\t')
-                sam_file.write('SN:' + ref.name + '\t')
-                sam_file.write('LN:' + str(ref.get_length()) + '\n')
-
-            # Program line.
-            sam_file.write('@PG' + '\t')
-            sam_file.write('ID:' + 'unicycler_align')
-            if full_command:
-                sam_file.write('\tCL:' + full_command + '\t')
-            sam_file.write('SC:' + str(scoring_scheme) + '\n')
+        write_sam_header(sam_filename, references, full_command, scoring_scheme)
 
     reads_to_align = [read_dict[x] for x in read_names]
 
@@ -294,30 +329,77 @@ def semi_global_align_long_reads(references, ref_fasta, read_dict, read_names, r
                 fraction = str(completed_count) + '/' + str(num_alignments) + ': '
                 log.log(fraction + output + '\n', 2, end='')
 
-    # If multi-threaded, use a thread pool.
-    else:
-        pool = ThreadPool(threads)
-        arg_list = []
-        for read in reads_to_align:
-            arg_list.append((read, reference_dict, scoring_scheme, ref_seqs_ptr,
-                             low_score_threshold, keep_bad, min_align_length,
-                             sam_filename, allowed_overlap, minimap_alignments[read.name],
-                             sensitivity_level, single_copy_segment_names))
-
-        # If the verbosity is 1, then the order doesn't matter, so use imap_unordered to deliver
-        # the results evenly. If the verbosity is higher, deliver the results in order with imap.
+    # If multi-threaded with processes, the workers are forked so they share the references and
+    # the C++ ReferenceSeqs object. Each batch of reads comes back as an AlignmentCache (much
+    # smaller to send than Alignment objects) and the alignments are rebuilt here.
+    elif use_processes and 'fork' in multiprocessing.get_all_start_methods():
+        global PROCESS_ALIGNMENT_ARGS
+        PROCESS_ALIGNMENT_ARGS = (read_dict, reference_dict, scoring_scheme, ref_seqs_ptr,
+                                  low_score_threshold, keep_bad, min_align_length,
+                                  allowed_overlap, minimap_alignments, sensitivity_level,
+                                  single_copy_segment_names)
+        batch_size = settings.ALIGNMENT_PROCESS_BATCH_SIZE
+        names_to_align = [x.name for x in reads_to_align]
+        batches = [names_to_align[i:i + batch_size]
+                   for i in range(0, len(names_to_align), batch_size)]
+        pool = multiprocessing.get_context('fork').Pool(threads)
         if VERBOSITY > 1:
             imap_function = pool.imap
         else:
             imap_function = pool.imap_unordered
 
-        for output in imap_function(seqan_alignment_one_arg, arg_list):
-            completed_count += 1
-            if VERBOSITY == 1:
-                log.log_progress_line(completed_count, num_alignments)
-            if VERBOSITY > 1:
-                fraction = str(completed_count) + '/' + str(num_alignments) + ': '
-                log.log(fraction + output + '\n', 2, end='')
+        for batch_names, outputs, batch_cache in imap_function(seqan_alignment_process_batch,
+                                                               batches):
+            for alignment in batch_cache.get_alignments(read_dict, reference_dict):
+                alignment.read.alignments.append(alignment)
+            if sam_filename:
+                with open(sam_filename, 'a') as sam_file:
+                    for read_name in batch_names:
+                        for alignment in read_dict[read_name].alignments:
+                            if not alignment.ref.name.startswith('CONTAMINATION_'):
+                                sam_file.write(alignment.get_sam_line())
+            for output in outputs:
+                completed_count += 1
+                if VERBOSITY == 1:
+                    log.log_progress_line(completed_count, num_alignments)
+                if VERBOSITY > 1:
+                    fraction = str(completed_count) + '/' + str(num_alignments) + ': '
+                    log.log(fraction + output + '\n', 2, end='')
+        pool.close()
+        pool.join()
+        PROCESS_ALIGNMENT_ARGS = None
+
+    # If multi-threaded, reads are aligned in batches, each with a single call to the C++ code
+    # which uses its own threads. A helper thread runs the C++ alignment of the next batch while
+    # the results of the current batch are processed here. Only one batch is started ahead so
+    # unprocessed results don't build up in memory.
+    else:
+        batch_size = threads * settings.ALIGNMENT_BATCH_READS_PER_THREAD
+        batches = [(reads_to_align[i:i + batch_size], scoring_scheme, ref_seqs_ptr,
+                    min_align_length, minimap_alignments, sensitivity_level, threads)
+                   for i in range(0, len(reads_to_align), batch_size)]
+        pool = ThreadPool(1)
+        pending = None
+        if batches:
+            pending = pool.apply_async(semi_global_alignment_batch_one_arg, (batches[0],))
+        for i in range(len(batches)):
+            batch_reads, level_results = pending.get()
+            if i + 1 < len(batches):
+                pending = pool.apply_async(semi_global_alignment_batch_one_arg,
+                                           (batches[i + 1],))
+            outputs = finish_alignment_batch(batch_reads, level_results, reference_dict,
+                                             scoring_scheme, low_score_threshold, keep_bad,
+                                             min_align_length, sam_filename, allowed_overlap,
+                                             single_copy_segment_names)
+            for output in outputs:
+                completed_count += 1
+                if VERBOSITY == 1:
+                    log.log_progress_line(completed_count, num_alignments)
+                if VERBOSITY > 1:
+                    fraction = str(completed_count) + '/' + str(num_alignments) + ': '
+                    log.log(fraction + output + '\n', 2, end='')
+        pool.close()
+        pool.join()
 
     # We're done with the C++ ReferenceSeqs object, so delete it now.
     delete_ref_seqs(ref_seqs_ptr)
@@ -325,11 +407,42 @@ def semi_global_align_long_reads(references, ref_fasta, read_dict, read_names, r
     if VERBOSITY == 1:
         log.log_progress_line(completed_count, completed_count, end_newline=True)
 
+    if cache_key is not None:
+        alignment_cache = AlignmentCache()
+        for read in reads_to_align:
+            for alignment in read.alignments:
+                alignment_cache.add_alignment(alignment)
+        alignment_cache.save(alignment_cache_filename, cache_key)
+
     if verbosity > 0:
         print_alignment_summary_table(read_dict, VERBOSITY, using_contamination)
     return read_dict
 
 
+def write_sam_header(sam_filename, references, full_command, scoring_scheme):
+    """
+    Creates a SAM file containing only the header lines.
+    """
+    with open(sam_filename, 'w') as sam_file:
+        # Header line.
+        sam_file.write('@HD' + '\t')
+        sam_file.write('VN:1.5' + '\t')
+        sam_file.write('SO:unknown' + '\n')
+
+        # Reference lines.
+        for ref in references:
+            sam_file.write('@SQ' + '\t')
+            sam_file.write('SN:' + ref.name + '\t')
+            sam_file.write('LN:' + str(ref.get_length()) + '\n')
+
+        # Program line.
+        sam_file.write('@PG' + '\t')
+        sam_file.write('ID:' + 'unicycler_align')
+        if full_command:
+            sam_file.write('\tCL:' + full_command + '\t')
+        sam_file.write('SC:' + str(scoring_scheme) + '\n')
+
+
 def get_percent_contamination(read_dict):
     """
     Returns the number and percentage of reads which mostly align to contamination, both by base
@@ -405,12 +518,26 @@ def print_alignment_summary_table(read_dict, verbosity, using_contamination):
     log.log('Mean alignment identity: ' + float_to_str(mean_identity, 1, max_v) + '%')
 
 
-def load_sam_alignments(sam_filename, read_dict, reference_dict, scoring_scheme):
+def load_sam_alignments(sam_filename, read_dict, reference_dict, scoring_scheme,
+                        alignment_cache_filename=None):
     """
     This function returns a list of Alignment objects from the given SAM file.
+    If an alignment cache filename is given, the parsed alignments are saved there, and later
+    calls for the same SAM file and references load them from the cache instead.
     """
     log.log_section_header('Loading alignments')
 
+    if alignment_cache_filename:
+        cache_key = get_alignment_cache_key([sam_filename], list(reference_dict.values()),
+                                            sorted(read_dict), [str(scoring_scheme)])
+        alignment_cache = load_alignment_cache(alignment_cache_filename, cache_key)
+        if alignment_cache is not None:
+            log.log('Loading ' + int_to_str(len(alignment_cache)) + ' alignments from cache: ' +
+                    alignment_cache_filename + '\n')
+            return list(alignment_cache.get_alignments(read_dict, reference_dict))
+    else:
+        cache_key = None
+
     sam_lines = []
     sam_file = open(sam_filename, 'rt')
     for line in sam_file:
@@ -445,21 +572,94 @@ def load_sam_alignments(sam_filename, read_dict, reference_dict, scoring_scheme)
         log.log_progress_line(len(sam_alignments), len(sam_alignments))
     log.log('')
 
+    if cache_key is not None:
+        alignment_cache = AlignmentCache()
+        for alignment in sam_alignments:
+            alignment_cache.add_alignment(alignment)
+        alignment_cache.save(alignment_cache_filename, cache_key)
+
     return sam_alignments
 
 
-def seqan_alignment_one_arg(all_args):
+def semi_global_alignment_batch_one_arg(all_args):
     """
-    This is just a one-argument version of seqan_alignment to make it easier to use that function
-    in a thread pool.
+    Runs the C++ batch aligner on a batch of reads, once for each sensitivity level up to the
+    given one. Reads too short to align are left out. Returns the batch's reads and a list (one
+    per sensitivity level) of the alignment results and console outputs.
     """
-    read, reference_dict, scoring_scheme, ref_seqs_ptr, low_score_threshold, keep_bad, \
-        min_align_length, sam_filename, allowed_overlap, minimap_alignments, \
-        sensitivity_level, single_copy_segment_names = all_args
-    return seqan_alignment(read, reference_dict, scoring_scheme, ref_seqs_ptr,
-                           low_score_threshold, keep_bad, min_align_length,
-                           sam_filename, allowed_overlap, minimap_alignments, sensitivity_level,
-                           single_copy_segment_names)
+    reads, scoring_scheme, ref_seqs_ptr, min_align_length, minimap_alignments, \
+        sensitivity_level, threads = all_args
+    reads_to_align = [x for x in reads if x.get_length() >= min_align_length]
+    minimap_alignments_strs = [';'.join([x.get_concise_string()
+                                         for x in minimap_alignments[read.name]])
+                               for read in reads_to_align]
+    level_results = []
+    for sensitivity in range(0, sensitivity_level+1):
+        level_results.append(semi_global_alignment_batch([x.name for x in reads_to_align],
+                                                         [x.sequence for x in reads_to_align],
+                                                         VERBOSITY, minimap_alignments_strs,
+                                                         ref_seqs_ptr, scoring_scheme.match,
+                                                         scoring_scheme.mismatch,
+                                                         scoring_scheme.gap_open,
+                                                         scoring_scheme.gap_extend, sensitivity,
+                                                         threads))
+    return reads, level_results
+
+
+def finish_alignment_batch(reads, level_results, reference_dict, scoring_scheme,
+                           low_score_threshold, keep_bad, min_align_length, sam_filename,
+                           allowed_overlap, single_copy_segment_names):
+    """
+    Turns the C++ batch aligner's results into Alignment objects and then filters them (the same
+    as seqan_alignment does for a single read). Returns the output for each read.
+    """
+    start_time = time.time()
+    reads_to_align = [x for x in reads if x.get_length() >= min_align_length]
+    aligned_read_results = {}
+    aligned_read_outputs = {}
+    for results, outputs in level_results:
+        for read, read_results, read_output in zip(reads_to_align, results, outputs):
+            alignment_results = aligned_read_results.setdefault(read.name, [])
+            alignment_results += read_results
+            aligned_read_outputs[read.name] = aligned_read_outputs.get(read.name, '') + \
+                read_output
+            for alignment_result in alignment_results:
+                alignment = Alignment(seqan_output=alignment_result, read=read,
+                                      reference_dict=reference_dict, scoring_scheme=scoring_scheme)
+                read.alignments.append(alignment)
+
+    read_outputs = []
+    for read in reads:
+        if read.name in aligned_read_results:
+            output = finish_read_alignment(read, aligned_read_outputs[read.name],
+                                           bool(aligned_read_results[read.name]), start_time,
+                                           low_score_threshold, keep_bad, min_align_length,
+                                           sam_filename, allowed_overlap)
+        else:
+            output = '  too short to align\n' if VERBOSITY > 1 else ''
+        read_outputs.append(get_read_alignment_output(read, output, single_copy_segment_names))
+    return read_outputs
+
+
+def seqan_alignment_process_batch(read_names):
+    """
+    Aligns a batch of reads in a worker process, using the inputs in PROCESS_ALIGNMENT_ARGS. The
+    SAM file isn't written here - the main process does that when it gets the alignments back.
+    """
+    read_dict, reference_dict, scoring_scheme, ref_seqs_ptr, low_score_threshold, keep_bad, \
+        min_align_length, allowed_overlap, minimap_alignments, sensitivity_level, \
+        single_copy_segment_names = PROCESS_ALIGNMENT_ARGS
+    outputs = []
+    batch_cache = AlignmentCache()
+    for read_name in read_names:
+        read = read_dict[read_name]
+        outputs.append(seqan_alignment(read, reference_dict, scoring_scheme, ref_seqs_ptr,
+                                       low_score_threshold, keep_bad, min_align_length, None,
+                                       allowed_overlap, minimap_alignments[read_name],
+                                       sensitivity_level, single_copy_segment_names))
+        for alignment in read.alignments:
+            batch_cache.add_alignment(alignment)
+    return read_names, outputs, batch_cache
 
 
 def seqan_alignment(read, reference_dict, scoring_scheme, ref_seqs_ptr, low_score_threshold,
@@ -497,38 +697,56 @@ def seqan_alignment(read, reference_dict, scoring_scheme, ref_seqs_ptr, low_scor
                                       reference_dict=reference_dict, scoring_scheme=scoring_scheme)
                 read.alignments.append(alignment)
 
-        if VERBOSITY > 2:
-            if not alignment_strings:
-                output += '  None\n'
-            else:
-                output += 'All Seqan alignments (time to align = ' + \
-                          float_to_str(time.time() - start_time, 3) + ' s):\n'
-                output += read.get_alignment_table()
-
-        read.remove_conflicting_alignments(allowed_overlap)
-        if not keep_bad:
-            read.remove_low_score_alignments(low_score_threshold)
-        read.remove_short_alignments(min_align_length)
-
-        if VERBOSITY > 2:
-            output += 'Final alignments:\n'
-        if VERBOSITY > 1:
-            if read.alignments:
-                output += read.get_alignment_table()
-            else:
-                output += '  None\n'
-
-        # Write alignments to SAM.
-        if sam_filename and read.alignments:
-            SAM_WRITE_LOCK.acquire()
-            sam_file = open(sam_filename, 'a')
-            for alignment in read.alignments:
-                if not alignment.ref.name.startswith('CONTAMINATION_'):
-                    sam_file.write(alignment.get_sam_line())
-            sam_file.close()
-            SAM_WRITE_LOCK.release()
+        output = finish_read_alignment(read, output, bool(alignment_strings), start_time,
+                                       low_score_threshold, keep_bad, min_align_length,
+                                       sam_filename, allowed_overlap)
+
+    return get_read_alignment_output(read, output, single_copy_segment_names)
+
+
+def finish_read_alignment(read, output, any_alignments, start_time, low_score_threshold,
+                          keep_bad, min_align_length, sam_filename, allowed_overlap):
+    """
+    Filters a newly aligned read's alignments and writes the remaining ones to the SAM file.
+    Returns the read's output with the alignment tables added (depending on verbosity).
+    """
+    if VERBOSITY > 2:
+        if not any_alignments:
+            output += '  None\n'
+        else:
+            output += 'All Seqan alignments (time to align = ' + \
+                      float_to_str(time.time() - start_time, 3) + ' s):\n'
+            output += read.get_alignment_table()
+
+    read.remove_conflicting_alignments(allowed_overlap)
+    if not keep_bad:
+        read.remove_low_score_alignments(low_score_threshold)
+    read.remove_short_alignments(min_align_length)
+
+    if VERBOSITY > 2:
+        output += 'Final alignments:\n'
+    if VERBOSITY > 1:
+        if read.alignments:
+            output += read.get_alignment_table()
+        else:
+            output += '  None\n'
+
+    # Write alignments to SAM.
+    if sam_filename and read.alignments:
+        SAM_WRITE_LOCK.acquire()
+        sam_file = open(sam_filename, 'a')
+        for alignment in read.alignments:
+            if not alignment.ref.name.startswith('CONTAMINATION_'):
+                sam_file.write(alignment.get_sam_line())
+        sam_file.close()
+        SAM_WRITE_LOCK.release()
+    return output
 
-    # Colour the output title based on the alignment quality.
+
+def get_read_alignment_output(read, output, single_copy_segment_names):
+    """
+    Adds a title to a read's alignment output, coloured based on the alignment quality.
+    """
     if read.mostly_aligns_to_contamination() or not read.alignments:
         title_colour = 'red'
     elif read.aligns_to_multiple_single_copy_segments(single_copy_segment_names) and \
@@ -602,9 +820,11 @@ def get_auto_score_threshold(scoring_scheme, std_devs_over_mean):
     elif scoring_scheme_str == '1,-4,-6,-1':   # BWA
         mean, std_dev = 60.328393, 1.176776
 
-    # If scheme doesn't match any of the above, then we have to actually do the random alignments.
+    # If scheme doesn't match any of the above, then we have to actually do the random alignments
+    # (or use the results from a previous time).
     else:
-        mean, std_dev = get_random_sequence_alignment_mean_and_std_dev(100, 25000, scoring_scheme)
+        mean, std_dev = cached_random_sequence_alignment_mean_and_std_dev(100, 25000,
+                                                                          scoring_scheme)
 
     threshold = mean + (std_devs_over_mean * std_dev)
 
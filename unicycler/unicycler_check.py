@@ -22,21 +22,24 @@ not, see <http://www.gnu.org/licenses/>.
 
 import sys
 import importlib.util
+import itertools
 import os
 import string
 import argparse
 import random
 import shutil
+from collections import defaultdict
 from .misc import int_to_str, float_to_str, check_file_exists, quit_with_error, \
     reverse_complement, MyHelpFormatter, get_default_thread_count
 from .read_ref import load_references, load_long_reads
-from .alignment import AlignmentScoringScheme
+from .alignment import AlignmentScoringScheme, Alignment
 from .unicycler_align import semi_global_align_long_reads, add_aligning_arguments, \
     fix_up_arguments, load_sam_alignments
 from . import log
 
 try:
-    from .cpp_wrappers import simulate_depths, get_random_sequence_alignment_error_rates
+    from .random_alignment_cache import cached_random_sequence_alignment_error_rates, \
+        cached_depth_distributions
 except AttributeError as e:
     sys.exit('Error when importing C++ library: ' + str(e) + '\n'
              'Have you successfully built the library file using make?')
@@ -44,6 +47,8 @@ except AttributeError as e:
 
 VERBOSITY = 0  # Controls how much the script prints to the screen
 CONSOLE_WIDTH = 40  # The width of many things printed to stdout
+BASE_TABLE_HEADER = '\t'.join(['Base', 'Read depth', 'Mismatches', 'Deletions',
+                               'Insertions']) + '\n'
 
 
 def main():
@@ -69,32 +74,51 @@ def main():
         scoring_scheme = get_scoring_scheme_from_sam(args.sam)
 
     if must_perform_alignment:
-        semi_global_align_long_reads(references, args.ref, read_dict, read_names, read_filename,
+        semi_global_align_long_reads(references, read_dict, read_names, read_filename,
                                      args.threads, scoring_scheme, [args.low_score],
                                      False, args.min_len, args.sam,
-                                     full_command, 0, 0, args.contamination, VERBOSITY)
+                                     full_command, 0, 0, args.contamination, VERBOSITY,
+                                     use_processes=args.alignment_processes)
+
+    window_tables_prefix = prepare_output_dirs(args.window_tables)
+    base_tables_prefix = prepare_output_dirs(args.base_tables)
+
+    if args.streaming:
+        alignment_count, mean_error_rate = \
+            stream_depth_and_errors(args.sam, references, reference_dict, read_dict,
+                                    scoring_scheme, args.error_window_size,
+                                    args.depth_window_size, args.threads, args.depth_p_val,
+                                    window_tables_prefix, base_tables_prefix)
+        log.log_section_header('Setting error thresholds')
+        high_error_rate, very_high_error_rate, random_seq_error_rate = \
+            determine_error_rate_thresholds(scoring_scheme, mean_error_rate,
+                                            args.error_rate_threshold)
+        for ref in references:
+            find_window_regions(ref, high_error_rate, very_high_error_rate)
 
-    alignments = load_sam_alignments(args.sam, read_dict, reference_dict, scoring_scheme)
+    else:
+        alignments = load_sam_alignments(args.sam, read_dict, reference_dict, scoring_scheme,
+                                         args.alignment_cache)
+        alignment_count = len(alignments)
 
-    count_depth_and_errors_per_base(references, reference_dict, alignments)
-    high_error_rate, very_high_error_rate, random_seq_error_rate, mean_error_rate = \
-        determine_thresholds(scoring_scheme, references, alignments,
-                             args.threads, args.depth_p_val, args.error_rate_threshold)
-    count_depth_and_errors_per_window(references, args.error_window_size, args.depth_window_size,
-                                      high_error_rate, very_high_error_rate)
+        count_depth_and_errors_per_base(references, reference_dict, alignments)
+        high_error_rate, very_high_error_rate, random_seq_error_rate, mean_error_rate = \
+            determine_thresholds(scoring_scheme, references, alignments,
+                                 args.threads, args.depth_p_val, args.error_rate_threshold)
+        count_depth_and_errors_per_window(references, args.error_window_size,
+                                          args.depth_window_size, high_error_rate,
+                                          very_high_error_rate)
 
-    if args.window_tables:
-        window_tables_prefix = prepare_output_dirs(args.window_tables)
-        produce_window_tables(references, window_tables_prefix)
+        if window_tables_prefix:
+            produce_window_tables(references, window_tables_prefix)
 
-    if args.base_tables:
-        base_tables_prefix = prepare_output_dirs(args.base_tables)
-        produce_base_tables(references, base_tables_prefix)
+        if base_tables_prefix:
+            produce_base_tables(references, base_tables_prefix)
 
     if args.html:
         produce_html_report(references, args.html, high_error_rate, very_high_error_rate,
                             random_seq_error_rate, full_command, args.ref, args.sam,
-                            scoring_scheme, alignments, mean_error_rate,
+                            scoring_scheme, alignment_count, mean_error_rate,
                             args.error_window_size, args.depth_window_size,
                             args.depth_p_val, args.error_rate_threshold)
 
@@ -145,6 +169,14 @@ def get_arguments():
     parser.add_argument('--threads', type=int, required=False, default=get_default_thread_count(),
                         help='Number of CPU threads used to align (default: the number of '
                              'available CPUs)')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Count depth and errors while reading the SAM file, only keeping the '
+                             'per-base counts for the current alignments in memory (requires an '
+                             'existing coordinate-sorted SAM file, e.g. from samtools sort)')
+    parser.add_argument('--alignment_cache', type=str, required=False,
+                        help='Binary file for caching the loaded alignments - if it exists and '
+                             'was made from the same SAM file and references, the alignments are '
+                             'loaded from it instead of the SAM (default: do not cache)')
     parser.add_argument('--verbosity', type=int, required=False, default=1,
                         help='Level of stdout information (0 to 2)')
 
@@ -163,6 +195,14 @@ def get_arguments():
     if args.error_rate_threshold >= 1.0 or args.error_rate_threshold <= 0.0:
         quit_with_error('--error_rate_threshold must be greater than 0.0 and less than 1.0')
 
+    if args.window_tables and args.error_window_size != args.depth_window_size:
+        quit_with_error('--window_tables requires --error_window_size and --depth_window_size to '
+                        'be the same')
+    if args.streaming and not os.path.isfile(args.sam):
+        quit_with_error('--streaming requires an existing coordinate-sorted SAM file')
+    if args.streaming and args.alignment_cache:
+        quit_with_error('--streaming cannot be used with --alignment_cache')
+
     if args.html and not importlib.util.find_spec('plotly'):
         quit_with_error('plotly not found - please install plotly package to produce html plots')
 
@@ -246,9 +286,9 @@ def get_random_sequence_error_rate(scoring_scheme):
         return 0.523119
 
     # If the scoring scheme doesn't match a previously known one, we will use the C++ code to get
-    # an error rate estimate.
+    # an error rate estimate (or use the estimate from a previous time).
     else:
-        error_rate_str = get_random_sequence_alignment_error_rates(1000, 100, scoring_scheme)
+        error_rate_str = cached_random_sequence_alignment_error_rates(1000, 100, scoring_scheme)
         return float(error_rate_str.split('\n')[1].split('\t')[8])
 
 
@@ -256,76 +296,28 @@ def count_depth_and_errors_per_base(references, reference_dict, alignments):
     """
     Counts up the depth and errors for each base of each reference and stores the counts in the
     Reference objects.
+
+    Depth and deletions cover ranges of the reference, so they are counted as +1/-1 at the range
+    ends (a difference array) and turned into per-base counts with one running sum at the end.
+    Mismatches are found by comparing whole CIGAR match blocks of the read and reference at once.
     """
     log.log_section_header('Counting depth and errors')
     log.log_progress_line(0, len(alignments))
 
+    depth_changes, deletion_changes = {}, {}
     for ref in references:
         ref_length = ref.get_length()
-        ref.depths = [0] * ref_length
+        depth_changes[ref.name] = [0] * (ref_length + 1)
+        deletion_changes[ref.name] = [0] * (ref_length + 1)
         ref.mismatch_counts = [0] * ref_length
         ref.insertion_counts = [0] * ref_length
-        ref.deletion_counts = [0] * ref_length
-        ref.error_rates = [None] * ref_length
         ref.alignment_count = 0
 
     for i, alignment in enumerate(alignments):
         ref = reference_dict[alignment.ref.name]
         ref.alignment_count += 1
-        for j in range(alignment.ref_start_pos, alignment.ref_end_pos):
-            ref.depths[j] += 1
-            if ref.error_rates[j] is None:
-                ref.error_rates[j] = 0.0
-
-        mismatch_positions = []
-        insertion_positions = []
-        deletion_positions = []
-
-        cigar_parts = alignment.cigar_parts[:]
-        if cigar_parts[0][-1] == 'S':
-            cigar_parts.pop(0)
-        if cigar_parts and cigar_parts[-1][-1] == 'S':
-            cigar_parts.pop()
-
-        read_len = alignment.read.get_length()
-        if alignment.rev_comp:
-            read_seq = reverse_complement(alignment.read.sequence)
-        else:
-            read_seq = alignment.read.sequence
-        read_i = alignment.read_start_pos
-        ref_len = alignment.ref.get_length()
-        ref_seq = alignment.ref.sequence
-        ref_i = alignment.ref_start_pos
-        for cigar_part in cigar_parts:
-            cigar_count = int(cigar_part[:-1])
-            cigar_type = cigar_part[-1]
-            if cigar_type == 'I':
-                insertion_positions += [ref_i]
-                read_i += cigar_count
-            elif cigar_type == 'D':
-                for j in range(cigar_count):
-                    deletion_positions.append(ref_i + j)
-                ref_i += cigar_count
-            else:  # match/mismatch
-                for _ in range(cigar_count):
-                    # If all is good with the CIGAR, then we should never end up with a sequence
-                    # index out of the sequence range. But a CIGAR error can cause this, so check
-                    # here.
-                    if read_i >= read_len or ref_i >= ref_len:
-                        break
-                    read_base = read_seq[read_i]
-                    ref_base = ref_seq[ref_i]
-                    if read_base != ref_base:
-                        mismatch_positions.append(ref_i)
-                    read_i += 1
-                    ref_i += 1
-
-        for j in mismatch_positions:
-            ref.mismatch_counts[j] += 1
-        for j in insertion_positions:
-            ref.insertion_counts[j] += 1
-        for j in deletion_positions:
-            ref.deletion_counts[j] += 1
+        add_alignment_counts(alignment, depth_changes[ref.name], ref.mismatch_counts,
+                             ref.insertion_counts, deletion_changes[ref.name])
         log.log_progress_line(i + 1, len(alignments))
 
     finished_bases = 0
@@ -336,19 +328,80 @@ def count_depth_and_errors_per_base(references, reference_dict, alignments):
 
     for ref in references:
         ref_length = ref.get_length()
-        for i in range(ref_length):
-            if ref.depths[i] > 0:
-                error_count = ref.mismatch_counts[i] + ref.insertion_counts[i] + \
-                              ref.deletion_counts[i]
-                ref.error_rates[i] = error_count / ref.depths[i]
-                finished_bases += 1
-            if finished_bases % 10 == 0:
-                log.log_progress_line(finished_bases, base_sum)
+        ref.depths = list(itertools.accumulate(depth_changes[ref.name]))[:ref_length]
+        ref.deletion_counts = list(itertools.accumulate(deletion_changes[ref.name]))[:ref_length]
+        ref.error_rates = [(m + ins + d) / depth if depth > 0 else None
+                           for depth, m, ins, d in zip(ref.depths, ref.mismatch_counts,
+                                                       ref.insertion_counts, ref.deletion_counts)]
+        finished_bases += ref_length
+        log.log_progress_line(finished_bases, base_sum)
 
     log.log_progress_line(base_sum, base_sum, end_newline=True)
     log.log('')
 
 
+def add_alignment_counts(alignment, depth_changes, mismatch_counts, insertion_counts,
+                         deletion_changes):
+    """
+    Adds one alignment's depth and errors to the given counts, which are indexed by reference
+    position. Depth and deletions are added as +1 at the start of their range and -1 at the end.
+    """
+    depth_changes[alignment.ref_start_pos] += 1
+    depth_changes[alignment.ref_end_pos] -= 1
+
+    cigar_parts = alignment.cigar_parts[:]
+    if cigar_parts[0][-1] == 'S':
+        cigar_parts.pop(0)
+    if cigar_parts and cigar_parts[-1][-1] == 'S':
+        cigar_parts.pop()
+
+    read_len = alignment.read.get_length()
+    if alignment.rev_comp:
+        read_seq = reverse_complement(alignment.read.sequence)
+    else:
+        read_seq = alignment.read.sequence
+    read_i = alignment.read_start_pos
+    ref_len = alignment.ref.get_length()
+    ref_seq = alignment.ref.sequence
+    ref_i = alignment.ref_start_pos
+    for cigar_part in cigar_parts:
+        cigar_count = int(cigar_part[:-1])
+        cigar_type = cigar_part[-1]
+        if cigar_type == 'I':
+            insertion_counts[ref_i] += 1
+            read_i += cigar_count
+        elif cigar_type == 'D':
+            deletion_changes[ref_i] += 1
+            deletion_changes[ref_i + cigar_count] -= 1
+            ref_i += cigar_count
+        else:  # match/mismatch
+            # If all is good with the CIGAR, then we should never end up with a sequence index out
+            # of the sequence range. But a CIGAR error can cause this, so the block is cut short at
+            # the end of either sequence.
+            block_len = max(0, min(cigar_count, read_len - read_i, ref_len - ref_i))
+            read_block = read_seq[read_i:read_i + block_len]
+            ref_block = ref_seq[ref_i:ref_i + block_len]
+            if read_block != ref_block:
+                for j, read_base, ref_base in zip(range(ref_i, ref_i + block_len),
+                                                  read_block, ref_block):
+                    if read_base != ref_base:
+                        mismatch_counts[j] += 1
+            read_i += block_len
+            ref_i += block_len
+
+
+def get_windows(ref_length, window_size):
+    """
+    Divides a reference into windows as close as possible to the given size. Returns the actual
+    window size and a list of (start, end) tuples.
+    """
+    window_count = max(1, int(round(ref_length / window_size)))
+    actual_window_size = ref_length / window_count
+    return actual_window_size, [(int(round(actual_window_size * i)),
+                                 int(round(actual_window_size * (i + 1))))
+                                for i in range(window_count)]
+
+
 def count_depth_and_errors_per_window(references, er_window_size, depth_window_size,
                                       high_error_rate, very_high_error_rate):
     """
@@ -356,113 +409,270 @@ def count_depth_and_errors_per_window(references, er_window_size, depth_window_s
     Reference objects.
     """
     for ref in references:
-        ref_length = ref.get_length()
-
-        er_window_count = max(1, int(round(ref_length / er_window_size)))
-        ref.er_window_size = ref_length / er_window_count
-        ref.er_window_starts = []
+        # Running totals of depth and of covered (i.e. has an error rate) positions let each
+        # window's totals be found with one subtraction. The error rate total is summed directly
+        # from each window, as a running float total would give slightly different results.
+        covered_sums = [0] + list(itertools.accumulate(x is not None for x in ref.error_rates))
+        depth_sums = [0] + list(itertools.accumulate(ref.depths))
+
+        ref.er_window_size, er_windows = get_windows(ref.get_length(), er_window_size)
+        ref.er_window_starts = [x[0] for x in er_windows]
         ref.window_error_rates = []
-        ref.high_error_regions = []
-        current_high_error_region = None
-
-        for i in range(er_window_count):
-            window_start = int(round(ref.er_window_size * i))
-            window_end = int(round(ref.er_window_size * (i + 1)))
-            ref.er_window_starts.append(window_start)
-            this_window_pos_with_error_rate = 0
-
-            total_window_error_rate = None
-            for j in range(window_start, window_end):
-                if ref.error_rates[j] is not None:
-                    this_window_pos_with_error_rate += 1
-                    if total_window_error_rate is None:
-                        total_window_error_rate = 0.0
-                    total_window_error_rate += ref.error_rates[j]
-
-            # Check for high error regions.
-            if total_window_error_rate is None:
+        for window_start, window_end in er_windows:
+            this_window_pos_with_error_rate = covered_sums[window_end] - covered_sums[window_start]
+            if this_window_pos_with_error_rate == 0:
                 window_error_rate = None
             else:
+                total_window_error_rate = sum(x for x in ref.error_rates[window_start:window_end]
+                                              if x is not None)
                 window_error_rate = total_window_error_rate / this_window_pos_with_error_rate
-                if window_error_rate > very_high_error_rate:
-                    if current_high_error_region is None:
-                        current_high_error_region = (window_start, window_end)
-                    else:
-                        current_high_error_region = (current_high_error_region[0], window_end)
-                elif window_error_rate < high_error_rate:  # error rate is not high
-                    if current_high_error_region is not None:
-                        ref.high_error_regions.append(current_high_error_region)
-                        current_high_error_region = None
-
             ref.window_error_rates.append(window_error_rate)
 
-        if current_high_error_region is not None:
-            ref.high_error_regions.append(current_high_error_region)
+        ref.depth_window_size, depth_windows = get_windows(ref.get_length(), depth_window_size)
+        ref.depth_window_starts = [x[0] for x in depth_windows]
+        ref.window_depths = []
+        for window_start, window_end in depth_windows:
+            total_window_depth = depth_sums[window_end] - depth_sums[window_start]
+            ref.window_depths.append(total_window_depth / (window_end - window_start))
+
+        find_window_regions(ref, high_error_rate, very_high_error_rate)
+
+
+def find_window_regions(ref, high_error_rate, very_high_error_rate):
+    """
+    Uses a reference's window error rates and depths to find its high error, low depth and high
+    depth regions, and its min/max/mean window depth and error rate.
+    """
+    ref_length = ref.get_length()
+
+    ref.high_error_regions = []
+    current_high_error_region = None
+    er_window_ends = ref.er_window_starts[1:] + [ref_length]
+    for window_start, window_end, window_error_rate in zip(ref.er_window_starts, er_window_ends,
+                                                           ref.window_error_rates):
+        if window_error_rate is None:
+            continue
+        if window_error_rate > very_high_error_rate:
+            if current_high_error_region is None:
+                current_high_error_region = (window_start, window_end)
+            else:
+                current_high_error_region = (current_high_error_region[0], window_end)
+        elif window_error_rate < high_error_rate:  # error rate is not high
+            if current_high_error_region is not None:
+                ref.high_error_regions.append(current_high_error_region)
+                current_high_error_region = None
+    if current_high_error_region is not None:
+        ref.high_error_regions.append(current_high_error_region)
+
+    ref.low_depth_regions = []
+    ref.high_depth_regions = []
+    current_low_depth_region = None
+    current_high_depth_region = None
+    depth_window_ends = ref.depth_window_starts[1:] + [ref_length]
+    for window_start, window_end, window_depth in zip(ref.depth_window_starts, depth_window_ends,
+                                                      ref.window_depths):
+        # Check for low depth regions.
+        if window_depth < ref.very_low_depth_cutoff:
+            if current_low_depth_region is None:
+                current_low_depth_region = (window_start, window_end)
+            else:
+                current_low_depth_region = (current_low_depth_region[0], window_end)
+        elif window_depth > ref.low_depth_cutoff:  # depth is not low
+            if current_low_depth_region is not None:
+                ref.low_depth_regions.append(current_low_depth_region)
+                current_low_depth_region = None
+
+        # Check for high depth regions.
+        if window_depth > ref.very_high_depth_cutoff:
+            if current_high_depth_region is None:
+                current_high_depth_region = (window_start, window_end)
+            else:
+                current_high_depth_region = (current_high_depth_region[0], window_end)
+        elif window_depth < ref.high_depth_cutoff:  # depth is not high
+            if current_high_depth_region is not None:
+                ref.high_depth_regions.append(current_high_depth_region)
+                current_high_depth_region = None
+
+    if current_low_depth_region is not None:
+        ref.low_depth_regions.append(current_low_depth_region)
+    if current_high_depth_region is not None:
+        ref.high_depth_regions.append(current_high_depth_region)
+
+    # Calculate the min/max/mean window depth and error rate for this reference.
+    ref.min_window_depth = 0.0
+    ref.max_window_depth = 0.0
+    ref.mean_window_depth = 0.0
+    if ref.window_depths:
+        ref.min_window_depth = min(ref.window_depths)
+        ref.max_window_depth = max(ref.window_depths)
+        ref.mean_window_depth = sum(ref.window_depths) / len(ref.window_depths)
+    ref.min_window_error_rate = None
+    ref.max_window_error_rate = None
+    ref.mean_window_error_rate = None
+    not_none_error_rates = [x for x in ref.window_error_rates if x is not None]
+    if not_none_error_rates:
+        ref.min_window_error_rate = min(not_none_error_rates)
+        ref.max_window_error_rate = max(not_none_error_rates)
+        ref.mean_window_error_rate = sum(not_none_error_rates) / len(not_none_error_rates)
+
+
+class StreamingBaseCounts(object):
+    """
+    This class holds the per-base counts for one reference in streaming mode. Alignments must be
+    added in order of start position, so once an alignment starting at position p is added, no
+    later alignment can change the counts for bases before p. Those bases are then added to their
+    windows (and the base table) and their counts are thrown away, so only the bases under the
+    current alignments are ever held.
+    """
+
+    def __init__(self, ref, er_window_size, depth_window_size, base_tables_prefix):
+        self.ref = ref
+        self.depth_changes = defaultdict(int)
+        self.mismatch_counts = defaultdict(int)
+        self.insertion_counts = defaultdict(int)
+        self.deletion_changes = defaultdict(int)
+        self.alignment_lengths = []
+        self.next_pos = 0
+        self.depth = 0
+        self.deletions = 0
+        self.error_rate_total = 0.0
+        self.covered_bases = 0
+
+        ref.er_window_size, er_windows = get_windows(ref.get_length(), er_window_size)
+        ref.er_window_starts = [x[0] for x in er_windows]
+        ref.window_error_rates = []
+        self.er_window_ends = [x[1] for x in er_windows]
+        self.er_window_total = None
+        self.er_window_covered = 0
 
-        depth_window_count = max(1, int(round(ref_length / depth_window_size)))
-        ref.depth_window_size = ref_length / depth_window_count
-        ref.depth_window_starts = []
+        ref.depth_window_size, depth_windows = get_windows(ref.get_length(), depth_window_size)
+        ref.depth_window_starts = [x[0] for x in depth_windows]
         ref.window_depths = []
-        ref.low_depth_regions = []
-        ref.high_depth_regions = []
-        current_low_depth_region = None
-        current_high_depth_region = None
-
-        for i in range(depth_window_count):
-            window_start = int(round(ref.depth_window_size * i))
-            window_end = int(round(ref.depth_window_size * (i + 1)))
-            ref.depth_window_starts.append(window_start)
-            this_window_size = window_end - window_start
-            total_window_depth = 0
-            for j in range(window_start, window_end):
-                total_window_depth += ref.depths[j]
-
-            # Check for low depth regions.
-            window_depth = total_window_depth / this_window_size
-            if window_depth < ref.very_low_depth_cutoff:
-                if current_low_depth_region is None:
-                    current_low_depth_region = (window_start, window_end)
-                else:
-                    current_low_depth_region = (current_low_depth_region[0], window_end)
-            elif window_depth > ref.low_depth_cutoff:  # depth is not low
-                if current_low_depth_region is not None:
-                    ref.low_depth_regions.append(current_low_depth_region)
-                    current_low_depth_region = None
-
-            # Check for high depth regions.
-            if window_depth > ref.very_high_depth_cutoff:
-                if current_high_depth_region is None:
-                    current_high_depth_region = (window_start, window_end)
+        self.depth_window_ends = [x[1] for x in depth_windows]
+        self.depth_window_total = 0
+
+        if base_tables_prefix:
+            base_table_filename = add_ref_name_to_output_prefix(ref, base_tables_prefix, '.txt')
+            self.base_table = open(base_table_filename, 'w')
+            self.base_table.write(BASE_TABLE_HEADER)
+            if VERBOSITY > 0:
+                print(base_table_filename)
+        else:
+            self.base_table = None
+
+    def add_alignment(self, alignment):
+        if alignment.ref_start_pos < self.next_pos:
+            quit_with_error('alignments are not sorted by position - streaming mode requires a '
+                            'coordinate-sorted SAM file (e.g. from samtools sort)')
+        self.finish_bases(alignment.ref_start_pos)
+        add_alignment_counts(alignment, self.depth_changes, self.mismatch_counts,
+                             self.insertion_counts, self.deletion_changes)
+        self.alignment_lengths.append(alignment.ref_end_pos - alignment.ref_start_pos)
+
+    def finish_bases(self, end_pos):
+        """
+        Adds the counts for all bases up to end_pos to their windows and then discards them.
+        """
+        for pos in range(self.next_pos, end_pos):
+            self.depth += self.depth_changes.pop(pos, 0)
+            self.deletions += self.deletion_changes.pop(pos, 0)
+            mismatches = self.mismatch_counts.pop(pos, 0)
+            insertions = self.insertion_counts.pop(pos, 0)
+            if self.depth > 0:
+                error_rate = (mismatches + insertions + self.deletions) / self.depth
+                if self.er_window_total is None:
+                    self.er_window_total = 0.0
+                self.er_window_total += error_rate
+                self.er_window_covered += 1
+                self.error_rate_total += error_rate
+                self.covered_bases += 1
+            self.depth_window_total += self.depth
+            if self.base_table is not None:
+                self.base_table.write('\t'.join([str(pos + 1), str(self.depth), str(mismatches),
+                                                 str(self.deletions), str(insertions)]) + '\n')
+
+            if pos + 1 == self.er_window_ends[len(self.ref.window_error_rates)]:
+                if self.er_window_total is None:
+                    self.ref.window_error_rates.append(None)
                 else:
-                    current_high_depth_region = (current_high_depth_region[0], window_end)
-            elif window_depth < ref.high_depth_cutoff:  # depth is not high
-                if current_high_depth_region is not None:
-                    ref.high_depth_regions.append(current_high_depth_region)
-                    current_high_depth_region = None
-
-            ref.window_depths.append(window_depth)
-
-        if current_low_depth_region is not None:
-            ref.low_depth_regions.append(current_low_depth_region)
-        if current_high_depth_region is not None:
-            ref.high_depth_regions.append(current_high_depth_region)
-
-        # Calculate the min/max/mean window depth and error rate for this reference.
-        ref.min_window_depth = 0.0
-        ref.max_window_depth = 0.0
-        ref.mean_window_depth = 0.0
-        if ref.window_depths:
-            ref.min_window_depth = min(ref.window_depths)
-            ref.max_window_depth = max(ref.window_depths)
-            ref.mean_window_depth = sum(ref.window_depths) / len(ref.window_depths)
-        ref.min_window_error_rate = None
-        ref.max_window_error_rate = None
-        ref.mean_window_error_rate = None
-        not_none_error_rates = [x for x in ref.window_error_rates if x is not None]
-        if not_none_error_rates:
-            ref.min_window_error_rate = min(not_none_error_rates)
-            ref.max_window_error_rate = max(not_none_error_rates)
-            ref.mean_window_error_rate = sum(not_none_error_rates) / len(not_none_error_rates)
+                    self.ref.window_error_rates.append(self.er_window_total /
+                                                       self.er_window_covered)
+                self.er_window_total = None
+                self.er_window_covered = 0
+            depth_window_i = len(self.ref.window_depths)
+            if pos + 1 == self.depth_window_ends[depth_window_i]:
+                window_size = pos + 1 - self.ref.depth_window_starts[depth_window_i]
+                self.ref.window_depths.append(self.depth_window_total / window_size)
+                self.depth_window_total = 0
+        self.next_pos = max(self.next_pos, end_pos)
+
+    def finish(self):
+        """
+        Called after the last alignment to this reference has been added.
+        """
+        self.finish_bases(self.ref.get_length())
+        self.ref.alignment_count = len(self.alignment_lengths)
+        if self.base_table is not None:
+            self.base_table.close()
+
+
+def stream_depth_and_errors(sam_filename, references, reference_dict, read_dict, scoring_scheme,
+                            er_window_size, depth_window_size, threads, depth_p_val,
+                            window_tables_prefix, base_tables_prefix):
+    """
+    This function is the streaming mode's replacement for loading the alignments and counting
+    depth and errors per base and per window. It reads a coordinate-sorted SAM file one alignment
+    at a time, so neither the alignments nor the per-base counts are ever all in memory. As each
+    reference is finished, its depth thresholds are set and its window and base tables are saved.
+    Returns the number of alignments and the mean error rate.
+    """
+    log.log_section_header('Counting depth and errors (streaming)')
+    finished_ref_names = set()
+    alignment_count = 0
+    error_rate_total, covered_bases = 0.0, 0
+
+    def finish_ref(ref_counts):
+        nonlocal error_rate_total, covered_bases
+        ref_counts.finish()
+        finished_ref_names.add(ref_counts.ref.name)
+        error_rate_total += ref_counts.error_rate_total
+        covered_bases += ref_counts.covered_bases
+        determine_depth_thresholds(ref_counts.ref, ref_counts.alignment_lengths, threads, 0.1,
+                                   depth_p_val)
+        if window_tables_prefix:
+            save_window_table(ref_counts.ref, window_tables_prefix)
+
+    counts = None
+    with open(sam_filename, 'rt') as sam_file:
+        for line in sam_file:
+            line = line.strip()
+            if not line or line.startswith('@') or line.split('\t', 3)[2] == '*':
+                continue
+            alignment = Alignment(sam_line=line, read_dict=read_dict,
+                                  reference_dict=reference_dict, scoring_scheme=scoring_scheme)
+            ref = reference_dict[alignment.ref.name]
+            if counts is None or counts.ref is not ref:
+                if counts is not None:
+                    finish_ref(counts)
+                if ref.name in finished_ref_names:
+                    quit_with_error('alignments are not grouped by reference - streaming mode '
+                                    'requires a coordinate-sorted SAM file (e.g. from samtools '
+                                    'sort)')
+                counts = StreamingBaseCounts(ref, er_window_size, depth_window_size,
+                                             base_tables_prefix)
+            counts.add_alignment(alignment)
+            alignment_count += 1
+    if counts is not None:
+        finish_ref(counts)
+
+    # References without any alignments still need their (empty) counts.
+    for ref in references:
+        if ref.name not in finished_ref_names:
+            finish_ref(StreamingBaseCounts(ref, er_window_size, depth_window_size,
+                                           base_tables_prefix))
+
+    mean_error_rate = error_rate_total / covered_bases if covered_bases else None
+    return alignment_count, mean_error_rate
 
 
 def determine_thresholds(scoring_scheme, references, alignments, threads, depth_p_val,
@@ -478,6 +688,22 @@ def determine_thresholds(scoring_scheme, references, alignments, threads, depth_
     for ref in references:
         all_error_rates += [x for x in ref.error_rates if x is not None]
     mean_error_rate = get_mean(all_error_rates)
+    high_error_rate, very_high_error_rate, random_seq_error_rate = \
+        determine_error_rate_thresholds(scoring_scheme, mean_error_rate, error_rate_fraction)
+
+    for ref in references:
+        alignment_lengths = [x.ref_end_pos - x.ref_start_pos for x in alignments
+                             if x.ref.name == ref.name]
+        determine_depth_thresholds(ref, alignment_lengths, threads, 0.1, depth_p_val)
+
+    return high_error_rate, very_high_error_rate, random_seq_error_rate, mean_error_rate
+
+
+def determine_error_rate_thresholds(scoring_scheme, mean_error_rate, error_rate_fraction):
+    """
+    This function sets the two error rate thresholds, between the mean error rate and the random
+    alignment error rate. It returns them along with the random alignment error rate.
+    """
     if VERBOSITY > 0:
         print(lr_justify('Mean error rate:',
                          float_to_str(mean_error_rate * 100.0, 2) + '%'))
@@ -504,18 +730,13 @@ def determine_thresholds(scoring_scheme, references, alignments, threads, depth_
                          float_to_str(very_high_error_rate * 100.0, 2) + '%'))
         print('')
 
-    for ref in references:
-        determine_depth_thresholds(ref, alignments, threads, 0.1, depth_p_val)
-
-    return high_error_rate, very_high_error_rate, random_seq_error_rate, mean_error_rate
+    return high_error_rate, very_high_error_rate, random_seq_error_rate
 
 
-def determine_depth_thresholds(ref, alignments, threads, depth_p_val_1, depth_p_val_2):
+def determine_depth_thresholds(ref, alignment_lengths, threads, depth_p_val_1, depth_p_val_2):
     """
     This function determines read depth thresholds by simulating a random distribution of reads.
     """
-    alignment_lengths = [x.ref_end_pos - x.ref_start_pos for x in alignments
-                         if x.ref.name == ref.name]
     ref_length = ref.get_length()
 
     min_depth_dist, max_depth_dist = get_depth_min_and_max_distributions(alignment_lengths,
@@ -653,24 +874,32 @@ def produce_window_tables(references, window_tables_prefix):
     log.log_section_header('Saving window tables')
 
     for ref in references:
-        window_table_filename = add_ref_name_to_output_prefix(ref, window_tables_prefix, '.txt')
-        table = open(window_table_filename, 'w')
+        save_window_table(ref, window_tables_prefix)
+
+
+def save_window_table(ref, window_tables_prefix):
+    """
+    Write one reference's table of depth and error rates per window. The error rate and depth
+    windows are the same, as get_arguments requires their sizes to be equal for window tables.
+    """
+    window_table_filename = add_ref_name_to_output_prefix(ref, window_tables_prefix, '.txt')
+    with open(window_table_filename, 'w') as table:
         table.write('\t'.join(['Window start',
                                'Window end',
                                'Mean depth',
                                'Mean error rate']) + '\n')
-        window_count = len(ref.window_starts)
+        window_count = len(ref.er_window_starts)
         for i in range(window_count):
             if i + 1 == window_count:
                 window_end = ref.get_length()
             else:
-                window_end = ref.window_starts[i + 1]
-            table.write('\t'.join([str(ref.window_starts[i]),
+                window_end = ref.er_window_starts[i + 1]
+            table.write('\t'.join([str(ref.er_window_starts[i]),
                                    str(window_end),
                                    str(ref.window_depths[i]),
                                    str(ref.window_error_rates[i])]) + '\n')
-        if VERBOSITY > 0:
-            print(window_table_filename)
+    if VERBOSITY > 0:
+        print(window_table_filename)
 
 
 def produce_base_tables(references, base_tables_prefix):
@@ -681,11 +910,7 @@ def produce_base_tables(references, base_tables_prefix):
     for ref in references:
         base_table_filename = add_ref_name_to_output_prefix(ref, base_tables_prefix, '.txt')
         table = open(base_table_filename, 'w')
-        table.write('\t'.join(['Base',
-                               'Read depth',
-                               'Mismatches',
-                               'Deletions',
-                               'Insertions']) + '\n')
+        table.write(BASE_TABLE_HEADER)
         for i in range(ref.get_length()):
             table.write('\t'.join([str(i + 1),
                                    str(ref.depths[i]),
@@ -698,7 +923,7 @@ def produce_base_tables(references, base_tables_prefix):
 
 def produce_html_report(references, html_filename, high_error_rate, very_high_error_rate,
                         random_seq_error_rate, full_command, ref_filename, sam_filename,
-                        scoring_scheme, alignments, mean_error_rate, er_window_size,
+                        scoring_scheme, alignment_count, mean_error_rate, er_window_size,
                         depth_window_size, depth_p_val, error_rate_fraction):
     """
     Write html files containing plots of results.
@@ -721,7 +946,7 @@ def produce_html_report(references, html_filename, high_error_rate, very_high_er
     html_file.write('<h1>Long read assembly checker</h1>\n')
     html_file.write('<h5>Hold the mouse over text in this report for explanations.</h5>\n')
     html_file.write(get_report_html_table(ref_filename, sam_filename, full_command, os.getcwd(),
-                                          scoring_scheme, references, alignments,
+                                          scoring_scheme, references, alignment_count,
                                           random_seq_error_rate, very_high_error_rate,
                                           mean_error_rate, er_window_size, depth_window_size,
                                           error_rate_fraction))
@@ -940,7 +1165,7 @@ def get_html_style(report_width):
 
 
 def get_report_html_table(ref_filename, sam_filename, full_command, directory, scoring_scheme,
-                          references, alignments, random_seq_error_rate, very_high_error_rate,
+                          references, alignment_count, random_seq_error_rate, very_high_error_rate,
                           mean_error_rate, er_window_size, depth_window_size, error_rate_fraction):
     """
     Produces the table of information at the top of the report, not specific to any one reference.
@@ -977,7 +1202,7 @@ def get_report_html_table(ref_filename, sam_filename, full_command, directory, s
     total_alignments_help = 'The number of alignments in the SAM file.'
     table += '  <tr title="' + total_alignments_help + '">' + \
              '<td>Total alignments:</td>' + \
-             '<td>' + int_to_str(len(alignments)) + \
+             '<td>' + int_to_str(alignment_count) + \
              '</td></tr>\n'
 
     full_command_help = 'The command used to generate this HTML report.'
@@ -1243,19 +1468,6 @@ def get_ref_shift_from_cigar_part(cigar_type, cigar_count):
 
 
 def get_depth_min_and_max_distributions(read_lengths, reference_length, iterations, threads):
-    distribution_str = simulate_depths(read_lengths, reference_length, iterations, threads)
-    min_distribution_str, max_distribution_str = distribution_str.split(';')
-
-    min_distribution_pieces = min_distribution_str.split(',')
-    min_distribution = []
-    for piece in min_distribution_pieces:
-        piece_parts = piece.split(':')
-        min_distribution.append((int(piece_parts[0]), float(piece_parts[1])))
-
-    max_distribution_pieces = max_distribution_str.split(',')
-    max_distribution = []
-    for piece in max_distribution_pieces:
-        piece_parts = piece.split(':')
-        max_distribution.append((int(piece_parts[0]), float(piece_parts[1])))
-
-    return min_distribution, max_distribution
+    min_distribution, max_distribution = cached_depth_distributions(read_lengths, reference_length,
+                                                                    iterations, threads)
+    return list(enumerate(min_distribution)), list(enumerate(max_distribution))